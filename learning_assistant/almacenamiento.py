@@ -0,0 +1,541 @@
+# almacenamiento.py - Capa de almacenamiento intercambiable (JSON, SQLite o fragmentos por usuario)
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from cache_arranque import CacheArranque
+from diario import DiarioCambios, aplicar_cambio, identidad_archivo
+from derivados import derivar_cambio
+from fragmentos import RepositorioFragmentado
+from guardado import CerrojoArchivo, apartar_archivos
+from indices import IndiceUsuarios
+from registros import Plan, Sesion, a_json, dia_ordinal, minuto_del_dia
+
+ALMACENES = ("json", "sqlite", "fragmentos")
+
+
+def datos_vacios():
+    return {
+        "usuarios": {},
+        "planes": {},
+        "sesiones": [],
+        "puntos": {},
+        "logros": {},
+        "rachas": {},
+        "perfiles": {},
+        "resumenes": {},
+        "resumenes_temas": {}
+    }
+
+
+def crear_repositorio(tipo=None, carpeta="data"):
+    """Crea el repositorio indicado (o el de la variable ASISTENTE_ALMACEN)"""
+    tipo = (tipo or os.environ.get("ASISTENTE_ALMACEN", "json")).lower()
+    if tipo == "sqlite":
+        return RepositorioSQLite(os.path.join(carpeta, "usuarios.db"))
+    if tipo == "json":
+        return RepositorioJSON(os.path.join(carpeta, "usuarios.json"))
+    if tipo == "fragmentos":
+        return RepositorioFragmentado(os.path.join(carpeta, "fragmentos"))
+    raise ValueError(f"Almacén desconocido: {tipo} (opciones: {', '.join(ALMACENES)})")
+
+
+class RepositorioJSON:
+    """Snapshot JSON + diario de cambios; las consultas usan un índice en memoria"""
+
+    # Registros del diario por encima de los cuales se rehace la caché de arranque
+    LIMITE_COLA_CACHE = 1000
+
+    def __init__(self, archivo_datos):
+        self.archivo_datos = archivo_datos
+        self.diario = DiarioCambios(archivo_datos)
+        self.diario.derivar = derivar_cambio
+        self.cache = CacheArranque(archivo_datos, self.diario.archivo_diario)
+        base, _ = os.path.splitext(archivo_datos)
+        self.cerrojo = CerrojoArchivo(f"{base}.lock")
+        self.datos = None
+        self.indice = IndiceUsuarios()
+        # "cache", "json" o None si no se ha cargado nada del disco
+        self.origen_carga = None
+        self._cargados = None
+        # Veces que otro proceso compactó y hubo que recargar todo
+        self.recargas = 0
+        # Aumenta cada vez que se incorporan cambios de otro proceso o se deshace una operación
+        # fallida (para rehacer vistas derivadas)
+        self.cambios_externos = 0
+        # Con diferido=True (importaciones, servidor) los cambios se publican en guardar(); mientras
+        # haya un lote sin publicar se mantiene el cerrojo
+        self.diferido = False
+        self.lote = False
+        self.publicaciones = 0
+        self._nivel = 0
+
+    def existe(self):
+        return os.path.exists(self.archivo_datos) or os.path.exists(self.diario.archivo_diario)
+
+    @property
+    def bytes_escritos(self):
+        return self.diario.bytes_escritos
+
+    def apartar_danados(self):
+        """Aparta los archivos que no se pudieron leer para empezar de cero sin perderlos"""
+        return apartar_archivos([self.archivo_datos, self.diario.archivo_diario, self.cache.archivo_cache])
+
+    def cargar(self, datos_vacios):
+        """Carga desde la caché binaria si sigue siendo válida; si no, desde el JSON"""
+        # Con el cerrojo, para no leer a medias una compactación de otro proceso
+        with self.cerrojo:
+            return self._cargar(datos_vacios)
+
+    def _cargar(self, datos_vacios):
+        contenido = self.cache.cargar()
+        if contenido is not None:
+            datos = contenido["datos"]
+            self.diario.posicion = contenido["posicion_diario"]
+            self.diario.registros_en_diario = contenido["registros_en_diario"]
+            self.diario.version = contenido["version_diario"]
+            self.diario.identidad_snapshot = identidad_archivo(self.archivo_datos)
+            # Solo se reproduce la parte del diario escrita después de la caché
+            cola = self.diario.reproducir(datos)
+            self._cargados = (datos, contenido["indice"], cola)
+            self.origen_carga = "cache"
+            return datos
+
+        datos = self.diario.cargar(datos_vacios)
+        self._cargados = (datos, None, None)
+        self.origen_carga = "json"
+        return datos
+
+    def usar_datos(self, datos):
+        """Fija los datos en memoria y construye (o recupera de la caché) el índice por usuario"""
+        self.datos = datos
+        cargados, self._cargados = self._cargados, None
+        if cargados is None or cargados[0] is not datos:
+            self.indice = IndiceUsuarios.construir(datos)
+            return
+
+        _, indice, cola = cargados
+        if indice is None:
+            self.indice = IndiceUsuarios.construir(datos)
+        else:
+            self.indice = indice
+            for cambio in cola:
+                self._indexar(cambio["op"], cambio["ruta"], cambio.get("valor"))
+        if indice is None or len(cola) >= self.LIMITE_COLA_CACHE:
+            self.guardar_cache()
+
+    def guardar_cache(self):
+        """Guarda datos + índice en la caché binaria; un fallo no impide seguir trabajando"""
+        if self.diario.pendientes:
+            return
+        try:
+            self.cache.guardar(self.datos, self.indice, self.diario.posicion,
+                               self.diario.registros_en_diario, self.diario.version)
+        except (OSError, TypeError, ValueError):
+            self.cache.invalidar()
+
+    @contextmanager
+    def transaccion(self):
+        """Operación atómica entre procesos: toma el cerrojo, incorpora lo que otros procesos
+        hayan escrito y publica los cambios propios al terminar. Si la operación falla, sus
+        cambios no se publican y los datos en memoria se vuelven a cargar.
+
+        Con `diferido` el cerrojo sigue tomado desde la primera operación con cambios hasta
+        guardar(): el lote entero es una sola transacción"""
+        with self.cerrojo:
+            exterior = self._nivel == 0
+            if exterior and not self.lote:
+                self._sincronizar()
+            marca = len(self.diario.pendientes)
+            self._nivel += 1
+            try:
+                yield
+            except BaseException:
+                if exterior:
+                    self._deshacer(marca)
+                raise
+            finally:
+                self._nivel -= 1
+            if exterior:
+                self._terminar()
+
+    def _terminar(self):
+        if not self.diferido:
+            # Visible ya para los demás procesos; el fsync lo hace el próximo guardado
+            self._publicar(duradero=False)
+        elif self.diario.pendientes and not self.lote:
+            self.cerrojo.adquirir()
+            self.lote = True
+
+    def _publicar(self, duradero=True):
+        if self.diario.escribir_pendientes(duradero):
+            self.publicaciones += 1
+        if self.lote:
+            self.lote = False
+            self.cerrojo.liberar()
+
+    def _deshacer(self, marca):
+        """Descarta los cambios de la operación fallida; lo que ya hubiera cambiado en memoria
+        se recupera del disco más los cambios del lote aún sin publicar"""
+        descartados = len(self.diario.pendientes) - marca
+        del self.diario.pendientes[marca:]
+        if descartados and self.datos is not None:
+            self._recargar()
+
+    def _recargar(self):
+        # En el mismo diccionario: el servicio y el índice siguen usando self.datos
+        nuevos = self.diario.cargar(datos_vacios())
+        for texto in self.diario.pendientes:
+            self.diario.aplicar(nuevos, json.loads(texto))
+        self.datos.clear()
+        self.datos.update(nuevos)
+        self.indice = IndiceUsuarios.construir(self.datos)
+        self.cambios_externos += 1
+
+    def _sincronizar(self):
+        if self.datos is None:
+            return
+        if self.diario.cambiado_por_otro():
+            # Otro proceso compactó: recargar y reaplicar lo propio
+            self._recargar()
+            self.recargas += 1
+        else:
+            cambios = self.diario.reproducir(self.datos)
+            for cambio in cambios:
+                self._indexar(cambio["op"], cambio["ruta"], cambio.get("valor"))
+            if cambios:
+                self.cambios_externos += 1
+
+    def registrar(self, op, ruta, valor=None, derivado=False):
+        # Lo que se deduce de una sesión (perfil, resúmenes, racha) no va al diario: se recalcula al reproducirla
+        if derivado:
+            return
+        self.diario.registrar(op, ruta, valor)
+        self._indexar(op, ruta, valor)
+
+    def _indexar(self, op, ruta, valor):
+        # Mantener el índice al día sin volver a recorrer los datos
+        if op == "append" and ruta[0] == "sesiones":
+            self.indice.agregar_sesion(valor)
+        elif op == "set" and ruta[0] == "planes" and len(ruta) == 2:
+            self.indice.agregar_plan(ruta[1], valor["usuario_id"])
+
+    def guardar(self):
+        # Solo se añaden los cambios nuevos (y se cierra el lote); el snapshot se rehace al compactar
+        with self.transaccion():
+            self._publicar()
+            if self.diario.necesita_compactar():
+                self.compactar()
+
+    def compactar(self):
+        with self.transaccion():
+            self._publicar()
+            self.diario.compactar(self.datos)
+            self.guardar_cache()
+
+    def volcar(self, datos):
+        """Reemplaza todo el contenido del almacén (usado en migraciones)"""
+        with self.cerrojo:
+            self.usar_datos(datos)
+            self.diario.pendientes = []
+            self.diario.compactar(datos)
+            self.guardar_cache()
+
+    # ===== CONSULTAS =====
+
+    def planes_de_usuario(self, usuario_id):
+        planes = self.datos["planes"]
+        return {plan_id: planes[plan_id] for plan_id in self.indice.planes(usuario_id)}
+
+    def sesiones_de_usuario(self, usuario_id):
+        return self.indice.sesiones(usuario_id)
+
+    def contar_sesiones_usuario(self, usuario_id):
+        return self.indice.contar_sesiones(usuario_id)
+
+
+class RepositorioSQLite:
+    """Tablas indexadas de usuarios, planes y sesiones; cada operación es una transacción"""
+
+    # Secciones guardadas como clave -> JSON (puntos, logros, rachas...)
+    SECCIONES_TABLA = ("usuarios", "planes", "sesiones")
+
+    def __init__(self, archivo_db):
+        self.archivo_db = archivo_db
+        self.datos = None
+        self._conexion = None
+        self._en_transaccion = False
+        # (sección, clave) con cambios anidados dentro de la transacción: se escriben al confirmar
+        self._filas_pendientes = set()
+        # PRAGMA data_version cambia cuando otra conexión confirma cambios
+        self.version_datos = None
+        self._version_cargada = None
+        self.recargas = 0
+        self.cambios_externos = 0
+        # Bytes de datos serializados enviados a la base de datos
+        self.bytes_escritos = 0
+        # Con diferido=True (importaciones, servidor) la transacción sigue abierta entre
+        # operaciones y se confirma en guardar()
+        self.diferido = False
+        self.publicaciones = 0
+        self._sin_confirmar = False
+        self._registrados = 0
+
+    @property
+    def conexion(self):
+        if self._conexion is None:
+            # La usan el hilo principal y el del guardado diferido, siempre con el cerrojo del servicio
+            self._conexion = sqlite3.connect(self.archivo_db, timeout=30, check_same_thread=False)
+            self._crear_esquema()
+        return self._conexion
+
+    def _crear_esquema(self):
+        with self._conexion:
+            self._conexion.executescript("""
+                CREATE TABLE IF NOT EXISTS usuarios (
+                    id TEXT PRIMARY KEY,
+                    datos TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS planes (
+                    id TEXT PRIMARY KEY,
+                    usuario_id TEXT NOT NULL,
+                    datos TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS sesiones (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    plan_id TEXT NOT NULL,
+                    usuario_id TEXT,
+                    duracion INTEGER NOT NULL,
+                    puntuacion REAL NOT NULL,
+                    fecha TEXT NOT NULL,
+                    hora TEXT,
+                    notas TEXT
+                );
+                CREATE TABLE IF NOT EXISTS registros (
+                    seccion TEXT NOT NULL,
+                    clave TEXT NOT NULL,
+                    valor TEXT NOT NULL,
+                    PRIMARY KEY (seccion, clave)
+                );
+                CREATE INDEX IF NOT EXISTS idx_planes_usuario ON planes(usuario_id);
+                CREATE INDEX IF NOT EXISTS idx_sesiones_plan ON sesiones(plan_id);
+                CREATE INDEX IF NOT EXISTS idx_sesiones_usuario ON sesiones(usuario_id, fecha);
+                CREATE INDEX IF NOT EXISTS idx_sesiones_fecha ON sesiones(fecha);
+            """)
+
+    def existe(self):
+        return os.path.exists(self.archivo_db)
+
+    def apartar_danados(self):
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+        return apartar_archivos([self.archivo_db, f"{self.archivo_db}-journal", f"{self.archivo_db}-wal"])
+
+    def cargar(self, datos_vacios):
+        """Lee todo en una sola transacción de lectura: la versión anotada es la de lo leído"""
+        datos = datos_vacios
+        conexion = self.conexion
+        propia = not conexion.in_transaction
+        if propia:
+            conexion.execute("BEGIN")
+        try:
+            for usuario_id, valor in conexion.execute("SELECT id, datos FROM usuarios"):
+                datos["usuarios"][usuario_id] = json.loads(valor)
+            for plan_id, valor in conexion.execute("SELECT id, datos FROM planes"):
+                datos["planes"][plan_id] = Plan.desde_dict(json.loads(valor))
+            datos["sesiones"] = [self._fila_a_sesion(fila) for fila in conexion.execute(
+                "SELECT plan_id, duracion, puntuacion, fecha, hora, notas FROM sesiones ORDER BY id")]
+            for seccion, clave, valor in conexion.execute("SELECT seccion, clave, valor FROM registros"):
+                datos.setdefault(seccion, {})[clave] = json.loads(valor)
+            self._version_cargada = self._version()
+        finally:
+            if propia:
+                conexion.rollback()
+        return datos
+
+    def usar_datos(self, datos):
+        # Las consultas por usuario usan los índices de la base de datos. Sin carga previa (almacén
+        # nuevo o apartado) no hay versión fiable: la primera transacción vuelve a leer
+        self.datos = datos
+        self.version_datos, self._version_cargada = self._version_cargada, None
+
+    def _version(self):
+        return self.conexion.execute("PRAGMA data_version").fetchone()[0]
+
+    @contextmanager
+    def transaccion(self):
+        """BEGIN IMMEDIATE durante toda la operación; si otro proceso escribió, se recarga antes.
+        Si la operación falla se deshace entera, también en memoria.
+
+        Con `diferido` la transacción sigue abierta tras una operación con cambios y se confirma
+        en guardar(): el lote entero es una sola transacción"""
+        if self._en_transaccion:
+            yield
+            return
+        conexion = self.conexion
+        if not conexion.in_transaction:
+            conexion.execute("BEGIN IMMEDIATE")
+            if self.datos is not None and self._version() != self.version_datos:
+                self._recargar()
+                self.recargas += 1
+        conexion.execute("SAVEPOINT operacion")
+        self._en_transaccion = True
+        cambios_previos, registrados = self._sin_confirmar, self._registrados
+        try:
+            yield
+            for seccion, clave in self._filas_pendientes:
+                self._escribir(seccion, clave, self.datos[seccion][clave])
+        except BaseException:
+            self._en_transaccion = False
+            self._filas_pendientes.clear()
+            conexion.execute("ROLLBACK TO operacion")
+            conexion.execute("RELEASE operacion")
+            if not cambios_previos:
+                conexion.rollback()
+            self._sin_confirmar = cambios_previos
+            if self._registrados != registrados and self.datos is not None:
+                # Los datos en memoria pueden estar a medias: se leen de nuevo (con el lote, si lo hay)
+                self._recargar()
+            raise
+        self._en_transaccion = False
+        self._filas_pendientes.clear()
+        conexion.execute("RELEASE operacion")
+        if not self.diferido or not self._sin_confirmar:
+            self._confirmar()
+
+    def _confirmar(self):
+        # La versión se lee aún con el cerrojo de escritura: los cambios propios no la mueven, y lo
+        # que otro proceso confirme después del commit la cambiará y se recargará
+        version = self._version()
+        self.conexion.commit()
+        if self._sin_confirmar:
+            self.publicaciones += 1
+            self._sin_confirmar = False
+        self.version_datos = version
+
+    def _recargar(self):
+        nuevos = self.cargar(datos_vacios())
+        self.datos.clear()
+        self.datos.update(nuevos)
+        self.version_datos, self._version_cargada = self._version_cargada, None
+        self.cambios_externos += 1
+
+    def _fila_a_sesion(self, fila):
+        plan_id, duracion, puntuacion, fecha, hora, notas = fila
+        return Sesion(plan_id, duracion, puntuacion, dia_ordinal(fecha),
+                      minuto_del_dia(hora) if hora else None, notas or "")
+
+    def registrar(self, op, ruta, valor=None, derivado=False):
+        """Aplica un cambio dentro de la transacción en curso (la de la operación o la del lote)
+        o en una propia de una sola fila. Los derivados también se guardan: no hay diario que reproducir"""
+        self._registrados += 1
+        if self._en_transaccion or self.conexion.in_transaction:
+            self._aplicar(op, list(ruta), valor)
+            self._sin_confirmar = True
+            return
+        with self.conexion:
+            self._aplicar(op, list(ruta), valor)
+        self.publicaciones += 1
+
+    def _aplicar(self, op, ruta, valor):
+        seccion = ruta[0]
+        if seccion == "sesiones":
+            if op == "append":
+                self._insertar_sesion(valor)
+            return
+
+        clave = ruta[1]
+        if len(ruta) > 2 and self._en_transaccion and clave in (self.datos or {}).get(seccion, ()):
+            # Cambio anidado dentro de una operación: los datos en memoria ya lo tienen, y la
+            # fila se reescribe una sola vez al confirmar (una sesión toca varias veces la misma)
+            self._filas_pendientes.add((seccion, clave))
+            return
+        if len(ruta) > 2:
+            # Cambio anidado: leer la fila, modificarla y reescribirla
+            actual = self._leer(seccion, clave) or {}
+            aplicar_cambio(actual, {"op": op, "ruta": ruta[2:], "valor": valor})
+            op, valor = "set", actual
+
+        if op == "del":
+            if seccion in self.SECCIONES_TABLA:
+                self.conexion.execute(f"DELETE FROM {seccion} WHERE id = ?", (clave,))
+            else:
+                self.conexion.execute("DELETE FROM registros WHERE seccion = ? AND clave = ?", (seccion, clave))
+        elif op == "append":
+            lista = self._leer(seccion, clave) or []
+            lista.append(valor)
+            self._escribir(seccion, clave, lista)
+        else:
+            self._escribir(seccion, clave, valor)
+
+    def _leer(self, seccion, clave):
+        if seccion in self.SECCIONES_TABLA:
+            fila = self.conexion.execute(f"SELECT datos FROM {seccion} WHERE id = ?", (clave,)).fetchone()
+        else:
+            fila = self.conexion.execute("SELECT valor FROM registros WHERE seccion = ? AND clave = ?",
+                                         (seccion, clave)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def _escribir(self, seccion, clave, valor):
+        texto = json.dumps(valor, ensure_ascii=False, default=a_json)
+        self.bytes_escritos += len(texto)
+        if seccion == "usuarios":
+            self.conexion.execute("INSERT OR REPLACE INTO usuarios (id, datos) VALUES (?, ?)", (clave, texto))
+        elif seccion == "planes":
+            self.conexion.execute("INSERT OR REPLACE INTO planes (id, usuario_id, datos) VALUES (?, ?, ?)",
+                                  (clave, valor["usuario_id"], texto))
+        else:
+            self.conexion.execute("INSERT OR REPLACE INTO registros (seccion, clave, valor) VALUES (?, ?, ?)",
+                                  (seccion, clave, texto))
+
+    def _insertar_sesion(self, sesion):
+        fila = self.conexion.execute("SELECT usuario_id FROM planes WHERE id = ?", (sesion["plan_id"],)).fetchone()
+        self.bytes_escritos += len(json.dumps(sesion, ensure_ascii=False, default=a_json))
+        self.conexion.execute(
+            "INSERT INTO sesiones (plan_id, usuario_id, duracion, puntuacion, fecha, hora, notas) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (sesion["plan_id"], fila[0] if fila else None, sesion["duracion"], sesion["puntuacion"],
+             sesion["fecha"], sesion.get("hora"), sesion.get("notas", "")))
+
+    def guardar(self):
+        # Sin lote abierto cada operación ya se confirmó al terminar
+        if not self._en_transaccion and self.conexion.in_transaction:
+            self._confirmar()
+
+    def compactar(self):
+        self.guardar()
+        self.conexion.execute("PRAGMA optimize")
+
+    def volcar(self, datos):
+        """Reemplaza todo el contenido del almacén (usado en migraciones)"""
+        with self.conexion:
+            for tabla in ("usuarios", "planes", "sesiones", "registros"):
+                self.conexion.execute(f"DELETE FROM {tabla}")
+            for usuario_id, usuario in datos["usuarios"].items():
+                self._escribir("usuarios", usuario_id, usuario)
+            for plan_id, plan in datos["planes"].items():
+                self._escribir("planes", plan_id, plan)
+            for sesion in datos["sesiones"]:
+                self._insertar_sesion(sesion)
+            for seccion, valores in datos.items():
+                if seccion in self.SECCIONES_TABLA:
+                    continue
+                for clave, valor in valores.items():
+                    self._escribir(seccion, clave, valor)
+        self.datos = datos
+
+    # ===== CONSULTAS =====
+
+    def planes_de_usuario(self, usuario_id):
+        return {plan_id: Plan.desde_dict(json.loads(valor)) for plan_id, valor in self.conexion.execute(
+            "SELECT id, datos FROM planes WHERE usuario_id = ?", (usuario_id,))}
+
+    def sesiones_de_usuario(self, usuario_id):
+        return [self._fila_a_sesion(fila) for fila in self.conexion.execute(
+            "SELECT plan_id, duracion, puntuacion, fecha, hora, notas FROM sesiones "
+            "WHERE usuario_id = ? ORDER BY id", (usuario_id,))]
+
+    def contar_sesiones_usuario(self, usuario_id):
+        return self.conexion.execute("SELECT COUNT(*) FROM sesiones WHERE usuario_id = ?",
+                                     (usuario_id,)).fetchone()[0]
@@ -0,0 +1,345 @@
+# benchmark.py - Banco de pruebas de rendimiento con datos sintéticos: tiempos, memoria pico y escalado
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from almacenamiento import ALMACENES, crear_repositorio, datos_vacios
+from logros import contadores_usuario
+from rachas import racha_vacia
+from registros import convertir_registros
+from servicio import NIVELES, ServicioAprendizaje
+
+TEMAS = ("python", "matemáticas", "inglés", "javascript", "historia", "variables", "sql", "física")
+NOTAS = ("", "", "", "Debo practicar ejercicios", "Repasar la teoría", "Muy productiva")
+# Fechas fijas: los mismos parámetros y la misma semilla dan exactamente los mismos datos
+FECHA_BASE = date(2025, 1, 6)
+DIAS_HISTORIAL = 180
+# Diferencias menores que esto (en segundos) son ruido, no regresiones
+UMBRAL_RUIDO = 0.005
+
+
+def generar_datos(usuarios, planes, sesiones, semilla=42):
+    """Datos con la forma de data/usuarios.json: `usuarios` usuarios, `planes` planes
+    (al menos uno por usuario) y `sesiones` sesiones en orden cronológico"""
+    azar = random.Random(semilla)
+    datos = datos_vacios()
+    datos.pop("perfiles", None)  # Como los datos antiguos: se construyen al cargar
+
+    for i in range(1, usuarios + 1):
+        usuario_id = f"user_{i}"
+        datos["usuarios"][usuario_id] = {
+            "nombre": f"Usuario {i}",
+            "nivel": azar.choice(NIVELES),
+            "intereses": azar.sample(TEMAS, azar.randint(1, 3)),
+            "fecha_registro": (FECHA_BASE + timedelta(days=azar.randint(0, 30))).isoformat()
+        }
+        datos["puntos"][usuario_id] = 0
+        datos["logros"][usuario_id] = []
+        datos["rachas"][usuario_id] = racha_vacia()
+
+    for j in range(1, max(planes, usuarios) + 1):
+        usuario_id = f"user_{j}" if j <= usuarios else f"user_{azar.randint(1, usuarios)}"
+        tema = azar.choice(datos["usuarios"][usuario_id]["intereses"])
+        creacion = FECHA_BASE + timedelta(days=azar.randint(0, 60))
+        datos["planes"][f"plan_{j}"] = {
+            "usuario_id": usuario_id,
+            "tema": tema,
+            "objetivos": [f"Entender los fundamentos de {tema}", f"Practicar {tema} regularmente",
+                          f"Aplicar {tema} en situaciones reales"],
+            "recursos": [f"🔍 Buscar cursos online de {tema}", f"🎥 Videos educativos de {tema}"],
+            "progreso": 0,
+            "fecha_creacion": creacion.isoformat(),
+            "fecha_limite": (creacion + timedelta(days=30)).isoformat()
+        }
+
+    plan_ids = list(datos["planes"])
+    momentos = sorted((azar.randint(0, DIAS_HISTORIAL - 1), azar.randint(6 * 60, 23 * 60 + 59))
+                      for _ in range(sesiones))
+    for dia, minuto in momentos:
+        datos["sesiones"].append({
+            "plan_id": azar.choice(plan_ids),
+            "duracion": azar.randint(10, 120),
+            "puntuacion": float(azar.randint(1, 10)),
+            "fecha": (FECHA_BASE + timedelta(days=dia)).isoformat(),
+            "hora": f"{minuto // 60:02d}:{minuto % 60:02d}",
+            "notas": azar.choice(NOTAS)
+        })
+    return datos
+
+
+def preparar_carpeta(carpeta, almacen, datos):
+    """Escribe los datos en el almacén y deja puntos, logros, rachas y progreso coherentes con las sesiones"""
+    os.makedirs(carpeta, exist_ok=True)
+    crear_repositorio(almacen, carpeta).volcar(convertir_registros(datos))
+    servicio = ServicioAprendizaje(almacen, carpeta)
+    servicio.recalcular_historial(aplicar=True)
+    servicio.compactar_datos()
+    servicio.cerrar()
+
+
+@contextlib.contextmanager
+def consola_simulada(entradas=""):
+    """input() lee de `entradas` y lo que se imprime se descarta"""
+    stdin = sys.stdin
+    sys.stdin = io.StringIO(entradas)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        sys.stdin = stdin
+
+
+def medir(paso, repeticiones):
+    """Mejor tiempo de `repeticiones` ejecuciones y memoria pico (en una ejecución aparte con tracemalloc,
+    que ralentiza). `paso()` prepara lo que no se mide y devuelve (función a medir, operaciones)"""
+    mejor = math.inf
+    for _ in range(repeticiones):
+        funcion, operaciones = paso()
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+
+    funcion, operaciones = paso()
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"segundos": round(mejor, 6), "operaciones": operaciones,
+            "ms_por_operacion": round(mejor * 1000 / operaciones, 4), "pico_mib": round(pico / 2**20, 3)}
+
+
+class Banco:
+    """Los caminos medidos, sobre una carpeta ya preparada. El asistente de consola trabaja en
+    <raiz>/data, así que el banco se ejecuta con la raíz como directorio actual"""
+
+    def __init__(self, raiz, almacen, operaciones, semilla):
+        # Importación diferida: el asistente solo hace falta para el dashboard
+        from assistant import AsistenteAprendizaje
+
+        self.carpeta = os.path.join(raiz, "data")
+        self.almacen = almacen
+        self.operaciones = operaciones
+        self.azar = random.Random(semilla)
+        with consola_simulada():
+            self.asistente = AsistenteAprendizaje(almacen)
+        self.asistente.limpiar_pantalla = lambda: None
+        self.servicio = self.asistente.servicio
+        self.servicio.guardado_automatico = True
+        usuarios = sorted(self.servicio.datos["usuarios"])
+        self.muestra = self.azar.sample(usuarios, min(operaciones, len(usuarios)))
+        self.plan_ids = sorted(self.servicio.datos["planes"])
+        # Sesiones nuevas justo después del historial generado
+        self.momento = datetime.combine(FECHA_BASE + timedelta(days=DIAS_HISTORIAL), datetime.min.time())
+
+    def _siguiente_momento(self):
+        self.momento += timedelta(minutes=7)
+        return self.momento
+
+    def cargar_datos(self):
+        # Arranque en frío: sin la caché binaria del almacén JSON
+        def funcion():
+            repositorio = crear_repositorio(self.almacen, self.carpeta)
+            if hasattr(repositorio, "cache"):
+                repositorio.cache.invalidar()
+            ServicioAprendizaje(self.almacen, self.carpeta)
+        return funcion, 1
+
+    def cargar_datos_con_cache(self):
+        ServicioAprendizaje(self.almacen, self.carpeta)  # Deja la caché al día
+        return (lambda: ServicioAprendizaje(self.almacen, self.carpeta)), 1
+
+    def registrar_sesion(self):
+        def funcion():
+            for _ in range(self.operaciones):
+                self.servicio.registrar_sesion(self.azar.choice(self.plan_ids), self.azar.randint(10, 120),
+                                               self.azar.randint(1, 10), timestamp=self._siguiente_momento())
+        return funcion, self.operaciones
+
+    def guardar_datos(self):
+        # Sesiones pendientes de guardar, y se mide el guardado de todas juntas
+        self.servicio.guardado_automatico = False
+        for _ in range(self.operaciones):
+            self.servicio.registrar_sesion(self.azar.choice(self.plan_ids), self.azar.randint(10, 120),
+                                           self.azar.randint(1, 10), timestamp=self._siguiente_momento())
+        self.servicio.guardado_automatico = True
+        return self.servicio.guardar_datos, 1
+
+    def compactar_datos(self):
+        return self.servicio.compactar_datos, 1
+
+    def verificar_logros(self):
+        datos = self.servicio.datos
+        contadores = []
+        for usuario_id in self.muestra:
+            sesiones = self.servicio.repositorio.sesiones_de_usuario(usuario_id)
+            if sesiones:
+                racha = datos["rachas"].get(usuario_id) or racha_vacia()
+                contadores.append((usuario_id, contadores_usuario(datos["perfiles"][usuario_id],
+                                                                  racha["actual"], sesiones[-1])))
+
+        def funcion():
+            for usuario_id, contadores_de_usuario in contadores:
+                self.servicio.verificar_logros(usuario_id, contadores_de_usuario)
+        return funcion, max(1, len(contadores))
+
+    def analizar_patrones(self):
+        recomendador = self.servicio.recomendador()
+        return (lambda: [recomendador.analizar_patrones(usuario_id) for usuario_id in self.muestra]), len(self.muestra)
+
+    def generar_recomendaciones_personalizadas(self):
+        recomendador = self.servicio.recomendador()
+
+        def funcion():
+            # Se mide el cálculo: la caché de recomendaciones se vacía antes
+            self.servicio.cache_recomendaciones.vaciar()
+            return [recomendador.generar_recomendaciones_personalizadas(usuario_id) for usuario_id in self.muestra]
+        return funcion, len(self.muestra)
+
+    def recomendaciones_con_cache(self):
+        recomendador = self.servicio.recomendador()
+        for usuario_id in self.muestra:
+            recomendador.paquete(usuario_id)
+        return (lambda: [recomendador.generar_recomendaciones_personalizadas(usuario_id)
+                         for usuario_id in self.muestra]), len(self.muestra)
+
+    def dashboard_inteligente(self):
+        def funcion():
+            for usuario_id in self.muestra:
+                with consola_simulada(f"{usuario_id}\n"):
+                    self.asistente.dashboard_inteligente()
+        return funcion, len(self.muestra)
+
+
+PASOS = ("cargar_datos", "cargar_datos_con_cache", "registrar_sesion", "guardar_datos", "compactar_datos",
+         "verificar_logros", "analizar_patrones", "generar_recomendaciones_personalizadas",
+         "recomendaciones_con_cache", "dashboard_inteligente")
+
+
+def ejecutar_escala(args, escala):
+    """Genera los datos de una escala en una carpeta temporal y mide todos los pasos"""
+    tamanos = {"usuarios": args.usuarios * escala, "planes": args.planes * escala,
+               "sesiones": args.sesiones * escala}
+    datos = generar_datos(semilla=args.semilla, **tamanos)
+    directorio_anterior = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as raiz:
+        preparar_carpeta(os.path.join(raiz, "data"), args.almacen, datos)
+        del datos
+        os.chdir(raiz)
+        try:
+            banco = Banco(raiz, args.almacen, args.operaciones, args.semilla)
+            resultados = {}
+            for nombre in args.pasos:
+                resultados[nombre] = medir(getattr(banco, nombre), args.repeticiones)
+            banco.servicio.cerrar()
+        finally:
+            os.chdir(directorio_anterior)
+    return tamanos, resultados
+
+
+def exponente(puntos):
+    """Pendiente log-log entre la escala menor y la mayor: ~0 constante, ~1 lineal, ~2 cuadrático"""
+    (escala_a, tiempo_a), (escala_b, tiempo_b) = puntos[0], puntos[-1]
+    if escala_a == escala_b or tiempo_a <= 0 or tiempo_b <= 0:
+        return None
+    return math.log(tiempo_b / tiempo_a) / math.log(escala_b / escala_a)
+
+
+def comparar_con_base(base, informe, tolerancia):
+    """Pasos más lentos o con más memoria que en la línea base (mismos parámetros)"""
+    regresiones = []
+    for escala, pasos in informe["resultados"].items():
+        for nombre, actual in pasos.items():
+            anterior = base.get("resultados", {}).get(escala, {}).get(nombre)
+            if anterior is None:
+                continue
+            if (actual["segundos"] > anterior["segundos"] * (1 + tolerancia)
+                    and actual["segundos"] - anterior["segundos"] > UMBRAL_RUIDO):
+                regresiones.append(f"x{escala} {nombre}: {anterior['segundos']:.3f}s → {actual['segundos']:.3f}s")
+            if actual["pico_mib"] > anterior["pico_mib"] * (1 + tolerancia) and actual["pico_mib"] - anterior["pico_mib"] > 1:
+                regresiones.append(f"x{escala} {nombre}: {anterior['pico_mib']:.1f} MiB → {actual['pico_mib']:.1f} MiB")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el rendimiento del asistente con datos sintéticos reproducibles")
+    parser.add_argument("--usuarios", type=int, default=200, help="Usuarios en la escala x1")
+    parser.add_argument("--planes", type=int, default=600, help="Planes en la escala x1")
+    parser.add_argument("--sesiones", type=int, default=20000, help="Sesiones en la escala x1")
+    parser.add_argument("--escalas", default="1,2,4", help="Multiplicadores de tamaño, separados por comas")
+    parser.add_argument("--operaciones", type=int, default=100,
+                        help="Sesiones a registrar y usuarios a analizar en cada paso")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Se toma el mejor tiempo")
+    parser.add_argument("--pasos", default=",".join(PASOS), help=f"Pasos a medir (por defecto todos: {', '.join(PASOS)})")
+    parser.add_argument("--almacen", choices=ALMACENES, default="json")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--base", default="benchmark_base.json", help="Archivo de línea base")
+    parser.add_argument("--guardar-base", action="store_true", help="Guardar los resultados como nueva línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Empeoramiento admitido frente a la base (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    args.pasos = [paso.strip() for paso in args.pasos.split(",") if paso.strip()]
+    desconocidos = [paso for paso in args.pasos if paso not in PASOS]
+    if desconocidos:
+        parser.error(f"Pasos desconocidos: {', '.join(desconocidos)}")
+    try:
+        escalas = sorted({int(escala) for escala in args.escalas.split(",")})
+    except ValueError:
+        parser.error("--escalas debe ser una lista de enteros, por ejemplo 1,2,4")
+
+    parametros = {campo: getattr(args, campo) for campo in
+                  ("usuarios", "planes", "sesiones", "operaciones", "almacen", "semilla")}
+    informe = {"parametros": parametros, "fecha": datetime.now().isoformat(timespec="seconds"), "resultados": {}}
+
+    for escala in escalas:
+        tamanos, resultados = ejecutar_escala(args, escala)
+        informe["resultados"][str(escala)] = resultados
+        print(f"\n📏 Escala x{escala}: {tamanos['usuarios']} usuarios, {tamanos['planes']} planes, "
+              f"{tamanos['sesiones']} sesiones ({args.almacen})")
+        print(f"   {'paso':<40}{'total':>10}{'por op.':>13}{'pico':>12}")
+        for nombre, resultado in resultados.items():
+            print(f"   {nombre:<40}{resultado['segundos']:>9.3f}s{resultado['ms_por_operacion']:>10.2f} ms"
+                  f"{resultado['pico_mib']:>8.1f} MiB")
+
+    if len(escalas) > 1:
+        print("\n📈 Escalado del tiempo por operación (exponente ~1 = lineal en el tamaño de los datos)")
+        for nombre in args.pasos:
+            puntos = [(escala, informe["resultados"][str(escala)][nombre]["ms_por_operacion"]) for escala in escalas]
+            curva = "  ".join(f"x{escala}: {ms:.2f} ms" for escala, ms in puntos)
+            pendiente = exponente(puntos)
+            print(f"   {nombre:<40}{curva}  ~{pendiente:.2f}" if pendiente is not None else f"   {nombre:<40}{curva}")
+
+    codigo = 0
+    if os.path.exists(args.base) and not args.guardar_base:
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        if base.get("parametros") != parametros:
+            print(f"\nℹ️ {args.base} se generó con otros parámetros: no se compara")
+        else:
+            regresiones = comparar_con_base(base, informe, args.tolerancia)
+            if regresiones:
+                print(f"\n⚠️ {len(regresiones)} regresión(es) frente a {args.base} (del {base.get('fecha', '?')}):")
+                for regresion in regresiones:
+                    print(f"   {regresion}")
+                codigo = 1
+            else:
+                print(f"\n✅ Sin regresiones frente a {args.base} (tolerancia {args.tolerancia:.0%})")
+    if args.guardar_base:
+        with open(args.base, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Línea base guardada en {args.base}")
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
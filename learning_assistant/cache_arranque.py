@@ -0,0 +1,80 @@
+# cache_arranque.py - Caché binaria (pickle) de los datos ya cargados para arrancar rápido
+import hashlib
+import os
+import pickle
+from guardado import escribir_atomico
+from instrumentacion import bloque, contar_bytes
+
+VERSION_CACHE = 3
+
+
+def firma_archivo(ruta, limite=None):
+    """Tamaño, fecha de modificación y hash (de los primeros `limite` bytes) de un archivo"""
+    if not os.path.exists(ruta):
+        return None
+    info = os.stat(ruta)
+    tamano = info.st_size if limite is None else min(limite, info.st_size)
+    resumen = hashlib.blake2b(digest_size=16)
+    with open(ruta, 'rb') as f:
+        restante = tamano
+        while restante > 0:
+            bloque = f.read(min(1 << 20, restante))
+            if not bloque:
+                break
+            resumen.update(bloque)
+            restante -= len(bloque)
+    return {"tamano": info.st_size, "mtime": info.st_mtime_ns, "hash": resumen.hexdigest(), "bytes": tamano}
+
+
+class CacheArranque:
+    """Guarda datos + índices ya construidos, validados contra el snapshot JSON y el diario"""
+
+    def __init__(self, archivo_snapshot, archivo_diario):
+        self.archivo_snapshot = archivo_snapshot
+        self.archivo_diario = archivo_diario
+        base, _ = os.path.splitext(archivo_snapshot)
+        self.archivo_cache = f"{base}.cache.pickle"
+
+    def cargar(self):
+        """Devuelve el contenido de la caché si sigue siendo válido, o None"""
+        if not os.path.exists(self.archivo_cache):
+            return None
+        try:
+            with open(self.archivo_cache, 'rb') as f, bloque("pickle.load"):
+                contenido = pickle.load(f)
+                contar_bytes("pickle.load", leidos=f.tell())
+        except Exception:
+            return None
+
+        if contenido.get("version") != VERSION_CACHE:
+            return None
+
+        # El snapshot debe ser exactamente el mismo (tamaño, fecha y contenido)
+        if contenido["snapshot"] != firma_archivo(self.archivo_snapshot):
+            return None
+
+        # El diario solo puede haber crecido: la parte ya incluida debe coincidir
+        posicion = contenido["posicion_diario"]
+        if posicion:
+            prefijo = firma_archivo(self.archivo_diario, posicion)
+            if prefijo is None or prefijo["bytes"] < posicion or prefijo["hash"] != contenido["hash_diario"]:
+                return None
+        return contenido
+
+    def guardar(self, datos, indice, posicion_diario, registros_en_diario, version):
+        prefijo = firma_archivo(self.archivo_diario, posicion_diario) if posicion_diario else None
+        contenido = {
+            "version": VERSION_CACHE,
+            "snapshot": firma_archivo(self.archivo_snapshot),
+            "posicion_diario": posicion_diario,
+            "hash_diario": prefijo["hash"] if prefijo else None,
+            "registros_en_diario": registros_en_diario,
+            "version_diario": version,
+            "datos": datos,
+            "indice": indice
+        }
+        escribir_atomico(self.archivo_cache, pickle.dumps(contenido, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def invalidar(self):
+        if os.path.exists(self.archivo_cache):
+            os.remove(self.archivo_cache)
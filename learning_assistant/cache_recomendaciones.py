@@ -0,0 +1,78 @@
+# cache_recomendaciones.py - Caché LRU acotada de las recomendaciones ya calculadas por usuario
+import threading
+from collections import Counter, OrderedDict
+
+CAPACIDAD_RECOMENDACIONES = 512
+
+
+class CacheRecomendaciones:
+    """Paquetes de recomendaciones por usuario, válidos mientras no cambie su versión de datos.
+
+    El servicio sube la versión de un usuario con cada sesión, plan o punto nuevo; un paquete
+    guardado con otra versión, otro día (las rachas dependen de hoy) o antes de cambios de
+    otros procesos se vuelve a calcular. Se descartan primero los usados hace más tiempo."""
+
+    def __init__(self, capacidad=CAPACIDAD_RECOMENDACIONES):
+        self.capacidad = capacidad
+        self.paquetes = OrderedDict()
+        self.versiones = Counter()
+        self.aciertos = 0
+        self.fallos = 0
+        self.cambios_externos = None
+        # Sube al vaciar la caché: un cálculo empezado antes ya no se guarda
+        self.generacion = 0
+        self.cerrojo = threading.Lock()
+
+    def __len__(self):
+        return len(self.paquetes)
+
+    def invalidar(self, usuario_id):
+        """Los datos del usuario cambiaron: su paquete deja de valer"""
+        with self.cerrojo:
+            self.versiones[usuario_id] += 1
+
+    def sincronizar(self, cambios_externos):
+        """Otro proceso cambió los datos: no se sabe de qué usuarios, se vacía la caché"""
+        with self.cerrojo:
+            if cambios_externos != self.cambios_externos:
+                self.paquetes.clear()
+                self.generacion += 1
+                self.cambios_externos = cambios_externos
+
+    def vaciar(self):
+        with self.cerrojo:
+            self.paquetes.clear()
+            self.generacion += 1
+
+    def obtener(self, usuario_id, dia, calcular):
+        """Paquete del usuario para el día (ordinal); si no está al día se calcula con calcular(usuario_id)"""
+        with self.cerrojo:
+            marca = (self.generacion, self.versiones[usuario_id], dia)
+            guardado = self.paquetes.get(usuario_id)
+            if guardado is not None and guardado[0] == marca:
+                self.paquetes.move_to_end(usuario_id)
+                self.aciertos += 1
+                return guardado[1]
+            self.fallos += 1
+
+        # Se calcula sin el cerrojo; si entretanto cambió la versión, el paquete no se guarda
+        paquete = calcular(usuario_id)
+        with self.cerrojo:
+            if (self.generacion, self.versiones[usuario_id], dia) == marca:
+                self.paquetes[usuario_id] = (marca, paquete)
+                self.paquetes.move_to_end(usuario_id)
+                while len(self.paquetes) > self.capacidad:
+                    self.paquetes.popitem(last=False)
+        return paquete
+
+    def resumen(self):
+        """Aciertos, fallos, tasa de aciertos y ocupación"""
+        with self.cerrojo:
+            consultas = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else 0.0,
+                "paquetes": len(self.paquetes),
+                "capacidad": self.capacidad
+            }
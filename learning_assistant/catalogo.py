@@ -0,0 +1,94 @@
+# catalogo.py - Catálogo de temas (temas.json) cargado una vez, con búsqueda sin acentos por nombre, alias y prefijo
+import json
+import os
+import re
+import unicodedata
+
+ARCHIVO_CATALOGO = os.environ.get("ASISTENTE_CATALOGO",
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), "temas.json"))
+# Marca de fin de nombre en el trie (ningún carácter normalizado es vacío)
+FIN = ""
+
+
+def normalizar(texto):
+    """'  Matemáticas (Básicas) ' -> 'matematicas basicas': sin acentos, en minúsculas y con
+    un solo espacio entre palabras"""
+    sin_acentos = "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+    return re.sub(r"[\W_]+", " ", sin_acentos.casefold()).strip()
+
+
+class CatalogoTemas:
+    """Temas con objetivos por nivel, recursos y plan de IA. Un nombre se resuelve con el índice
+    (nombre o alias exacto) o con el trie: el nombre o alias más largo que empiece en una palabra del
+    texto y acabe en fin de palabra ("python 3", "curso de ingles"), sin recorrer el catálogo"""
+
+    def __init__(self, temas):
+        self.temas = temas
+        self.indice = {}
+        self.trie = {}
+        for clave, tema in temas.items():
+            for nombre in [clave] + tema.get("alias", []):
+                normalizado = normalizar(nombre)
+                if not normalizado:
+                    continue
+                self.indice.setdefault(normalizado, clave)
+                nodo = self.trie
+                for caracter in normalizado:
+                    nodo = nodo.setdefault(caracter, {})
+                nodo.setdefault(FIN, clave)
+
+    @classmethod
+    def desde_archivo(cls, ruta=ARCHIVO_CATALOGO):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)["temas"])
+
+    def __len__(self):
+        return len(self.temas)
+
+    def resolver(self, tema):
+        """Clave del catálogo para un nombre de tema escrito libremente, o None"""
+        texto = normalizar(tema)
+        clave = self.indice.get(texto)
+        if clave is not None:
+            return clave
+        inicio = 0
+        while inicio < len(texto):
+            encontrada = self._mas_largo_desde(texto, inicio)
+            if encontrada is not None:
+                return encontrada
+            siguiente = texto.find(" ", inicio)
+            if siguiente < 0:
+                break
+            inicio = siguiente + 1
+        return None
+
+    def _mas_largo_desde(self, texto, inicio):
+        nodo, encontrada = self.trie, None
+        for posicion in range(inicio, len(texto)):
+            nodo = nodo.get(texto[posicion])
+            if nodo is None:
+                break
+            if FIN in nodo and (posicion + 1 == len(texto) or texto[posicion + 1] == " "):
+                encontrada = nodo[FIN]
+        return encontrada
+
+    def tema(self, tema):
+        clave = self.resolver(tema)
+        return self.temas[clave] if clave is not None else None
+
+    # Las listas se devuelven copiadas: acaban dentro de los planes guardados
+
+    def objetivos(self, tema, nivel):
+        objetivos = (self.tema(tema) or {}).get("objetivos", {}).get(nivel)
+        return list(objetivos) if objetivos is not None else None
+
+    def recursos(self, tema):
+        recursos = (self.tema(tema) or {}).get("recursos")
+        return list(recursos) if recursos is not None else None
+
+    def plan_ia(self, tema, nivel):
+        plan = (self.tema(tema) or {}).get("plan_ia", {}).get(nivel)
+        return {campo: list(valores) for campo, valores in plan.items()} if plan is not None else None
+
+
+CATALOGO = CatalogoTemas.desde_archivo()
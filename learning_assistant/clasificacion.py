@@ -0,0 +1,144 @@
+# clasificacion.py - Tablas de clasificación por puntos (general, por tema y por semana) con orden mantenido
+import bisect
+import functools
+import math
+from collections import defaultdict
+from datetime import date
+from catalogo import normalizar
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:  # sortedcontainers es opcional: sin él se usa una lista ordenada con bisect
+    SortedList = None
+
+SORTEDCONTAINERS_DISPONIBLE = SortedList is not None
+
+
+class ListaOrdenada:
+    """Lo que se usa de SortedList, sobre una lista normal: búsquedas con bisect en O(log n)
+    (insertar y borrar mueven memoria, que para miles de usuarios es despreciable)"""
+
+    def __init__(self, valores=()):
+        self.valores = sorted(valores)
+
+    def __len__(self):
+        return len(self.valores)
+
+    def __getitem__(self, posicion):
+        return self.valores[posicion]
+
+    def add(self, valor):
+        bisect.insort(self.valores, valor)
+
+    def remove(self, valor):
+        del self.valores[self.index(valor)]
+
+    def bisect_left(self, valor):
+        return bisect.bisect_left(self.valores, valor)
+
+    def index(self, valor):
+        posicion = bisect.bisect_left(self.valores, valor)
+        if posicion == len(self.valores) or self.valores[posicion] != valor:
+            raise ValueError(f"{valor!r} no está en la lista")
+        return posicion
+
+
+def lista_ordenada(valores=()):
+    return SortedList(valores) if SortedList is not None else ListaOrdenada(valores)
+
+
+@functools.lru_cache(maxsize=4096)
+def semana_iso(dia):
+    """Ordinal del día -> '2026-W42'"""
+    anio, semana, _ = date.fromordinal(dia).isocalendar()
+    return f"{anio}-W{semana:02d}"
+
+
+class TablaPuntos:
+    """Participantes ordenados por puntos (de más a menos); empates por id"""
+
+    def __init__(self, puntos=None):
+        self.puntos = dict(puntos or {})
+        # Entradas (-puntos, id): el orden natural de la lista es la clasificación
+        self.orden = lista_ordenada((-valor, participante) for participante, valor in self.puntos.items())
+
+    def __len__(self):
+        return len(self.puntos)
+
+    def __contains__(self, participante):
+        return participante in self.puntos
+
+    def actualizar(self, participante, puntos):
+        anterior = self.puntos.get(participante)
+        if anterior == puntos:
+            return
+        if anterior is not None:
+            self.orden.remove((-anterior, participante))
+        self.puntos[participante] = puntos
+        self.orden.add((-puntos, participante))
+
+    def sumar(self, participante, puntos):
+        self.actualizar(participante, self.puntos.get(participante, 0) + puntos)
+
+    def top(self, k=10):
+        """[(id, puntos)] de los k primeros"""
+        return [(participante, -valor) for valor, participante in self.orden[:k]]
+
+    def posicion(self, participante):
+        """Puesto del participante (1 = primero); con empate comparten puesto"""
+        # (-puntos,) va antes que cualquier (-puntos, id): cuenta solo a los que tienen más puntos
+        return self.orden.bisect_left((-self.puntos[participante],)) + 1
+
+    def vecinos(self, participante, n=2):
+        """[(id, puntos)] de los n de delante y los n de detrás, incluido el participante"""
+        posicion = self.orden.index((-self.puntos[participante], participante))
+        return [(otro, -valor) for valor, otro in self.orden[max(0, posicion - n):posicion + n + 1]]
+
+    def contar_desde(self, minimo):
+        """Participantes con al menos `minimo` puntos"""
+        return self.orden.bisect_left((math.nextafter(-minimo, math.inf),))
+
+
+class Clasificacion:
+    """Tabla general por puntos totales y tablas por tema y por semana ISO con los puntos de las sesiones"""
+
+    def __init__(self, datos, puntos_sesion):
+        self.datos = datos
+        self.puntos_sesion = puntos_sesion
+        self.general = TablaPuntos(datos["puntos"])
+        # Se construyen con una pasada por las sesiones la primera vez que se consultan
+        self.por_tema = None
+        self.por_semana = None
+
+    def _construir_parciales(self):
+        por_tema = defaultdict(lambda: defaultdict(int))
+        por_semana = defaultdict(lambda: defaultdict(int))
+        planes = self.datos["planes"]
+        for sesion in self.datos["sesiones"]:
+            plan = planes.get(sesion.plan_id)
+            if plan is None:
+                continue
+            puntos = self.puntos_sesion(sesion.duracion, sesion.puntuacion)
+            por_tema[normalizar(plan["tema"])][plan["usuario_id"]] += puntos
+            por_semana[semana_iso(sesion.dia)][plan["usuario_id"]] += puntos
+        self.por_tema = {tema: TablaPuntos(puntos) for tema, puntos in por_tema.items()}
+        self.por_semana = {semana: TablaPuntos(puntos) for semana, puntos in por_semana.items()}
+
+    def actualizar_usuario(self, usuario_id, puntos):
+        self.general.actualizar(usuario_id, puntos)
+
+    def registrar_sesion(self, usuario_id, tema, dia, puntos):
+        if self.por_tema is None:
+            return  # Aún no construidas: la sesión entrará al construirlas
+        self.por_tema.setdefault(normalizar(tema), TablaPuntos()).sumar(usuario_id, puntos)
+        self.por_semana.setdefault(semana_iso(dia), TablaPuntos()).sumar(usuario_id, puntos)
+
+    def tabla(self, tema=None, semana=None):
+        """Tabla general, de un tema o de una semana ('AAAA-Www')"""
+        if tema is None and semana is None:
+            return self.general
+        if self.por_tema is None:
+            self._construir_parciales()
+        if tema is not None:
+            return self.por_tema.get(normalizar(tema)) or TablaPuntos()
+        return self.por_semana.get(semana) or TablaPuntos()
@@ -0,0 +1,154 @@
+# columnar.py - Vista columnar (NumPy) de las sesiones para análisis vectorizados
+from catalogo import normalizar
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él se usan los bucles de siempre
+    np = None
+
+NUMPY_DISPONIBLE = np is not None
+
+# Límites superiores (inclusive) de los rangos de duración de recomendar_duracion_ideal
+LIMITES_DURACION = (20, 45, 90)
+RANGOS_DURACION = ("corta", "media", "larga", "muy_larga")
+
+
+class SesionesColumnares:
+    """Columnas NumPy de duración, puntuación, fecha, minuto del día, plan y usuario"""
+
+    COLUMNAS = (("duracion", "int32"), ("puntuacion", "float64"), ("dia", "int32"),
+                ("minuto", "int16"), ("plan", "int32"), ("usuario", "int32"), ("tema", "int32"))
+
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("NumPy no está instalado")
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.n = 0
+        self.capacidad = 0
+        self.columnas = {nombre: np.empty(0, dtype=tipo) for nombre, tipo in self.COLUMNAS}
+        self.usuarios, self.indice_usuario = [], {}
+        self.planes, self.indice_plan = [], {}
+        self.temas, self.indice_tema = [], {}
+
+    @classmethod
+    def desde_datos(cls, datos):
+        columnar = cls()
+        columnar.sincronizar(datos)
+        return columnar
+
+    def __getattr__(self, nombre):
+        # Acceso a las columnas ya recortadas: columnar.duracion, columnar.usuario...
+        columnas = self.__dict__.get("columnas")
+        if columnas is not None and nombre in columnas:
+            return columnas[nombre][:self.n]
+        raise AttributeError(nombre)
+
+    def _codigo(self, valor, lista, indice):
+        codigo = indice.get(valor)
+        if codigo is None:
+            codigo = indice[valor] = len(lista)
+            lista.append(valor)
+        return codigo
+
+    def _reservar(self, total):
+        if total <= self.capacidad:
+            return
+        nueva = max(total, self.capacidad * 2, 1024)
+        for nombre, tipo in self.COLUMNAS:
+            columna = np.empty(nueva, dtype=tipo)
+            columna[:self.n] = self.columnas[nombre][:self.n]
+            self.columnas[nombre] = columna
+        self.capacidad = nueva
+
+    def sincronizar(self, datos):
+        """Añade las sesiones nuevas desde la última sincronización (amortizado O(nuevas))"""
+        sesiones = datos["sesiones"]
+        if len(sesiones) < self.n:
+            # Los datos se han reemplazado: empezar de cero
+            self._reiniciar()
+        if len(sesiones) == self.n:
+            return self
+
+        self._reservar(len(sesiones))
+        c = self.columnas
+        planes = datos["planes"]
+        for i in range(self.n, len(sesiones)):
+            sesion = sesiones[i]
+            plan = planes.get(sesion.plan_id, {})
+            c["duracion"][i] = sesion.duracion
+            c["puntuacion"][i] = sesion.puntuacion
+            c["dia"][i] = sesion.dia
+            c["minuto"][i] = sesion.minuto if sesion.minuto is not None else -1
+            c["plan"][i] = self._codigo(sesion.plan_id, self.planes, self.indice_plan)
+            c["usuario"][i] = (self._codigo(plan["usuario_id"], self.usuarios, self.indice_usuario)
+                               if "usuario_id" in plan else -1)
+            # Temas normalizados, como en los resúmenes ("Python" y "python " son el mismo tema)
+            c["tema"][i] = (self._codigo(normalizar(plan["tema"]), self.temas, self.indice_tema)
+                            if "tema" in plan else -1)
+        self.n = len(sesiones)
+        return self
+
+    def _filtro(self, usuario_id):
+        if usuario_id is None:
+            return slice(0, self.n)
+        return self.usuario == self.indice_usuario.get(usuario_id, -2)
+
+    # ===== AGREGADOS =====
+
+    def totales(self, usuario_id=None):
+        filtro = self._filtro(usuario_id)
+        duracion = self.duracion[filtro]
+        return {
+            "sesiones": int(duracion.size),
+            "tiempo_total": int(duracion.sum(dtype=np.int64)),
+            "suma_puntuacion": float(self.puntuacion[filtro].sum())
+        }
+
+    def por_usuario(self):
+        """Totales por usuario con un group-by vectorizado"""
+        validos = self.usuario >= 0
+        usuario = self.usuario[validos]
+        n_usuarios = len(self.usuarios)
+        sesiones = np.bincount(usuario, minlength=n_usuarios)
+        tiempo = np.bincount(usuario, weights=self.duracion[validos], minlength=n_usuarios)
+        puntuacion = np.bincount(usuario, weights=self.puntuacion[validos], minlength=n_usuarios)
+
+        # Temas distintos: pares (usuario, tema) únicos contados por usuario
+        tema = self.tema[validos]
+        con_tema = tema >= 0
+        n_temas = max(len(self.temas), 1)
+        pares = np.unique(usuario[con_tema].astype(np.int64) * n_temas + tema[con_tema])
+        temas = np.bincount(pares // n_temas, minlength=n_usuarios)
+
+        return {
+            usuario_id: {
+                "total_tiempo": int(tiempo[i]),
+                "total_sesiones": int(sesiones[i]),
+                "suma_puntuacion": float(puntuacion[i]),
+                "temas_estudiados": int(temas[i])
+            }
+            for i, usuario_id in enumerate(self.usuarios) if sesiones[i]
+        }
+
+    def dias_semana(self, usuario_id=None):
+        """Sesiones por día de la semana (Lunes = 0)"""
+        dias = self.dia[self._filtro(usuario_id)]
+        # El ordinal 1 (1 de enero del año 1) fue lunes
+        return np.bincount((dias - 1) % 7, minlength=7).tolist()
+
+    def histograma_horas(self, usuario_id=None):
+        minutos = self.minuto[self._filtro(usuario_id)]
+        return np.bincount(minutos[minutos >= 0] // 60, minlength=24).tolist()
+
+    def satisfaccion_por_duracion(self, usuario_id=None):
+        """Número de sesiones y satisfacción media por rango de duración"""
+        filtro = self._filtro(usuario_id)
+        rangos = np.searchsorted(LIMITES_DURACION, self.duracion[filtro], side="left")
+        cantidad = np.bincount(rangos, minlength=len(RANGOS_DURACION))
+        suma = np.bincount(rangos, weights=self.puntuacion[filtro], minlength=len(RANGOS_DURACION))
+        return {
+            nombre: (int(cantidad[i]), float(suma[i] / cantidad[i]))
+            for i, nombre in enumerate(RANGOS_DURACION) if cantidad[i]
+        }
@@ -0,0 +1,61 @@
+# derivados.py - Lo que se deduce de cada sesión nueva: perfil (con tendencias), resúmenes y racha.
+# El diario solo guarda la sesión; al reproducirla estos datos se vuelven a calcular igual
+from catalogo import normalizar
+from perfiles import actualizar_perfil, perfil_vacio
+from rachas import construir_racha, racha_vacia, sumar_dia
+from resumenes import actualizar_resumen, resumen_vacio
+
+
+def sumar_a_perfil(perfiles, usuario_id, sesion, tema):
+    perfil = perfiles.get(usuario_id)
+    if perfil is None:
+        perfil = perfiles[usuario_id] = perfil_vacio()
+    return actualizar_perfil(perfil, sesion, tema)
+
+
+def sumar_a_resumenes(datos, usuario_id, sesion, tema):
+    """Suma la sesión a los cubos de su día y su semana, del usuario y del tema. Devuelve
+    [(sección, clave, resumen, creado, día, semana, tema_nuevo)] para anotar solo lo tocado"""
+    tocados = []
+    for seccion, clave, tema_cubo in (("resumenes", usuario_id, tema), ("resumenes_temas", normalizar(tema), None)):
+        resumenes = datos.setdefault(seccion, {})
+        resumen = resumenes.get(clave)
+        creado = resumen is None
+        if creado:
+            resumen = resumenes[clave] = resumen_vacio(tema_cubo is not None)
+        dia, semana, tema_nuevo = actualizar_resumen(resumen, sesion, tema_cubo)
+        tocados.append((seccion, clave, resumen, creado, dia, semana, tema_nuevo))
+    return tocados
+
+
+def sumar_a_racha(rachas, usuario_id, dia, dias_de_usuario):
+    """Añade el día a la racha; devuelve (racha, largo de la racha de ese día).
+    `dias_de_usuario()` da todos sus días, para rehacer una racha guardada sin tramos"""
+    racha = rachas.get(usuario_id)
+    if racha is None:
+        racha = rachas[usuario_id] = racha_vacia()
+    if "tramos" not in racha:
+        racha.update(construir_racha(dias_de_usuario()))
+    return racha, sumar_dia(racha, dia)
+
+
+def derivar_cambio(datos, cambio):
+    """Tras reproducir un registro del diario: si es una sesión nueva, actualiza lo que se deduce de
+    ella. Las secciones que aún no existen se dejan a las migraciones del servicio (datos antiguos)"""
+    if cambio["op"] != "append" or cambio["ruta"] != ["sesiones"]:
+        return
+    sesion = cambio["valor"]
+    plan = datos.get("planes", {}).get(sesion.plan_id)
+    if plan is None:
+        return
+    usuario_id, tema = plan["usuario_id"], plan["tema"]
+    if "perfiles" in datos:
+        sumar_a_perfil(datos["perfiles"], usuario_id, sesion, tema)
+    if "resumenes_temas" in datos:
+        sumar_a_resumenes(datos, usuario_id, sesion, tema)
+
+    def dias_de_usuario():
+        planes = datos["planes"]
+        return (otra.dia for otra in datos["sesiones"]
+                if planes.get(otra.plan_id, {}).get("usuario_id") == usuario_id)
+    sumar_a_racha(datos.setdefault("rachas", {}), usuario_id, sesion.dia, dias_de_usuario)
@@ -0,0 +1,176 @@
+# diario.py - Diario de cambios append-only (JSON Lines) para los datos del asistente
+import json
+import os
+from guardado import anadir_duradero, escribir_atomico, sincronizar_archivo
+from instrumentacion import bloque, contar_bytes
+from registros import a_json, convertir_registros, registro_de_cambio
+
+# Clave del snapshot con la versión (número de cambios) que contiene
+CLAVE_VERSION = "_version"
+
+
+def aplicar_cambio(datos, cambio):
+    """Aplica un registro del diario sobre el diccionario de datos"""
+    if "valor" in cambio:
+        # Sesiones y planes pasan a registros; el cambio queda con el mismo objeto que los datos
+        cambio["valor"] = registro_de_cambio(cambio["ruta"], cambio["valor"])
+    *ruta, clave = cambio["ruta"]
+    destino = datos
+    for parte in ruta:
+        destino = destino.setdefault(parte, {})
+
+    if cambio["op"] == "set":
+        destino[clave] = cambio["valor"]
+    elif cambio["op"] == "append":
+        destino.setdefault(clave, []).append(cambio["valor"])
+    elif cambio["op"] == "del":
+        destino.pop(clave, None)
+
+
+def identidad_archivo(ruta):
+    """(inodo, tamaño, fecha) para saber si otro proceso reemplazó el archivo"""
+    try:
+        info = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return (info.st_ino, info.st_size, info.st_mtime_ns)
+
+
+class DiarioCambios:
+    """Guarda los cambios como registros pequeños en lugar de reescribir todo el archivo"""
+
+    def __init__(self, archivo_snapshot, limite_compactacion=5000):
+        self.archivo_snapshot = archivo_snapshot
+        base, _ = os.path.splitext(archivo_snapshot)
+        self.archivo_diario = f"{base}.diario.jsonl"
+        self.limite_compactacion = limite_compactacion
+        self.pendientes = []
+        self.registros_en_diario = 0
+        # Bytes del diario ya reflejados en memoria
+        self.posicion = 0
+        self.bytes_escritos = 0
+        # Versión = cambios aplicados desde el principio; cada registro lleva la suya ("v")
+        self.version = 0
+        self.identidad_snapshot = None
+        self.sin_sincronizar = False
+        # derivar(datos, cambio): recalcula lo que no se anota en el diario porque se deduce del cambio
+        self.derivar = None
+
+    def cargar(self, datos_iniciales):
+        """Carga el snapshot y reproduce encima los registros del diario"""
+        datos = datos_iniciales
+        self.identidad_snapshot = identidad_archivo(self.archivo_snapshot)
+        if self.identidad_snapshot is not None:
+            with open(self.archivo_snapshot, 'r', encoding='utf-8') as f, bloque("json.load"):
+                datos = convertir_registros(json.load(f))
+                contar_bytes("json.load", leidos=os.fstat(f.fileno()).st_size)
+        self.version = datos.pop(CLAVE_VERSION, 0)
+
+        self.registros_en_diario = 0
+        self.posicion = 0
+        self.reproducir(datos)
+        return datos
+
+    def reproducir(self, datos):
+        """Aplica los registros del diario desde self.posicion y devuelve los aplicados"""
+        aplicados = []
+        if not os.path.exists(self.archivo_diario):
+            return aplicados
+
+        inicio = self.posicion
+        with open(self.archivo_diario, 'rb') as f, bloque("diario.reproducir"):
+            f.seek(self.posicion)
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    # Última línea incompleta tras un cierre inesperado
+                    break
+                texto = linea.strip()
+                if texto:
+                    try:
+                        cambio = json.loads(texto)
+                    except json.JSONDecodeError:
+                        break
+                    # Un registro ya incluido en el snapshot no se vuelve a aplicar
+                    if cambio.get("v", self.version + 1) > self.version:
+                        self.aplicar(datos, cambio)
+                        aplicados.append(cambio)
+                        self.version = cambio.get("v", self.version + 1)
+                    self.registros_en_diario += 1
+                self.posicion += len(linea)
+        contar_bytes("diario.reproducir", leidos=self.posicion - inicio)
+        return aplicados
+
+    def aplicar(self, datos, cambio):
+        aplicar_cambio(datos, cambio)
+        if self.derivar is not None:
+            self.derivar(datos, cambio)
+
+    def cambiado_por_otro(self):
+        """True si otro proceso compactó (snapshot nuevo) desde que se cargaron los datos"""
+        if identidad_archivo(self.archivo_snapshot) != self.identidad_snapshot:
+            return True
+        return self.posicion > 0 and not os.path.exists(self.archivo_diario)
+
+    def registrar(self, op, ruta, valor=None):
+        """Anota un cambio pendiente de escribir en el diario"""
+        cambio = {"op": op, "ruta": list(ruta)}
+        if op != "del":
+            cambio["valor"] = valor
+        # Se serializa ya para conservar el valor de este momento
+        self.pendientes.append(json.dumps(cambio, ensure_ascii=False, default=a_json))
+
+    def _numerar(self):
+        # La versión se asigna al escribir (con el cerrojo tomado), no al registrar
+        lineas = []
+        for texto in self.pendientes:
+            self.version += 1
+            lineas.append(f'{{"v": {self.version}, {texto[1:]}')
+        return lineas
+
+    def escribir_pendientes(self, duradero=True):
+        """Añade los cambios pendientes al final del diario.
+
+        Con duradero=False los registros quedan visibles para otros procesos pero el
+        fsync se deja para el siguiente guardado duradero."""
+        if not self.pendientes:
+            if duradero and self.sin_sincronizar:
+                sincronizar_archivo(self.archivo_diario)
+                self.sin_sincronizar = False
+            return 0
+
+        contenido = ("\n".join(self._numerar()) + "\n").encode('utf-8')
+        if os.path.exists(self.archivo_diario) and os.path.getsize(self.archivo_diario) > self.posicion:
+            # Restos de una línea a medias (cierre inesperado): se descartan antes de seguir
+            os.truncate(self.archivo_diario, self.posicion)
+        if duradero:
+            anadir_duradero(self.archivo_diario, contenido)
+            self.sin_sincronizar = False
+        else:
+            with open(self.archivo_diario, 'ab') as f:
+                f.write(contenido)
+            self.sin_sincronizar = True
+        self.posicion += len(contenido)
+        self.bytes_escritos += len(contenido)
+        escritos = len(self.pendientes)
+        self.registros_en_diario += escritos
+        self.pendientes = []
+        return escritos
+
+    def necesita_compactar(self):
+        return self.registros_en_diario >= self.limite_compactacion
+
+    def compactar(self, datos):
+        """Vuelca los datos completos en el snapshot y vacía el diario"""
+        contenido = dict(datos)
+        contenido[CLAVE_VERSION] = self.version
+        self.bytes_escritos += escribir_atomico(self.archivo_snapshot,
+                                                json.dumps(contenido, indent=2, ensure_ascii=False,
+                                                           default=a_json))
+        self.identidad_snapshot = identidad_archivo(self.archivo_snapshot)
+
+        if os.path.exists(self.archivo_diario):
+            os.remove(self.archivo_diario)
+        self.pendientes = []
+        self.registros_en_diario = 0
+        self.posicion = 0
+        self.sin_sincronizar = False
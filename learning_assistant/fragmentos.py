@@ -0,0 +1,593 @@
+# fragmentos.py - Almacén fragmentado por usuario: índice global pequeño + un archivo por usuario
+# (y uno por tema con sus resúmenes)
+import json
+import os
+import shutil
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from urllib.parse import quote
+from diario import DiarioCambios, aplicar_cambio, identidad_archivo
+from guardado import CerrojoArchivo, apartar_archivos, escribir_atomico
+from instrumentacion import bloque, contar_bytes
+from perfiles import construir_perfiles
+from registros import a_json, como_sesion, convertir_registros
+
+# Secciones que viven en el archivo de cada usuario (o de cada tema); el resto va en el índice global
+SECCIONES_FRAGMENTO = ("planes", "sesiones", "perfiles", "resumenes", "rachas", "resumenes_temas")
+# Campo del archivo del usuario para las secciones con un valor por usuario
+CAMPOS_FRAGMENTO = {"perfiles": "perfil", "resumenes": "resumen", "rachas": "racha"}
+# Claves propias del índice (no son secciones de los datos): a qué usuario va cada plan, cuántas
+# sesiones tiene cada usuario y qué temas tienen archivo de resúmenes
+CLAVES_INDICE = ("plan_usuario", "sesiones_usuario", "temas_resumen")
+
+
+def clave_tema(tema):
+    """Clave del archivo de resúmenes de un tema entre los fragmentos cargados (las de usuario son textos)"""
+    return ("tema", tema)
+
+
+def materializar(datos):
+    """Convierte los datos perezosos en diccionarios y listas normales (carga todos los usuarios)"""
+    if not isinstance(datos.get("planes"), PlanesPerezosos):
+        return datos
+    copia = {seccion: valor for seccion, valor in datos.items() if seccion not in SECCIONES_FRAGMENTO}
+    copia["planes"] = dict(datos["planes"].items())
+    copia["sesiones"] = list(datos["sesiones"])
+    copia["perfiles"] = dict(datos["perfiles"].items())
+    copia["resumenes"] = dict(datos["resumenes"].items())
+    copia["rachas"] = dict(datos["rachas"].items())
+    copia["resumenes_temas"] = dict(datos["resumenes_temas"].items())
+    return copia
+
+
+class PlanesPerezosos(MutableMapping):
+    """plan_id -> plan; el plan se lee del archivo de su usuario la primera vez que se pide"""
+
+    def __init__(self, repositorio):
+        self.repositorio = repositorio
+
+    def __getitem__(self, plan_id):
+        usuario_id = self.repositorio.plan_usuario[plan_id]
+        return self.repositorio.fragmento(usuario_id)["planes"][plan_id]
+
+    def __setitem__(self, plan_id, plan):
+        self.repositorio.plan_usuario[plan_id] = plan["usuario_id"]
+        self.repositorio.fragmento(plan["usuario_id"])["planes"][plan_id] = plan
+
+    def __delitem__(self, plan_id):
+        usuario_id = self.repositorio.plan_usuario.pop(plan_id)
+        del self.repositorio.fragmento(usuario_id)["planes"][plan_id]
+
+    def __contains__(self, plan_id):
+        # Se responde con el índice, sin abrir el archivo del usuario
+        return plan_id in self.repositorio.plan_usuario
+
+    def __iter__(self):
+        return iter(list(self.repositorio.plan_usuario))
+
+    def __len__(self):
+        return len(self.repositorio.plan_usuario)
+
+
+class SesionesPerezosas:
+    """Lista global de sesiones repartida por usuario; conserva el orden de registro"""
+
+    def __init__(self, repositorio):
+        self.repositorio = repositorio
+        self._todas = None
+
+    def append(self, sesion):
+        repo = self.repositorio
+        usuario_id = repo.plan_usuario[sesion["plan_id"]]
+        fragmento = repo.fragmento(usuario_id)
+        fragmento["sesiones"].append(sesion)
+        fragmento["orden"].append(repo.total_sesiones)
+        repo.sesiones_usuario[usuario_id] = repo.sesiones_usuario.get(usuario_id, 0) + 1
+        repo.total_sesiones += 1
+        if self._todas is not None:
+            self._todas.append(sesion)
+
+    def _lista(self):
+        # Las consultas globales necesitan a todos los usuarios: se cargan una sola vez
+        if self._todas is None:
+            todas = [None] * self.repositorio.total_sesiones
+            for usuario_id in self.repositorio.sesiones_usuario:
+                fragmento = self.repositorio.fragmento(usuario_id)
+                for posicion, sesion in zip(fragmento["orden"], fragmento["sesiones"]):
+                    todas[posicion] = sesion
+            self._todas = todas
+        return self._todas
+
+    def __getitem__(self, posicion):
+        return self._lista()[posicion]
+
+    def __iter__(self):
+        return iter(self._lista())
+
+    def __len__(self):
+        return self.repositorio.total_sesiones
+
+
+class PerfilesPerezosos(MutableMapping):
+    """usuario_id -> perfil de estudio guardado en el archivo del usuario"""
+
+    # Campo del archivo del usuario (los archivos anteriores a un campo no lo tienen)
+    campo = "perfil"
+
+    def __init__(self, repositorio):
+        self.repositorio = repositorio
+
+    def __getitem__(self, usuario_id):
+        if usuario_id not in self.repositorio.usuarios:
+            raise KeyError(usuario_id)
+        valor = self.repositorio.fragmento(usuario_id).get(self.campo)
+        if valor is None:
+            raise KeyError(usuario_id)
+        return valor
+
+    def __setitem__(self, usuario_id, valor):
+        self.repositorio.fragmento(usuario_id)[self.campo] = valor
+
+    def __delitem__(self, usuario_id):
+        self.repositorio.fragmento(usuario_id)[self.campo] = None
+
+    def __iter__(self):
+        for usuario_id in list(self.repositorio.usuarios):
+            if self.repositorio.fragmento(usuario_id).get(self.campo) is not None:
+                yield usuario_id
+
+    def __len__(self):
+        # Cada sesión actualiza el perfil de su usuario: hay un perfil por usuario con sesiones
+        return sum(1 for total in self.repositorio.sesiones_usuario.values() if total)
+
+
+class ResumenesPerezosos(PerfilesPerezosos):
+    """usuario_id -> resúmenes diarios y semanales guardados en el archivo del usuario"""
+
+    campo = "resumen"
+
+
+class RachasPerezosas(PerfilesPerezosos):
+    """usuario_id -> racha guardada en el archivo del usuario (antes iba en el índice global)"""
+
+    campo = "racha"
+
+
+class ResumenesTemasPerezosos(MutableMapping):
+    """tema -> resúmenes diarios y semanales del tema, en un archivo por tema. El índice solo
+    guarda qué temas tienen archivo: crece con los temas, no con el historial"""
+
+    def __init__(self, repositorio):
+        self.repositorio = repositorio
+
+    def __getitem__(self, tema):
+        if tema not in self.repositorio.temas_resumen:
+            raise KeyError(tema)
+        valor = self.repositorio.fragmento(clave_tema(tema))["resumen"]
+        if valor is None:
+            raise KeyError(tema)
+        return valor
+
+    def __setitem__(self, tema, valor):
+        self.repositorio.temas_resumen[tema] = True
+        self.repositorio.fragmento(clave_tema(tema))["resumen"] = valor
+
+    def __delitem__(self, tema):
+        if self.repositorio.temas_resumen.pop(tema, None) is None:
+            raise KeyError(tema)
+        self.repositorio.fragmento(clave_tema(tema))["resumen"] = None
+
+    def __contains__(self, tema):
+        return tema in self.repositorio.temas_resumen
+
+    def __iter__(self):
+        return iter(list(self.repositorio.temas_resumen))
+
+    def __len__(self):
+        return len(self.repositorio.temas_resumen)
+
+
+class RepositorioFragmentado:
+    """Índice global (usuarios, puntos, logros) + un archivo JSON por usuario con sus planes,
+    sesiones, perfil, resúmenes y racha, y otro por tema con sus resúmenes. Cada archivo se carga
+    al usarlo y solo se reescriben los modificados."""
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.carpeta_usuarios = os.path.join(carpeta, "usuarios")
+        self.carpeta_temas = os.path.join(carpeta, "temas")
+        # El índice usa el mismo diario de cambios que el almacén JSON
+        self.diario = DiarioCambios(os.path.join(carpeta, "indice.json"))
+        self.cerrojo = CerrojoArchivo(os.path.join(carpeta, "indice.lock"))
+        self.datos = None
+        self.indice = None
+        self.total_sesiones = 0
+        self.cargados = {}
+        # (inodo, tamaño, fecha) del archivo de cada usuario cargado, para ver si otro proceso lo cambió
+        self.identidades = {}
+        self.sucios = set()
+        # Cambios de cada usuario aún sin escribir en su archivo, para rehacerlo si una operación falla
+        self.cambios_sin_escribir = {}
+        # Usuarios que cambia la operación en curso -> (ya tenía cambios sin escribir, cuántos)
+        self.tocados = {}
+        self.bytes_fragmentos = 0
+        self.recargas = 0
+        # Aumenta cada vez que se incorporan cambios de otro proceso o se deshace una operación
+        # fallida (para rehacer vistas derivadas)
+        self.cambios_externos = 0
+        # Con diferido=True (importaciones, servidor) los cambios se publican en guardar(); mientras
+        # haya un lote sin publicar se mantiene el cerrojo
+        self.diferido = False
+        self.lote = False
+        self.publicaciones = 0
+        self._nivel = 0
+
+    @property
+    def bytes_escritos(self):
+        return self.bytes_fragmentos + self.diario.bytes_escritos
+
+    @property
+    def usuarios(self):
+        return self.indice["usuarios"]
+
+    @property
+    def plan_usuario(self):
+        return self.indice["plan_usuario"]
+
+    @property
+    def sesiones_usuario(self):
+        return self.indice["sesiones_usuario"]
+
+    @property
+    def temas_resumen(self):
+        return self.indice["temas_resumen"]
+
+    def existe(self):
+        return os.path.exists(self.diario.archivo_snapshot) or os.path.exists(self.diario.archivo_diario)
+
+    def apartar_danados(self):
+        return apartar_archivos([self.carpeta])
+
+    def _indice_vacio(self, datos_vacios):
+        indice = {seccion: valor for seccion, valor in datos_vacios.items() if seccion not in SECCIONES_FRAGMENTO}
+        indice.update({clave: {} for clave in CLAVES_INDICE})
+        return indice
+
+    def cargar(self, datos_vacios):
+        """Lee solo el índice global; los usuarios y los temas se cargan al acceder a ellos"""
+        with self.cerrojo:
+            self._usar_indice(self.diario.cargar(self._indice_vacio(datos_vacios)))
+            if "resumenes_temas" in self.indice:
+                self._separar_temas(self.indice.pop("resumenes_temas"))
+
+        datos = {seccion: valor for seccion, valor in self.indice.items() if seccion not in CLAVES_INDICE}
+        datos["planes"] = PlanesPerezosos(self)
+        datos["sesiones"] = SesionesPerezosas(self)
+        datos["perfiles"] = PerfilesPerezosos(self)
+        datos["resumenes"] = ResumenesPerezosos(self)
+        datos["rachas"] = RachasPerezosas(self)
+        datos["resumenes_temas"] = ResumenesTemasPerezosos(self)
+        return datos
+
+    def _separar_temas(self, resumenes_temas):
+        """Índice anterior a los archivos por tema: los resúmenes de tema pasan a sus archivos y
+        el índice se compacta sin ellos (con el cerrojo tomado, antes de usar los datos)"""
+        for tema, resumen in resumenes_temas.items():
+            self.temas_resumen[tema] = True
+            self.fragmento(clave_tema(tema))["resumen"] = resumen
+            self.sucios.add(clave_tema(tema))
+        self._escribir_fragmentos()
+        self.diario.compactar(self.indice)
+
+    def _usar_indice(self, indice):
+        # Los índices anteriores a los archivos por tema no tienen la lista de temas
+        indice.setdefault("temas_resumen", {})
+        self.indice = indice
+        self.total_sesiones = sum(indice["sesiones_usuario"].values())
+        self.cargados = {}
+        self.identidades = {}
+        self.sucios = set()
+        self.cambios_sin_escribir = {}
+
+    def usar_datos(self, datos):
+        if not isinstance(datos.get("planes"), PlanesPerezosos):
+            # Datos nuevos o en memoria (instalación vacía, migración): repartirlos por usuario
+            self._repartir(datos)
+        self.datos = datos
+
+    def _repartir(self, datos):
+        self._usar_indice(self._indice_vacio(datos))
+        planes, sesiones, perfiles = datos["planes"], datos["sesiones"], datos.get("perfiles") or {}
+        resumenes, rachas = datos.get("resumenes") or {}, datos.get("rachas") or {}
+        resumenes_temas = datos.get("resumenes_temas") or {}
+        datos["planes"] = PlanesPerezosos(self)
+        datos["sesiones"] = SesionesPerezosas(self)
+        datos["perfiles"] = PerfilesPerezosos(self)
+        datos["resumenes"] = ResumenesPerezosos(self)
+        datos["rachas"] = RachasPerezosas(self)
+        datos["resumenes_temas"] = ResumenesTemasPerezosos(self)
+
+        for usuario_id in self.usuarios:
+            self.fragmento(usuario_id)
+        for plan_id, plan in planes.items():
+            datos["planes"][plan_id] = plan
+        for sesion in sesiones:
+            if sesion["plan_id"] in self.plan_usuario:
+                datos["sesiones"].append(sesion)
+        for usuario_id, perfil in perfiles.items():
+            if usuario_id in self.usuarios:
+                datos["perfiles"][usuario_id] = perfil
+        for usuario_id, resumen in resumenes.items():
+            if usuario_id in self.usuarios:
+                datos["resumenes"][usuario_id] = resumen
+        for usuario_id, racha in rachas.items():
+            if usuario_id in self.usuarios:
+                datos["rachas"][usuario_id] = racha
+        for tema, resumen in resumenes_temas.items():
+            datos["resumenes_temas"][tema] = resumen
+        self.sucios = set(self.cargados)
+
+    def _archivo_usuario(self, usuario_id):
+        return os.path.join(self.carpeta_usuarios, f"{quote(usuario_id, safe='')}.json")
+
+    def _archivo_fragmento(self, clave):
+        if isinstance(clave, tuple):
+            return os.path.join(self.carpeta_temas, f"{quote(clave[1], safe='')}.json")
+        return self._archivo_usuario(clave)
+
+    def fragmento(self, clave):
+        """Datos de un usuario (planes, sesiones, perfil, resúmenes) o resúmenes de un tema
+        (clave_tema), leídos del disco la primera vez"""
+        fragmento = self.cargados.get(clave)
+        if fragmento is None:
+            archivo = self._archivo_fragmento(clave)
+            if os.path.exists(archivo):
+                self.identidades[clave] = identidad_archivo(archivo)
+                with open(archivo, 'r', encoding='utf-8') as f, bloque("json.load"):
+                    fragmento = convertir_registros(json.load(f))
+                    contar_bytes("json.load", leidos=os.fstat(f.fileno()).st_size)
+            elif isinstance(clave, tuple):
+                fragmento = {"resumen": None}
+            else:
+                fragmento = {"planes": {}, "sesiones": [], "orden": [], "perfil": None, "resumen": None,
+                             "racha": None}
+            if "racha" not in fragmento and not isinstance(clave, tuple):
+                # Archivo anterior a las rachas por usuario: la racha sigue en el índice
+                fragmento["racha"] = self.indice.get("rachas", {}).get(clave)
+            self.cargados[clave] = fragmento
+        return fragmento
+
+    @contextmanager
+    def transaccion(self):
+        """Operación atómica entre procesos: toma el cerrojo, descarta lo que otros procesos
+        hayan cambiado y publica los cambios propios al terminar. Si la operación falla, sus
+        cambios no se publican y lo que cambió en memoria se vuelve a leer.
+
+        Con `diferido` el cerrojo sigue tomado desde la primera operación con cambios hasta
+        guardar(): el lote entero es una sola transacción"""
+        with self.cerrojo:
+            exterior = self._nivel == 0
+            if exterior:
+                if not self.lote:
+                    self._sincronizar()
+                self.tocados = {}
+            marca = len(self.diario.pendientes)
+            self._nivel += 1
+            try:
+                yield
+            except BaseException:
+                if exterior:
+                    self._deshacer(marca)
+                raise
+            finally:
+                self._nivel -= 1
+            if exterior:
+                self._terminar()
+
+    def _terminar(self):
+        self.tocados = {}
+        if not self.diferido:
+            self._publicar(duradero=False)
+        elif (self.sucios or self.diario.pendientes) and not self.lote:
+            self.cerrojo.adquirir()
+            self.lote = True
+
+    def _publicar(self, duradero=True):
+        escritos = self._escribir_fragmentos()
+        if self.diario.escribir_pendientes(duradero) or escritos:
+            self.publicaciones += 1
+        if self.lote:
+            self.lote = False
+            self.cerrojo.liberar()
+
+    def _deshacer(self, marca):
+        """Descarta los cambios de la operación fallida: el índice se vuelve a leer con los cambios
+        del lote aún sin publicar; los usuarios que tenían cambios sin escribir se rehacen desde su
+        archivo y esos cambios, y el resto se vuelve a leer al usarlos"""
+        tocados, self.tocados = self.tocados, {}
+        del self.diario.pendientes[marca:]
+        if self.datos is None:
+            return
+        for usuario_id in list(self.cargados):
+            tenia_cambios, anteriores = tocados.get(usuario_id, (usuario_id in self.sucios, None))
+            if not tenia_cambios:
+                self.cargados.pop(usuario_id)
+                self.identidades.pop(usuario_id, None)
+                self.cambios_sin_escribir.pop(usuario_id, None)
+                self.sucios.discard(usuario_id)
+            elif anteriores is not None or usuario_id in self.cambios_sin_escribir:
+                # (los repartidos en una migración no tienen cambios anotados: se quedan como están)
+                if anteriores is not None:
+                    del self.cambios_sin_escribir[usuario_id][anteriores:]
+                self.cargados.pop(usuario_id)
+                self.identidades.pop(usuario_id, None)
+                self._rehacer_fragmento(usuario_id)
+
+        indice = self.diario.cargar(self._indice_vacio({seccion: {} for seccion in self.datos}))
+        for texto in self.diario.pendientes:
+            aplicar_cambio(indice, json.loads(texto))
+        indice.setdefault("temas_resumen", {})
+        self.indice = indice
+        self.total_sesiones = sum(self.sesiones_usuario.values())
+        for seccion in self.datos:
+            if seccion not in SECCIONES_FRAGMENTO:
+                self.datos[seccion] = indice.setdefault(seccion, {})
+        self.datos["sesiones"]._todas = None
+        self.cambios_externos += 1
+
+    def _rehacer_fragmento(self, usuario_id):
+        fragmento = self.fragmento(usuario_id)
+        for texto in self.cambios_sin_escribir.get(usuario_id, ()):
+            cambio = json.loads(texto)
+            if cambio["ruta"] == ["sesiones"]:
+                fragmento["sesiones"].append(como_sesion(cambio["valor"]))
+                fragmento["orden"].append(cambio["orden"])
+            else:
+                aplicar_cambio(fragmento, cambio)
+
+    def _sincronizar(self):
+        if self.datos is None:
+            return
+        if self.diario.cambiado_por_otro():
+            vacios = {seccion: {} for seccion in self.datos}
+            nuevos = self.cargar(vacios)
+            self.datos.clear()
+            self.datos.update(nuevos)
+            self.recargas += 1
+            self.cambios_externos += 1
+            return
+
+        sesiones = self.datos["sesiones"]
+        cambiado = False
+        if self.diario.reproducir(self.indice):
+            self.total_sesiones = sum(self.sesiones_usuario.values())
+            cambiado = True
+        # Los usuarios cuyo archivo reescribió otro proceso se vuelven a leer al usarlos
+        for usuario_id, identidad in list(self.identidades.items()):
+            if identidad_archivo(self._archivo_fragmento(usuario_id)) != identidad:
+                self.cargados.pop(usuario_id, None)
+                del self.identidades[usuario_id]
+                cambiado = True
+        if cambiado:
+            sesiones._todas = None
+            self.cambios_externos += 1
+
+    def registrar(self, op, ruta, valor=None, derivado=False):
+        """Los cambios de planes, sesiones, perfiles, resúmenes y rachas marcan al usuario como
+        modificado, y los de resúmenes de tema, al tema; el resto se anota en el diario del índice
+        (también los derivados: el índice no tiene las sesiones para recalcularlos)"""
+        seccion = ruta[0]
+        if seccion == "planes":
+            usuario_id = self.plan_usuario[ruta[1]]
+            self._anotar(usuario_id, op, ruta, valor)
+            if len(ruta) == 2 and op == "set":
+                self.diario.registrar("set", ["plan_usuario", ruta[1]], usuario_id)
+        elif seccion == "sesiones":
+            if op == "append":
+                usuario_id = self.plan_usuario[valor["plan_id"]]
+                self._anotar(usuario_id, op, ruta, valor, orden=self.total_sesiones - 1)
+                self.diario.registrar("set", ["sesiones_usuario", usuario_id], self.sesiones_usuario[usuario_id])
+        elif seccion in CAMPOS_FRAGMENTO:
+            self._anotar(ruta[1], op, [CAMPOS_FRAGMENTO[seccion]] + list(ruta[2:]), valor)
+        elif seccion == "resumenes_temas":
+            tema = ruta[1]
+            self._anotar(clave_tema(tema), op, ["resumen"] + list(ruta[2:]), valor)
+            if len(ruta) == 2:
+                # Tema nuevo o borrado: la lista de temas del índice (los datos pueden ser un dict
+                # normal tras una migración del servicio, sin pasar por ResumenesTemasPerezosos)
+                if op == "del":
+                    self.temas_resumen.pop(tema, None)
+                    self.diario.registrar("del", ["temas_resumen", tema])
+                else:
+                    self.temas_resumen[tema] = True
+                    self.diario.registrar("set", ["temas_resumen", tema], True)
+        else:
+            self.diario.registrar(op, ruta, valor)
+
+    def _anotar(self, usuario_id, op, ruta, valor, **extra):
+        """Marca al usuario como modificado y guarda el cambio (en términos de su archivo) hasta escribirlo"""
+        cambios = self.cambios_sin_escribir.setdefault(usuario_id, [])
+        if usuario_id not in self.tocados:
+            self.tocados[usuario_id] = (usuario_id in self.sucios, len(cambios))
+        self.sucios.add(usuario_id)
+        cambio = {"op": op, "ruta": list(ruta), **extra}
+        if op != "del":
+            cambio["valor"] = valor
+        cambios.append(json.dumps(cambio, ensure_ascii=False, default=a_json))
+
+    def guardar(self):
+        """Reescribe solo los usuarios modificados y añade los cambios del índice a su diario"""
+        with self.transaccion():
+            self._publicar()
+            if self.diario.necesita_compactar() or not os.path.exists(self.diario.archivo_snapshot):
+                self._compactar()
+
+    def _escribir_fragmentos(self):
+        """Escribe los archivos de los usuarios y temas modificados; devuelve cuántos"""
+        if not self.sucios:
+            return 0
+        escritos = 0
+        for clave in sorted(self.sucios, key=str):
+            # (un tema anotado tras una migración del servicio puede no estar cargado aún)
+            fragmento = self.fragmento(clave)
+            archivo = self._archivo_fragmento(clave)
+            if isinstance(clave, tuple):
+                valores = self.datos.get("resumenes_temas") if self.datos is not None else None
+                if isinstance(valores, dict):
+                    fragmento["resumen"] = valores.get(clave[1])
+            else:
+                for seccion, campo in CAMPOS_FRAGMENTO.items():
+                    valores = self.datos.get(seccion, {})
+                    if not isinstance(valores, PerfilesPerezosos):
+                        fragmento[campo] = valores.get(clave)
+            self.cambios_sin_escribir.pop(clave, None)
+            self.sucios.discard(clave)
+            if isinstance(clave, tuple) and clave[1] not in self.temas_resumen:
+                # Tema borrado (p. ej. una clave sin normalizar): su archivo sobra
+                if os.path.exists(archivo):
+                    os.remove(archivo)
+                self.identidades.pop(clave, None)
+                continue
+            os.makedirs(os.path.dirname(archivo), exist_ok=True)
+            self.bytes_fragmentos += escribir_atomico(archivo, json.dumps(fragmento, ensure_ascii=False, default=a_json))
+            self.identidades[clave] = identidad_archivo(archivo)
+            escritos += 1
+        return escritos
+
+    def compactar(self):
+        with self.transaccion():
+            self._publicar()
+            self._compactar()
+
+    def _compactar(self):
+        self.diario.escribir_pendientes()
+        # Las secciones globales pueden haberse reemplazado en los datos en memoria
+        for seccion, valor in self.datos.items():
+            if seccion not in SECCIONES_FRAGMENTO:
+                self.indice[seccion] = valor
+        os.makedirs(self.carpeta, exist_ok=True)
+        self.diario.compactar(self.indice)
+
+    def volcar(self, datos):
+        """Reemplaza todo el contenido del almacén (usado en migraciones)"""
+        for carpeta in (self.carpeta_usuarios, self.carpeta_temas):
+            if os.path.isdir(carpeta):
+                shutil.rmtree(carpeta)
+        datos = dict(datos)
+        if not datos.get("perfiles") and datos["sesiones"]:
+            datos["perfiles"] = construir_perfiles(datos)
+        self.usar_datos(datos)
+        self.diario.pendientes = []
+        self._escribir_fragmentos()
+        self._compactar()
+
+    # ===== CONSULTAS =====
+
+    def planes_de_usuario(self, usuario_id):
+        return dict(self.fragmento(usuario_id)["planes"]) if usuario_id in self.usuarios else {}
+
+    def sesiones_de_usuario(self, usuario_id):
+        return self.fragmento(usuario_id)["sesiones"] if usuario_id in self.usuarios else []
+
+    def contar_sesiones_usuario(self, usuario_id):
+        return self.sesiones_usuario.get(usuario_id, 0)
@@ -0,0 +1,223 @@
+# guardado.py - Escrituras atómicas y duraderas + guardado diferido (write-behind)
+import atexit
+import os
+import threading
+import time
+from instrumentacion import contar_bytes
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def sincronizar_carpeta(carpeta):
+    """fsync de la carpeta para que el renombrado sobreviva a un corte de luz (solo POSIX)"""
+    if os.name != "posix":
+        return
+    descriptor = os.open(carpeta or ".", os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def escribir_atomico(ruta, contenido):
+    """Escribe en un temporal, hace fsync y lo renombra: el archivo nunca queda a medias.
+    Devuelve los bytes escritos."""
+    if isinstance(contenido, str):
+        contenido = contenido.encode('utf-8')
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'wb') as f:
+        f.write(contenido)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+    sincronizar_carpeta(os.path.dirname(ruta))
+    return len(contenido)
+
+
+def sincronizar_archivo(ruta):
+    """fsync de un archivo ya escrito (si otro proceso lo borró, ya no hace falta)"""
+    try:
+        with open(ruta, 'rb') as f:
+            os.fsync(f.fileno())
+    except FileNotFoundError:
+        pass
+
+
+def anadir_duradero(ruta, contenido):
+    """Añade al final del archivo y hace fsync antes de volver"""
+    nuevo = not os.path.exists(ruta)
+    with open(ruta, 'ab') as f:
+        f.write(contenido)
+        f.flush()
+        os.fsync(f.fileno())
+    if nuevo:
+        sincronizar_carpeta(os.path.dirname(ruta))
+    return len(contenido)
+
+
+class CerrojoArchivo:
+    """Cerrojo exclusivo entre procesos sobre un archivo .lock.
+
+    Es reentrante dentro del proceso; si otro proceso lo tiene se reintenta con esperas
+    crecientes hasta `espera_maxima` segundos."""
+
+    def __init__(self, ruta, espera_maxima=30.0):
+        self.ruta = ruta
+        self.espera_maxima = espera_maxima
+        self.archivo = None
+        self.profundidad = 0
+        self.esperas = 0
+
+    def _intentar(self, archivo):
+        try:
+            if fcntl is not None:
+                fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                archivo.seek(0)
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def adquirir(self):
+        if self.profundidad:
+            self.profundidad += 1
+            return
+        os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+        archivo = open(self.ruta, 'a+b')
+        limite = time.monotonic() + self.espera_maxima
+        pausa = 0.001
+        while not self._intentar(archivo):
+            if time.monotonic() > limite:
+                archivo.close()
+                raise TimeoutError(f"Los datos están bloqueados por otro proceso ({self.ruta})")
+            self.esperas += 1
+            time.sleep(pausa)
+            pausa = min(pausa * 2, 0.05)
+        self.archivo = archivo
+        self.profundidad = 1
+
+    def liberar(self):
+        self.profundidad -= 1
+        if self.profundidad:
+            return
+        if fcntl is not None:
+            fcntl.flock(self.archivo.fileno(), fcntl.LOCK_UN)
+        else:
+            self.archivo.seek(0)
+            msvcrt.locking(self.archivo.fileno(), msvcrt.LK_UNLCK, 1)
+        self.archivo.close()
+        self.archivo = None
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, *error):
+        self.liberar()
+
+
+class GuardadoDiferido:
+    """Agrupa los cambios de varias operaciones en un solo guardado.
+
+    Con retardo el guardado ocurre como mucho `retardo` segundos después del primer
+    cambio pendiente, al llamar a vaciar() o al salir del programa; sin retardo cada
+    solicitud se guarda en el momento."""
+
+    def __init__(self, repositorio, retardo=None, cerrojo=None):
+        self.repositorio = repositorio
+        self.retardo = retardo
+        self.cerrojo = cerrojo or threading.RLock()
+        self.temporizador = None
+        self.pendiente = False
+        self.error = None
+        # SQLite escribe al registrar cada cambio: se cuentan los bytes desde el último guardado
+        self.bytes_previos = repositorio.bytes_escritos
+        self.metricas = {
+            "solicitudes": 0,
+            "guardados": 0,
+            "errores": 0,
+            "bytes_escritos": 0,
+            "latencia_ultima_ms": 0.0,
+            "latencia_maxima_ms": 0.0,
+            "latencia_total_ms": 0.0
+        }
+        if self.retardo:
+            atexit.register(self.vaciar)
+
+    def solicitar(self):
+        """Marca que hay cambios por guardar"""
+        with self.cerrojo:
+            self.metricas["solicitudes"] += 1
+            self.pendiente = True
+            if not self.retardo:
+                return self.vaciar()
+            if self.temporizador is None:
+                self.temporizador = threading.Timer(self.retardo, self.vaciar)
+                self.temporizador.daemon = True
+                self.temporizador.start()
+            return True
+
+    def vaciar(self):
+        """Guarda ya los cambios pendientes; devuelve False si el guardado falló"""
+        with self.cerrojo:
+            if self.temporizador is not None:
+                self.temporizador.cancel()
+                self.temporizador = None
+            if not self.pendiente:
+                return self.error is None
+
+            inicio = time.perf_counter()
+            try:
+                self.repositorio.guardar()
+            except Exception as e:
+                # Los cambios siguen pendientes y se reintentan en la próxima solicitud
+                self.error = e
+                self.metricas["errores"] += 1
+                return False
+            latencia = (time.perf_counter() - inicio) * 1000
+
+            self.pendiente = False
+            self.error = None
+            self.metricas["guardados"] += 1
+            escritos = self.repositorio.bytes_escritos - self.bytes_previos
+            self.metricas["bytes_escritos"] += escritos
+            contar_bytes("guardar_datos", escritos=escritos)
+            self.bytes_previos = self.repositorio.bytes_escritos
+            self.metricas["latencia_ultima_ms"] = latencia
+            self.metricas["latencia_maxima_ms"] = max(self.metricas["latencia_maxima_ms"], latencia)
+            self.metricas["latencia_total_ms"] += latencia
+            return True
+
+    def cerrar(self):
+        resultado = self.vaciar()
+        if self.retardo:
+            atexit.unregister(self.vaciar)
+        return resultado
+
+    def resumen(self):
+        """Métricas con las solicitudes agrupadas y la latencia media por guardado"""
+        metricas = dict(self.metricas)
+        guardados = metricas["guardados"]
+        metricas["solicitudes_agrupadas"] = max(0, metricas["solicitudes"] - guardados)
+        metricas["latencia_media_ms"] = metricas["latencia_total_ms"] / guardados if guardados else 0.0
+        metricas["pendiente"] = self.pendiente
+        # Veces que los cambios llegaron a ser visibles para otros procesos
+        metricas["publicaciones"] = self.repositorio.publicaciones
+        return metricas
+
+
+def apartar_archivos(rutas):
+    """Renombra archivos dañados a <ruta>.danado-<fecha> en lugar de sobrescribirlos"""
+    sufijo = time.strftime("%Y%m%d-%H%M%S")
+    apartados = []
+    for ruta in rutas:
+        if os.path.exists(ruta):
+            destino = f"{ruta}.danado-{sufijo}"
+            os.replace(ruta, destino)
+            apartados.append(destino)
+    return apartados
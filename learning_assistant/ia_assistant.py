@@ -1,84 +1,93 @@
-import json
 import random
-from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+from datetime import date
+from collections import defaultdict
+from catalogo import CATALOGO
+from perfiles import perfil_vacio, actualizar_perfil, resumen_patrones
+from resumenes import resumen_vacio, totales
+from tendencias import analizar_tendencias
+from instrumentacion import medido
+from rachas import racha_vigente
 
 class RecomendadorIA:
-    def __init__(self, datos_usuario):
+    def __init__(self, datos_usuario, repositorio=None, cache=None):
         self.datos = datos_usuario
-        self.patrones_estudio = self.analizar_patrones()
+        self.repositorio = repositorio
+        # CacheRecomendaciones del servicio: con ella las consultas de un usuario sin cambios
+        # (dashboard, recomendaciones, plan con IA) salen del mismo paquete ya calculado
+        self.cache = cache
     
-    def analizar_patrones(self):
-        """Analiza los patrones de estudio del usuario"""
-        if not self.datos["sesiones"]:
-            return {}
-        
-        patrones = {
-            "horas_preferidas": [],
-            "duracion_promedio": 0,
-            "satisfaccion_promedio": 0,
-            "dias_mas_activos": {},
-            "temas_favoritos": {},
-            "racha_maxima": 0
+    def _planes_usuario(self, usuario_id):
+        if self.repositorio is not None:
+            return self.repositorio.planes_de_usuario(usuario_id)
+        return {k: v for k, v in self.datos["planes"].items() if v["usuario_id"] == usuario_id}
+    
+    def _sesiones_usuario(self, usuario_id):
+        if self.repositorio is not None:
+            return self.repositorio.sesiones_de_usuario(usuario_id)
+        return [s for s in self.datos["sesiones"]
+                if self.datos["planes"].get(s["plan_id"], {}).get("usuario_id") == usuario_id]
+    
+    def paquete(self, usuario_id):
+        """Recomendaciones, horario óptimo, duración ideal y patrones del usuario"""
+        sin_cache = RecomendadorIA(self.datos, self.repositorio)
+        if self.cache is None or usuario_id not in self.datos["usuarios"]:
+            return sin_cache._calcular_paquete(usuario_id)
+        return self.cache.obtener(usuario_id, date.today().toordinal(), sin_cache._calcular_paquete)
+    
+    def _calcular_paquete(self, usuario_id):
+        return {
+            "recomendaciones": self.generar_recomendaciones_personalizadas(usuario_id),
+            "horario_optimo": self.recomendar_horario_optimo(usuario_id),
+            "duracion_ideal": self.recomendar_duracion_ideal(usuario_id),
+            "patrones": self.analizar_patrones(usuario_id)
         }
-        
-        # Analizar sesiones
-        for sesion in self.datos["sesiones"]:
-            # Extraer hora si existe
-            if "hora" in sesion:
-                hora = int(sesion["hora"].split(":")[0])
-                patrones["horas_preferidas"].append(hora)
-            
-            patrones["duracion_promedio"] += sesion["duracion"]
-            patrones["satisfaccion_promedio"] += sesion["puntuacion"]
-            
-            # Analizar día de la semana
-            try:
-                fecha = datetime.strptime(sesion["fecha"], "%Y-%m-%d")
-                dia_semana = fecha.strftime("%A")
-                if dia_semana not in patrones["dias_mas_activos"]:
-                    patrones["dias_mas_activos"][dia_semana] = 0
-                patrones["dias_mas_activos"][dia_semana] += 1
-            except:
-                pass
-            
-            # Analizar temas
-            plan = self.datos["planes"].get(sesion["plan_id"], {})
-            if "tema" in plan:
-                tema = plan["tema"]
-                if tema not in patrones["temas_favoritos"]:
-                    patrones["temas_favoritos"][tema] = 0
-                patrones["temas_favoritos"][tema] += 1
-        
-        # Calcular promedios
-        total_sesiones = len(self.datos["sesiones"])
-        if total_sesiones > 0:
-            patrones["duracion_promedio"] = patrones["duracion_promedio"] // total_sesiones
-            patrones["satisfaccion_promedio"] = patrones["satisfaccion_promedio"] / total_sesiones
-        
-        # Analizar rachas máximas
-        for usuario_id, racha_data in self.datos["rachas"].items():
-            if racha_data["maxima"] > patrones["racha_maxima"]:
-                patrones["racha_maxima"] = racha_data["maxima"]
-        
-        return patrones
     
+    def _del_paquete(self, usuario_id, campo):
+        # Copia: quien llama puede modificar lo que recibe sin tocar la caché
+        if self.cache is None or usuario_id not in self.datos["usuarios"]:
+            return None
+        valor = self.paquete(usuario_id)[campo]
+        return list(valor) if isinstance(valor, list) else valor
+    
+    @medido
+    def analizar_patrones(self, usuario_id):
+        """Analiza los patrones de estudio del usuario a partir de su perfil (sin caché: ya es
+        inmediato con los perfiles; el paquete en caché guarda una copia)"""
+        perfil = self.datos.get("perfiles", {}).get(usuario_id)
+        if perfil is None:
+            # Datos sin perfiles guardados: se calcula solo con las sesiones del usuario
+            perfil = perfil_vacio()
+            planes = self._planes_usuario(usuario_id)
+            for sesion in self._sesiones_usuario(usuario_id):
+                actualizar_perfil(perfil, sesion, planes.get(sesion["plan_id"], {}).get("tema"))
+        
+        racha_maxima = self.datos["rachas"].get(usuario_id, {}).get("maxima", 0)
+        return resumen_patrones(perfil, racha_maxima)
+    
+    @medido
     def generar_recomendaciones_personalizadas(self, usuario_id):
         """Genera recomendaciones basadas en el análisis del usuario"""
         if usuario_id not in self.datos["usuarios"]:
             return ["❌ Usuario no encontrado"]
+        cacheado = self._del_paquete(usuario_id, "recomendaciones")
+        if cacheado is not None:
+            return cacheado
         
         usuario = self.datos["usuarios"][usuario_id]
         recomendaciones = []
         
+        # Recomendaciones basadas en la tendencia reciente (primero: son las más oportunas)
+        recomendaciones.extend(self._recomendaciones_tendencias(usuario_id))
+        
         # Recomendaciones basadas en progreso
         recomendaciones.extend(self._recomendaciones_progreso(usuario_id))
         
         # Recomendaciones basadas en patrones de estudio
-        recomendaciones.extend(self._recomendaciones_patrones())
+        recomendaciones.extend(self._recomendaciones_patrones(usuario_id))
         
         # Recomendaciones basadas en nivel
-        recomendaciones.extend(self._recomendaciones_nivel(usuario["nivel"]))
+        # (con semilla: los consejos del día no cambian entre consultas, estén o no en caché)
+        recomendaciones.extend(self._recomendaciones_nivel(usuario["nivel"], f"{usuario_id}:{date.today().toordinal()}"))
         
         # Recomendaciones basadas en rachas
         recomendaciones.extend(self._recomendaciones_rachas(usuario_id))
@@ -88,12 +97,51 @@ class RecomendadorIA:
         
         return recomendaciones[:8]  # Máximo 8 recomendaciones
     
+    def analizar_tendencias(self, usuario_id):
+        """Tendencias del usuario (None con datos sin perfiles)"""
+        perfil = self.datos.get("perfiles", {}).get(usuario_id)
+        if perfil is None:
+            return None
+        resumen = self.datos.get("resumenes", {}).get(usuario_id) or resumen_vacio()
+        return analizar_tendencias(perfil, resumen, date.today().toordinal())
+    
+    @medido
+    def _recomendaciones_tendencias(self, usuario_id):
+        """Recomendaciones según cómo evolucionan la satisfacción, la duración y el tiempo diario"""
+        tendencias = self.analizar_tendencias(usuario_id)
+        if tendencias is None:
+            return []
+        recomendaciones = []
+        semana, mes = tendencias["ventanas"]["7d"], tendencias["ventanas"]["30d"]
+        cambio = next((c for c in reversed(tendencias["cambios"]) if c["metrica"] == "puntuacion"), None)
+        
+        if tendencias["satisfaccion"] == "bajando":
+            if cambio is not None:
+                antes, ahora = cambio["antes"], tendencias["puntuacion"]["rapida"]
+            else:
+                antes, ahora = tendencias["satisfaccion_semanas_anteriores"], semana["satisfaccion_promedio"]
+            recomendaciones.append(f"📉 Tu satisfacción está bajando ({ahora:.1f}/10, antes {antes:.1f}). "
+                                   "Prueba sesiones más cortas, otro horario o un tema distinto")
+        elif tendencias["satisfaccion"] == "subiendo":
+            recomendaciones.append("📈 Tu satisfacción va en aumento. ¡Lo que estás haciendo funciona!")
+        
+        for c in tendencias["cambios"]:
+            if c["metrica"] == "duracion" and c["sentido"] == "baja":
+                recomendaciones.append(f"⏱️ Tus sesiones se han acortado (~{c['despues']:.0f} min, antes ~{c['antes']:.0f}). "
+                                       "Si te cuesta concentrarte, alterna bloques cortos con descansos")
+                break
+        
+        if mes["sesiones"] and semana["minutos_por_dia"] < mes["minutos_por_dia"] / 2:
+            recomendaciones.append(f"📆 Esta semana estudias {semana['minutos_por_dia']:.0f} min/día, "
+                                   f"menos que tu media del mes ({mes['minutos_por_dia']:.0f} min/día)")
+        return recomendaciones
+    
+    @medido
     def _recomendaciones_progreso(self, usuario_id):
         """Recomendaciones basadas en el progreso actual"""
         recomendaciones = []
         
-        planes_usuario = {k: v for k, v in self.datos["planes"].items() 
-                         if v["usuario_id"] == usuario_id}
+        planes_usuario = self._planes_usuario(usuario_id)
         
         if not planes_usuario:
             recomendaciones.append("🎯 Crea tu primer plan de estudio para comenzar tu aventura de aprendizaje")
@@ -114,8 +162,7 @@ class RecomendadorIA:
             
             # Verificar fecha límite
             try:
-                fecha_limite = datetime.strptime(plan["fecha_limite"], "%Y-%m-%d")
-                dias_restantes = (fecha_limite - datetime.now()).days
+                dias_restantes = plan.limite - date.today().toordinal()
                 
                 if dias_restantes <= 3 and progreso < 90:
                     recomendaciones.append(f"⚠️ {tema}: Quedan {dias_restantes} días. Considera sesiones más largas")
@@ -126,26 +173,26 @@ class RecomendadorIA:
         
         return recomendaciones
     
-    def _recomendaciones_patrones(self):
+    @medido
+    def _recomendaciones_patrones(self, usuario_id):
         """Recomendaciones basadas en patrones de estudio"""
         recomendaciones = []
+        patrones = self.analizar_patrones(usuario_id)
         
-        if not self.patrones_estudio["horas_preferidas"]:
+        if patrones["hora_favorita"] is None:
             return recomendaciones
         
         # Analizar horas preferidas
-        horas_comunes = Counter(self.patrones_estudio["horas_preferidas"])
-        if horas_comunes:
-            hora_favorita = horas_comunes.most_common(1)[0][0]
-            if 6 <= hora_favorita <= 10:
-                recomendaciones.append(f"🌅 Tu mejor momento es a las {hora_favorita}:00. ¡Aprovecha las mañanas!")
-            elif 14 <= hora_favorita <= 18:
-                recomendaciones.append(f"☀️ Rindes bien en las tardes ({hora_favorita}:00). Mantén esa rutina")
-            elif hora_favorita >= 20:
-                recomendaciones.append(f"🌙 Eres más productivo en las noches ({hora_favorita}:00)")
+        hora_favorita = patrones["hora_favorita"]
+        if 6 <= hora_favorita <= 10:
+            recomendaciones.append(f"🌅 Tu mejor momento es a las {hora_favorita}:00. ¡Aprovecha las mañanas!")
+        elif 14 <= hora_favorita <= 18:
+            recomendaciones.append(f"☀️ Rindes bien en las tardes ({hora_favorita}:00). Mantén esa rutina")
+        elif hora_favorita >= 20:
+            recomendaciones.append(f"🌙 Eres más productivo en las noches ({hora_favorita}:00)")
         
         # Recomendaciones sobre duración
-        duracion_prom = self.patrones_estudio["duracion_promedio"]
+        duracion_prom = patrones["duracion_promedio"]
         if duracion_prom > 0:
             if duracion_prom < 20:
                 recomendaciones.append("⏰ Tus sesiones son cortas. Intenta llegar a 25-30 minutos para mayor efectividad")
@@ -155,7 +202,7 @@ class RecomendadorIA:
                 recomendaciones.append(f"✅ Duración ideal de {duracion_prom} min. ¡Sigue así!")
         
         # Recomendaciones sobre satisfacción
-        satisfaccion_prom = self.patrones_estudio["satisfaccion_promedio"]
+        satisfaccion_prom = patrones["satisfaccion_promedio"]
         if satisfaccion_prom > 0:
             if satisfaccion_prom < 6:
                 recomendaciones.append("😔 Satisfacción baja. Prueba cambiar de ambiente o método de estudio")
@@ -164,8 +211,9 @@ class RecomendadorIA:
         
         return recomendaciones
     
-    def _recomendaciones_nivel(self, nivel):
-        """Recomendaciones específicas por nivel"""
+    @medido
+    def _recomendaciones_nivel(self, nivel, semilla=None):
+        """Recomendaciones específicas por nivel (dos al azar, repetibles con la misma semilla)"""
         recomendaciones_por_nivel = {
             "principiante": [
                 "📚 Enfócate en conceptos fundamentales antes de avanzar",
@@ -184,9 +232,10 @@ class RecomendadorIA:
             ]
         }
         
-        return random.sample(recomendaciones_por_nivel.get(nivel, []), 
+        return random.Random(semilla).sample(recomendaciones_por_nivel.get(nivel, []), 
                            min(2, len(recomendaciones_por_nivel.get(nivel, []))))
     
+    @medido
     def _recomendaciones_rachas(self, usuario_id):
         """Recomendaciones basadas en rachas de estudio"""
         recomendaciones = []
@@ -196,7 +245,7 @@ class RecomendadorIA:
             return recomendaciones
         
         racha_data = self.datos["rachas"][usuario_id]
-        racha_actual = racha_data["actual"]
+        racha_actual = racha_vigente(racha_data)
         racha_maxima = racha_data["maxima"]
         
         if racha_actual == 0:
@@ -213,11 +262,19 @@ class RecomendadorIA:
         
         return recomendaciones
     
+    @medido
     def _recomendaciones_motivacionales(self, usuario_id):
         """Recomendaciones motivacionales personalizadas"""
         puntos_totales = self.datos["puntos"].get(usuario_id, 0)
-        total_sesiones = sum(1 for s in self.datos["sesiones"] 
-                           if self.datos["planes"].get(s["plan_id"], {}).get("usuario_id") == usuario_id)
+        resumen = self.datos.get("resumenes", {}).get(usuario_id)
+        if resumen is not None:
+            # Con los resúmenes semanales, sin recorrer las sesiones
+            total = totales(resumen["semanas"].values())
+            total_sesiones, tiempo_total = total["sesiones"], total["minutos"]
+        else:
+            sesiones_usuario = self._sesiones_usuario(usuario_id)
+            total_sesiones = len(sesiones_usuario)
+            tiempo_total = sum(s["duracion"] for s in sesiones_usuario)
         
         motivacionales = []
         
@@ -232,22 +289,22 @@ class RecomendadorIA:
             motivacionales.append("💪 Tu disciplina es admirable. ¡Los grandes logros vienen de pequeños pasos!")
         
         # Motivación basada en tiempo de estudio
-        tiempo_total = sum(s["duracion"] for s in self.datos["sesiones"]
-                          if self.datos["planes"].get(s["plan_id"], {}).get("usuario_id") == usuario_id)
-        
         if tiempo_total >= 300:  # 5 horas
             horas = tiempo_total // 60
             motivacionales.append(f"⏰ Has invertido {horas} horas en tu crecimiento. ¡Eso es dedicación real!")
         
         return motivacionales[:2]  # Máximo 2 motivacionales
     
+    @medido
     def recomendar_horario_optimo(self, usuario_id):
         """Sugiere el mejor horario basado en patrones"""
-        if not self.patrones_estudio["horas_preferidas"]:
-            return "🕐 Aún no tengo suficientes datos. Estudia a diferentes horas para encontrar tu momento óptimo"
+        cacheado = self._del_paquete(usuario_id, "horario_optimo")
+        if cacheado is not None:
+            return cacheado
         
-        horas_exitosas = Counter(self.patrones_estudio["horas_preferidas"])
-        mejor_hora = horas_exitosas.most_common(1)[0][0]
+        mejor_hora = self.analizar_patrones(usuario_id)["hora_favorita"]
+        if mejor_hora is None:
+            return "🕐 Aún no tengo suficientes datos. Estudia a diferentes horas para encontrar tu momento óptimo"
         
         franjas_horarias = {
             range(6, 10): "🌅 Mañana temprano",
@@ -265,17 +322,18 @@ class RecomendadorIA:
         
         return f"🎯 Tu horario óptimo: {franja} (alrededor de las {mejor_hora}:00)"
     
+    @medido
     def recomendar_duracion_ideal(self, usuario_id):
         """Sugiere duración ideal basada en satisfacción vs duración"""
+        cacheado = self._del_paquete(usuario_id, "duracion_ideal")
+        if cacheado is not None:
+            return cacheado
+        
         if not self.datos["sesiones"]:
             return "⏰ Comienza con sesiones de 20-25 minutos para crear el hábito"
         
         # Encontrar sesiones del usuario
-        sesiones_usuario = []
-        for sesion in self.datos["sesiones"]:
-            plan = self.datos["planes"].get(sesion["plan_id"], {})
-            if plan.get("usuario_id") == usuario_id:
-                sesiones_usuario.append(sesion)
+        sesiones_usuario = self._sesiones_usuario(usuario_id)
         
         if not sesiones_usuario:
             return "⏰ Comienza con sesiones de 20-25 minutos"
@@ -316,6 +374,7 @@ class RecomendadorIA:
         
         return recomendaciones_duracion.get(mejor_rango, "🎯 Experimenta con diferentes duraciones")
     
+    @medido
     def generar_plan_personalizado(self, usuario_id, tema):
         """Genera un plan de estudio personalizado usando IA"""
         if usuario_id not in self.datos["usuarios"]:
@@ -324,71 +383,17 @@ class RecomendadorIA:
         usuario = self.datos["usuarios"][usuario_id]
         nivel = usuario["nivel"]
         
-        # Base de conocimiento para diferentes temas y niveles
-        planes_ia = {
-            "python": {
-                "principiante": {
-                    "objetivos": [
-                        "Dominar la sintaxis básica de Python",
-                        "Crear programas simples con variables y loops",
-                        "Entender listas, diccionarios y funciones",
-                        "Hacer tu primer proyecto: calculadora o juego simple"
-                    ],
-                    "recursos_personalizados": [
-                        "🎯 Para tu nivel: Curso interactivo Python.org",
-                        "📚 Libro recomendado: 'Automate the Boring Stuff'",
-                        "💻 Práctica: Ejercicios en Codecademy",
-                        "🎥 Videos: Canal 'Python para Principiantes' YouTube"
-                    ],
-                    "hitos_semanales": [
-                        "Semana 1: Variables, tipos de datos, input/output",
-                        "Semana 2: Condicionales y loops básicos",
-                        "Semana 3: Listas y funciones simples",
-                        "Semana 4: Proyecto final: programa interactivo"
-                    ]
-                },
-                "intermedio": {
-                    "objetivos": [
-                        "Programación orientada a objetos",
-                        "Manejo de archivos y excepciones", 
-                        "Usar librerías como requests y pandas",
-                        "Crear una aplicación web simple"
-                    ],
-                    "recursos_personalizados": [
-                        "🚀 Nivel intermedio: Real Python tutorials",
-                        "📊 Proyecto: Análisis de datos con pandas",
-                        "🌐 Flask para web development",
-                        "🔧 GitHub para versionar tu código"
-                    ]
-                }
-            },
-            "matemáticas": {
-                "principiante": {
-                    "objetivos": [
-                        "Operaciones básicas con confianza",
-                        "Fracciones, decimales y porcentajes",
-                        "Geometría básica y medidas",
-                        "Resolver problemas del mundo real"
-                    ],
-                    "recursos_personalizados": [
-                        "🎓 Khan Academy: módulos interactivos",
-                        "📱 App: Photomath (para verificar resultados)",
-                        "📚 Cuaderno de ejercicios diarios",
-                        "🎯 Problemas cotidianos: cocina, compras, etc."
-                    ]
-                }
-            }
-        }
-        
         # Personalizar según patrones del usuario
         duracion_recomendada = 30
-        if self.patrones_estudio["duracion_promedio"] > 0:
-            duracion_recomendada = min(60, max(20, self.patrones_estudio["duracion_promedio"]))
+        duracion_promedio = self.analizar_patrones(usuario_id)["duracion_promedio"]
+        if duracion_promedio > 0:
+            duracion_recomendada = min(60, max(20, duracion_promedio))
         
-        plan_base = planes_ia.get(tema.lower(), {}).get(nivel, {
+        # Base de conocimiento del catálogo de temas (temas.json)
+        plan_base = CATALOGO.plan_ia(tema, nivel) or {
             "objetivos": [f"Dominar los fundamentos de {tema}", f"Aplicar {tema} en proyectos reales"],
             "recursos_personalizados": [f"Buscar cursos especializados en {tema}"]
-        })
+        }
         
         # Agregar recomendaciones personalizadas
         plan_personalizado = {
@@ -0,0 +1,190 @@
+# importar.py - Importación masiva de usuarios, planes y sesiones desde CSV o JSON Lines
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from servicio import ServicioAprendizaje, NIVELES
+from almacenamiento import ALMACENES
+
+FORMATOS_FECHA = ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+
+
+class ErrorImportacion(ValueError):
+    pass
+
+
+def leer_filas(ruta):
+    """Lee las filas de un archivo CSV o JSON Lines sin cargarlo entero en memoria"""
+    with open(ruta, 'r', encoding='utf-8', newline='') as f:
+        if ruta.endswith((".jsonl", ".json")):
+            for numero, linea in enumerate(f, 1):
+                linea = linea.strip()
+                if linea:
+                    try:
+                        yield numero, json.loads(linea)
+                    except json.JSONDecodeError as e:
+                        yield numero, ErrorImportacion(f"JSON inválido: {e}")
+        else:
+            # La línea 1 es la cabecera del CSV
+            for numero, fila in enumerate(csv.DictReader(f), 2):
+                yield numero, fila
+
+
+def convertir_fecha(valor):
+    if not valor:
+        raise ErrorImportacion("falta la fecha (timestamp)")
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(str(valor).strip(), formato)
+        except ValueError:
+            continue
+    raise ErrorImportacion(f"fecha no reconocida: {valor}")
+
+
+def separar_intereses(valor):
+    """Intereses como lista de textos: admite un texto separado por comas o punto y coma"""
+    if not valor:
+        return []
+    if isinstance(valor, str):
+        return valor.replace(";", ",").split(",")
+    if not isinstance(valor, list) or not all(isinstance(interes, str) for interes in valor):
+        raise ErrorImportacion("los intereses deben ser un texto o una lista de textos")
+    return valor
+
+
+def campo(fila, nombre, obligatorio=True):
+    valor = fila.get(nombre)
+    if isinstance(valor, str):
+        valor = valor.strip()
+    if obligatorio and valor in (None, ""):
+        raise ErrorImportacion(f"falta el campo '{nombre}'")
+    return valor
+
+
+class Importador:
+    """Aplica las filas con las mismas reglas que el asistente, usando las fechas históricas"""
+
+    def __init__(self, servicio, tamano_lote=0):
+        self.servicio = servicio
+        self.tamano_lote = tamano_lote
+        # Identificadores del sistema de origen -> identificadores del asistente
+        self.usuarios = {}
+        self.planes = {}
+        self.contadores = {"usuario": 0, "plan": 0, "sesion": 0}
+        self.errores = []
+        self.pendientes = 0
+        # Veces que las filas importadas se publicaron (se hicieron visibles para otros procesos)
+        self.guardados = 0
+
+    def importar(self, ruta):
+        for numero, fila in leer_filas(ruta):
+            try:
+                if isinstance(fila, ErrorImportacion):
+                    raise fila
+                self.aplicar(fila)
+            except (ErrorImportacion, KeyError, ValueError, TypeError) as e:
+                # Fila mal formada (también valores JSON de otro tipo): se anota y se sigue con la siguiente
+                self.errores.append(f"{os.path.basename(ruta)}:{numero}: {e}")
+                continue
+
+            self.pendientes += 1
+            if self.tamano_lote and self.pendientes >= self.tamano_lote:
+                self.guardar()
+
+    def aplicar(self, fila):
+        tipo = campo(fila, "tipo")
+        if tipo == "usuario":
+            self._usuario(fila)
+        elif tipo == "plan":
+            self._plan(fila)
+        elif tipo == "sesion":
+            self._sesion(fila)
+        else:
+            raise ErrorImportacion(f"tipo desconocido: {tipo}")
+        self.contadores[tipo] += 1
+
+    def _usuario(self, fila):
+        nivel = campo(fila, "nivel", False) or "principiante"
+        if nivel not in NIVELES:
+            raise ErrorImportacion(f"nivel desconocido: {nivel}")
+        intereses = separar_intereses(campo(fila, "intereses", False))
+
+        resultado = self.servicio.crear_usuario(campo(fila, "nombre"), nivel, intereses,
+                                                convertir_fecha(campo(fila, "timestamp")))
+        self.usuarios[str(campo(fila, "id", False) or resultado["usuario_id"])] = resultado["usuario_id"]
+
+    def _plan(self, fila):
+        usuario_id = self._resolver(self.usuarios, campo(fila, "usuario"), self.servicio.datos["usuarios"])
+        dias = int(campo(fila, "dias", False) or 30)
+        resultado = self.servicio.crear_plan_estudio(usuario_id, campo(fila, "tema"), dias,
+                                                     convertir_fecha(campo(fila, "timestamp")))
+        self.planes[str(campo(fila, "id", False) or resultado["plan_id"])] = resultado["plan_id"]
+
+    def _sesion(self, fila):
+        plan_id = self._resolver(self.planes, campo(fila, "plan"), self.servicio.datos["planes"])
+        duracion = int(campo(fila, "duracion"))
+        if duracion <= 0:
+            raise ErrorImportacion("la duración debe ser mayor a 0")
+        puntuacion = float(campo(fila, "puntuacion", False) or 5.0)
+        if not 1 <= puntuacion <= 10:
+            raise ErrorImportacion(f"puntuación fuera de rango: {puntuacion}")
+        self.servicio.registrar_sesion(plan_id, duracion, puntuacion, campo(fila, "notas", False) or "",
+                                       convertir_fecha(campo(fila, "timestamp")))
+
+    def _resolver(self, mapa, externo, existentes):
+        externo = str(externo)
+        if externo in mapa:
+            return mapa[externo]
+        if externo in existentes:
+            return externo
+        raise ErrorImportacion(f"referencia desconocida: {externo}")
+
+    def guardar(self):
+        """Publica el lote en curso: hasta aquí ningún otro proceso ve las filas importadas"""
+        repositorio = self.servicio.repositorio
+        publicaciones = repositorio.publicaciones
+        if not self.servicio.guardar_datos():
+            raise OSError(f"Error al guardar: {self.servicio.error_guardado}")
+        self.pendientes = 0
+        self.guardados += repositorio.publicaciones - publicaciones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa usuarios, planes y sesiones históricas (CSV o JSON Lines)")
+    parser.add_argument("archivos", nargs="+", help="Archivos .csv o .jsonl con una columna 'tipo' (usuario, plan, sesion)")
+    parser.add_argument("--lote", type=int, default=0,
+                        help="Guardar cada N filas (por defecto, una sola vez al final)")
+    parser.add_argument("--almacen", choices=ALMACENES, default=None)
+    parser.add_argument("--carpeta", default="data")
+    args = parser.parse_args(argv)
+
+    servicio = ServicioAprendizaje(args.almacen, args.carpeta)
+    servicio.guardado_automatico = False
+    importador = Importador(servicio, args.lote)
+
+    inicio = time.perf_counter()
+    for ruta in args.archivos:
+        importador.importar(ruta)
+    importador.guardar()
+    duracion = time.perf_counter() - inicio
+
+    total = sum(importador.contadores.values())
+    print("📥 IMPORTACIÓN COMPLETADA")
+    print(f"👥 Usuarios: {importador.contadores['usuario']} | 📚 Planes: {importador.contadores['plan']} | "
+          f"⏰ Sesiones: {importador.contadores['sesion']}")
+    print(f"💾 Guardados: {importador.guardados}")
+    print(f"⚡ {total} filas en {duracion:.2f}s ({total / duracion if duracion else 0:.0f} filas/s)")
+    if importador.errores:
+        print(f"⚠️ {len(importador.errores)} fila(s) con errores:")
+        for error in importador.errores[:20]:
+            print(f"   {error}")
+        if len(importador.errores) > 20:
+            print(f"   ... y {len(importador.errores) - 20} más")
+    return 1 if importador.errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
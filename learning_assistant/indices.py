@@ -0,0 +1,41 @@
+# indices.py - Índices secundarios en memoria sobre los datos del asistente
+from collections import defaultdict
+
+
+class IndiceUsuarios:
+    """Índice usuario_id -> sesiones y planes, mantenido de forma incremental"""
+
+    def __init__(self):
+        self.sesiones_por_usuario = defaultdict(list)
+        self.planes_por_usuario = defaultdict(list)
+        self.usuario_de_plan = {}
+
+    @classmethod
+    def construir(cls, datos):
+        """Construye el índice recorriendo los datos una sola vez"""
+        indice = cls()
+        for plan_id, plan in datos["planes"].items():
+            indice.agregar_plan(plan_id, plan["usuario_id"])
+        for sesion in datos["sesiones"]:
+            indice.agregar_sesion(sesion)
+        return indice
+
+    def agregar_plan(self, plan_id, usuario_id):
+        if plan_id in self.usuario_de_plan:
+            return
+        self.usuario_de_plan[plan_id] = usuario_id
+        self.planes_por_usuario[usuario_id].append(plan_id)
+
+    def agregar_sesion(self, sesion):
+        usuario_id = self.usuario_de_plan.get(sesion.plan_id)
+        if usuario_id is not None:
+            self.sesiones_por_usuario[usuario_id].append(sesion)
+
+    def sesiones(self, usuario_id):
+        return self.sesiones_por_usuario.get(usuario_id, [])
+
+    def planes(self, usuario_id):
+        return self.planes_por_usuario.get(usuario_id, [])
+
+    def contar_sesiones(self, usuario_id):
+        return len(self.sesiones_por_usuario.get(usuario_id, ()))
@@ -0,0 +1,165 @@
+# instrumentacion.py - Llamadas, histogramas de latencia y bytes leídos/escritos de los caminos calientes
+import bisect
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+# Límites superiores (segundos) de los cubos del histograma de latencias
+CUBOS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# ASISTENTE_METRICAS=1 la activa desde el arranque en cualquier programa (consola, servidor, lotes)
+ACTIVA = os.environ.get("ASISTENTE_METRICAS", "").lower() in ("1", "true", "si", "sí")
+
+_cerrojo = threading.Lock()
+_latencias = {}
+_bytes = {}
+# (clase, atributo, función original, etiqueta) de los métodos marcados con @medido
+_medidos = []
+_NULO = contextlib.nullcontext()
+
+
+def _registrar_latencia(etiqueta, segundos):
+    with _cerrojo:
+        medida = _latencias.get(etiqueta)
+        if medida is None:
+            medida = _latencias[etiqueta] = {"llamadas": 0, "segundos": 0.0, "maximo": 0.0,
+                                             "cubos": [0] * (len(CUBOS) + 1)}
+        medida["llamadas"] += 1
+        medida["segundos"] += segundos
+        medida["maximo"] = max(medida["maximo"], segundos)
+        medida["cubos"][bisect.bisect_left(CUBOS, segundos)] += 1
+
+
+def _envolver(funcion, etiqueta):
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            _registrar_latencia(etiqueta, time.perf_counter() - inicio)
+    return envoltura
+
+
+class medido:
+    """Decorador de métodos: cuenta llamadas y latencias como "Clase.metodo".
+
+    Desactivada, la clase conserva el método original (sin envoltura ni comprobaciones);
+    activar() y desactivar() cambian el método de la clase en su sitio."""
+
+    def __init__(self, funcion):
+        self.funcion = funcion
+
+    def __set_name__(self, propietario, nombre):
+        etiqueta = f"{propietario.__name__}.{nombre}"
+        _medidos.append((propietario, nombre, self.funcion, etiqueta))
+        setattr(propietario, nombre, _envolver(self.funcion, etiqueta) if ACTIVA else self.funcion)
+
+
+def bloque(etiqueta):
+    """Context manager para medir un trozo de código (json.load, pickle.load...)"""
+    if not ACTIVA:
+        return _NULO
+    return _bloque(etiqueta)
+
+
+@contextlib.contextmanager
+def _bloque(etiqueta):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registrar_latencia(etiqueta, time.perf_counter() - inicio)
+
+
+def contar_bytes(etiqueta, leidos=0, escritos=0):
+    if not ACTIVA:
+        return
+    with _cerrojo:
+        medida = _bytes.setdefault(etiqueta, {"leidos": 0, "escritos": 0})
+        medida["leidos"] += leidos
+        medida["escritos"] += escritos
+
+
+def activar():
+    global ACTIVA
+    if ACTIVA:
+        return
+    ACTIVA = True
+    for propietario, nombre, funcion, etiqueta in _medidos:
+        setattr(propietario, nombre, _envolver(funcion, etiqueta))
+
+
+def desactivar():
+    global ACTIVA
+    ACTIVA = False
+    for propietario, nombre, funcion, _ in _medidos:
+        setattr(propietario, nombre, funcion)
+
+
+def reiniciar():
+    with _cerrojo:
+        _latencias.clear()
+        _bytes.clear()
+
+
+def como_json():
+    """Métricas acumuladas; las latencias en milisegundos y el histograma como {límite: llamadas}"""
+    with _cerrojo:
+        latencias = {}
+        for etiqueta, medida in sorted(_latencias.items()):
+            limites = [f"{limite * 1000:g}ms" for limite in CUBOS] + ["+inf"]
+            latencias[etiqueta] = {
+                "llamadas": medida["llamadas"],
+                "total_ms": round(medida["segundos"] * 1000, 3),
+                "media_ms": round(medida["segundos"] * 1000 / medida["llamadas"], 3),
+                "maximo_ms": round(medida["maximo"] * 1000, 3),
+                "histograma": {limite: n for limite, n in zip(limites, medida["cubos"]) if n}
+            }
+        return {"activa": ACTIVA, "latencias": latencias, "bytes": {etiqueta: dict(medida)
+                                                                     for etiqueta, medida in sorted(_bytes.items())}}
+
+
+def _etiqueta_prometheus(valor):
+    return valor.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def como_prometheus():
+    """Las mismas métricas en el formato de texto de Prometheus"""
+    lineas = ["# HELP asistente_llamadas_total Llamadas por función medida",
+              "# TYPE asistente_llamadas_total counter"]
+    with _cerrojo:
+        latencias = sorted(_latencias.items())
+        bytes_ = sorted(_bytes.items())
+        for etiqueta, medida in latencias:
+            lineas.append(f'asistente_llamadas_total{{funcion="{_etiqueta_prometheus(etiqueta)}"}} {medida["llamadas"]}')
+
+        lineas += ["# HELP asistente_latencia_segundos Latencia por función medida",
+                   "# TYPE asistente_latencia_segundos histogram"]
+        for etiqueta, medida in latencias:
+            funcion = _etiqueta_prometheus(etiqueta)
+            acumulado = 0
+            for limite, n in zip(CUBOS + (None,), medida["cubos"]):
+                acumulado += n
+                le = "+Inf" if limite is None else f"{limite:g}"
+                lineas.append(f'asistente_latencia_segundos_bucket{{funcion="{funcion}",le="{le}"}} {acumulado}')
+            lineas.append(f'asistente_latencia_segundos_sum{{funcion="{funcion}"}} {medida["segundos"]:.6f}')
+            lineas.append(f'asistente_latencia_segundos_count{{funcion="{funcion}"}} {medida["llamadas"]}')
+
+        lineas += ["# HELP asistente_bytes_total Bytes leídos y escritos por operación",
+                   "# TYPE asistente_bytes_total counter"]
+        for etiqueta, medida in bytes_:
+            for sentido in ("leidos", "escritos"):
+                lineas.append(f'asistente_bytes_total{{operacion="{_etiqueta_prometheus(etiqueta)}",'
+                              f'sentido="{sentido}"}} {medida[sentido]}')
+    return "\n".join(lineas) + "\n"
+
+
+def volcar(formato="json"):
+    """Texto de las métricas en formato "json" o "prometheus" """
+    if formato == "prometheus":
+        return como_prometheus()
+    return json.dumps(como_json(), ensure_ascii=False, indent=2)
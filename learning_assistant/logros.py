@@ -0,0 +1,38 @@
+# logros.py - Motor de logros: reglas declarativas sobre contadores por usuario
+import operator
+
+# Cada logro es una regla (contador, comparación, umbral). Los contadores se mantienen
+# al registrar cada sesión, así que añadir un logro no añade ningún recorrido de los datos.
+REGLAS_LOGROS = {
+    "primer_dia": ("sesiones", operator.ge, 1),
+    "racha_3": ("racha", operator.ge, 3),
+    "racha_7": ("racha", operator.ge, 7),
+    "racha_30": ("racha", operator.ge, 30),
+    "madrugador": ("hora", operator.lt, 8),
+    "nocturno": ("hora", operator.ge, 22),
+    "maraton": ("duracion", operator.ge, 120),
+    "consistente": ("sesiones", operator.ge, 10),
+    "explorador": ("temas", operator.ge, 3),
+    "perfeccionista": ("puntuaciones_altas", operator.ge, 5),
+}
+
+
+def contadores_usuario(perfil, racha, sesion):
+    """Contadores del usuario tras una sesión; `racha` es el largo de la racha a la que pertenece"""
+    return {
+        "sesiones": perfil["sesiones"],
+        "temas": len(perfil["temas"]),
+        "puntuaciones_altas": perfil.get("puntuaciones_altas", 0),
+        "racha": racha,
+        # Las sesiones antiguas pueden no tener hora: sus reglas no se evalúan
+        "hora": sesion.minuto // 60 if sesion.minuto is not None else None,
+        "duracion": sesion.duracion,
+    }
+
+
+def evaluar_reglas(contadores, conseguidos, reglas=REGLAS_LOGROS):
+    """Logros aún no conseguidos cuya regla se cumple, en O(número de reglas)"""
+    conseguidos = set(conseguidos)
+    return [logro for logro, (contador, comparar, umbral) in reglas.items()
+            if logro not in conseguidos and contadores[contador] is not None
+            and comparar(contadores[contador], umbral)]
@@ -1,7 +1,10 @@
 # main.py - Archivo principal del Asistente de Aprendizaje Gamificado
 from assistant import AsistenteAprendizaje
+import argparse
+import instrumentacion
 import os
 import platform
+import time
 
 def limpiar_pantalla():
     """Limpia la pantalla de la consola"""
@@ -41,13 +44,48 @@ def mostrar_consejos():
     import random
     print(f"\n{random.choice(consejos)}")
 
-def main():
+def mostrar_tiempo_arranque(asistente, segundos):
+    origenes = {"cache": "caché binaria", "json": "archivo JSON (caché reconstruida)"}
+    origen = origenes.get(getattr(asistente.repositorio, "origen_carga", None), "almacén sin caché")
+    print(f"\n⏱️ Arranque: {segundos * 1000:.1f} ms | Datos cargados desde: {origen}")
+
+def mostrar_metricas(formato):
+    """Opción oculta del menú ("m"): activa la instrumentación o muestra lo medido hasta ahora"""
+    if not instrumentacion.ACTIVA:
+        instrumentacion.activar()
+        print("📈 Instrumentación activada: vuelve a elegir 'm' para ver las métricas")
+        return
+    print(instrumentacion.volcar(formato))
+
+def guardar_metricas(formato, archivo):
+    texto = instrumentacion.volcar(formato)
+    if archivo:
+        with open(archivo, 'w', encoding='utf-8') as f:
+            f.write(texto)
+        print(f"📈 Métricas guardadas en {archivo}")
+    else:
+        print(texto)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Asistente de Aprendizaje Gamificado")
+    parser.add_argument("--timing", action="store_true", help="Mostrar el tiempo de arranque")
+    parser.add_argument("--metricas", choices=("json", "prometheus"),
+                        help="Medir llamadas, latencias y bytes, y mostrarlos al salir en este formato")
+    parser.add_argument("--metricas-archivo", help="Guardar las métricas al salir en este archivo")
+    args = parser.parse_args(argv)
+    
+    if args.metricas or args.metricas_archivo:
+        instrumentacion.activar()
+    
     limpiar_pantalla()  # Limpiar al iniciar
     mostrar_banner()
     print("🌟 ¡Bienvenido a tu asistente personal de aprendizaje!")
     print("🎮 Gana puntos, desbloquea logros y sube de nivel mientras aprendes")
     
+    inicio = time.perf_counter()
     asistente = AsistenteAprendizaje()
+    if args.timing:
+        mostrar_tiempo_arranque(asistente, time.perf_counter() - inicio)
     
     # Mostrar resumen rápido si hay usuarios
     if asistente.datos["usuarios"]:
@@ -64,6 +102,8 @@ def main():
             
             # Limpiar pantalla antes de mostrar cada opción
             limpiar_pantalla()
+            # Otra instancia del asistente puede haber guardado cambios mientras tanto
+            asistente.servicio.sincronizar()
             
             if opcion == "1":
                 mostrar_banner()
@@ -101,6 +141,9 @@ def main():
                 print("="*40)
                 asistente.menu_ia_avanzado()
                 
+            elif opcion.lower() == "m":
+                mostrar_metricas(args.metricas or "json")
+                
             elif opcion == "7":
                 limpiar_pantalla()
                 mostrar_banner()
@@ -141,6 +184,11 @@ def main():
             continuar = input("\n¿Quieres continuar? (s/n): ").lower().strip()
             if continuar != 's':
                 break
+    
+    # Guardar cualquier cambio pendiente antes de salir
+    asistente.servicio.cerrar()
+    if args.metricas or args.metricas_archivo:
+        guardar_metricas(args.metricas or "json", args.metricas_archivo)
 
 def mostrar_ayuda():
     """Función para mostrar ayuda sobre cómo usar el asistente"""
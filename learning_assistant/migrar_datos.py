@@ -0,0 +1,45 @@
+# migrar_datos.py - Copia todos los datos de un almacén a otro (json, sqlite, fragmentos)
+import argparse
+import os
+import sys
+from almacenamiento import ALMACENES, crear_repositorio, datos_vacios
+from fragmentos import materializar
+
+
+def migrar(origen, destino, carpeta="data"):
+    repo_origen = crear_repositorio(origen, carpeta)
+    if not repo_origen.existe():
+        raise FileNotFoundError(f"No hay datos en el almacén '{origen}' de {carpeta}/")
+
+    datos = materializar(repo_origen.cargar(datos_vacios()))
+    crear_repositorio(destino, carpeta).volcar(datos)
+    return datos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migra los datos del asistente entre almacenes")
+    parser.add_argument("--origen", choices=ALMACENES, default="json")
+    parser.add_argument("--destino", choices=ALMACENES, default="sqlite")
+    parser.add_argument("--carpeta", default="data", help="Carpeta de datos (por defecto: data)")
+    args = parser.parse_args(argv)
+
+    if args.origen == args.destino:
+        parser.error("El origen y el destino deben ser distintos")
+    if not os.path.isdir(args.carpeta):
+        parser.error(f"No existe la carpeta {args.carpeta}")
+
+    try:
+        datos = migrar(args.origen, args.destino, args.carpeta)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"✅ Migración {args.origen} → {args.destino} completada")
+    print(f"👥 {len(datos['usuarios'])} usuario(s) | 📚 {len(datos['planes'])} plan(es) | "
+          f"⏰ {len(datos['sesiones'])} sesión(es)")
+    print(f"💡 Usa ASISTENTE_ALMACEN={args.destino} para trabajar con el nuevo almacén")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
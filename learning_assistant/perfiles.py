@@ -0,0 +1,77 @@
+# perfiles.py - Perfiles de estudio por usuario con acumulados incrementales
+import calendar
+from registros import dia_semana
+from tendencias import actualizar_tendencia, tendencia_vacia
+
+
+def perfil_vacio():
+    return {
+        "sesiones": 0,
+        "suma_duracion": 0,
+        "suma_puntuacion": 0.0,
+        "puntuaciones_altas": 0,  # Sesiones con puntuación 9+
+        "dias": [0] * 7,      # Lunes = 0
+        "horas": [0] * 24,
+        "temas": {},
+        "tendencia": tendencia_vacia()
+    }
+
+
+def actualizar_perfil(perfil, sesion, tema=None):
+    """Suma una sesión al perfil en O(1)"""
+    if "tendencia" not in perfil:
+        # Perfil anterior a las tendencias: las medias empiezan en las del perfil
+        perfil["tendencia"] = tendencia_vacia(perfil)
+    actualizar_tendencia(perfil["tendencia"], sesion)
+    perfil["sesiones"] += 1
+    perfil["suma_duracion"] += sesion["duracion"]
+    perfil["suma_puntuacion"] += sesion["puntuacion"]
+    if sesion["puntuacion"] >= 9:
+        # Perfiles anteriores a este contador no lo tienen
+        perfil["puntuaciones_altas"] = perfil.get("puntuaciones_altas", 0) + 1
+
+    if sesion.minuto is not None:
+        perfil["horas"][sesion.minuto // 60] += 1
+    perfil["dias"][dia_semana(sesion.dia)] += 1
+
+    if tema:
+        perfil["temas"][tema] = perfil["temas"].get(tema, 0) + 1
+    return perfil
+
+
+def construir_perfiles(datos):
+    """Calcula los perfiles de todos los usuarios en una sola pasada (migración)"""
+    perfiles = {}
+    for sesion in datos["sesiones"]:
+        plan = datos["planes"].get(sesion["plan_id"])
+        if not plan:
+            continue
+        perfil = perfiles.setdefault(plan["usuario_id"], perfil_vacio())
+        actualizar_perfil(perfil, sesion, plan.get("tema"))
+    return perfiles
+
+
+def resumen_patrones(perfil, racha_maxima=0):
+    """Convierte los acumulados del perfil en los patrones que usa la IA"""
+    patrones = {
+        "hora_favorita": None,
+        "duracion_promedio": 0,
+        "satisfaccion_promedio": 0,
+        "dias_mas_activos": {},
+        "temas_favoritos": dict(perfil["temas"]),
+        "racha_maxima": racha_maxima
+    }
+
+    if perfil["sesiones"] > 0:
+        patrones["duracion_promedio"] = perfil["suma_duracion"] // perfil["sesiones"]
+        patrones["satisfaccion_promedio"] = perfil["suma_puntuacion"] / perfil["sesiones"]
+
+    horas = perfil["horas"]
+    if any(horas):
+        patrones["hora_favorita"] = max(range(24), key=lambda h: horas[h])
+
+    for dia, cantidad in enumerate(perfil["dias"]):
+        if cantidad:
+            patrones["dias_mas_activos"][calendar.day_name[dia]] = cantidad
+
+    return patrones
@@ -0,0 +1,127 @@
+# prueba_carga.py - Prueba de carga de la API (servidor.py): latencias p50/p99 y peticiones por segundo
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+
+class Cliente:
+    """Conexión HTTP/1.1 persistente con el servidor"""
+
+    def __init__(self, host, puerto):
+        self.host = host
+        self.puerto = puerto
+        self.lector = None
+        self.escritor = None
+
+    async def conectar(self):
+        self.lector, self.escritor = await asyncio.open_connection(self.host, self.puerto)
+
+    async def peticion(self, metodo, ruta, datos=None):
+        cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else b""
+        self.escritor.write((f"{metodo} {ruta} HTTP/1.1\r\nHost: {self.host}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(cuerpo)}\r\n\r\n"
+                             ).encode('latin-1') + cuerpo)
+        await self.escritor.drain()
+
+        estado = int((await self.lector.readline()).split()[1])
+        longitud = 0
+        while True:
+            cabecera = await self.lector.readline()
+            if cabecera in (b"\r\n", b""):
+                break
+            nombre, _, valor = cabecera.decode('latin-1').partition(":")
+            if nombre.lower() == "content-length":
+                longitud = int(valor)
+        return estado, json.loads(await self.lector.readexactly(longitud))
+
+    async def cerrar(self):
+        self.escritor.close()
+        await self.escritor.wait_closed()
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+async def preparar(host, puerto, usuarios):
+    """Crea los usuarios y un plan para cada uno; devuelve los ids de los planes"""
+    cliente = Cliente(host, puerto)
+    await cliente.conectar()
+    planes = []
+    for i in range(usuarios):
+        _, usuario = await cliente.peticion("POST", "/usuarios", {"nombre": f"Carga {i}", "intereses": ["python"]})
+        _, plan = await cliente.peticion("POST", f"/usuarios/{usuario['usuario_id']}/planes", {"tema": "python"})
+        planes.append((usuario["usuario_id"], plan["plan_id"]))
+    await cliente.cerrar()
+    return planes
+
+
+async def trabajador(host, puerto, planes, peticiones, lectura, latencias, errores, semilla):
+    azar = random.Random(semilla)
+    cliente = Cliente(host, puerto)
+    await cliente.conectar()
+    for _ in range(peticiones):
+        usuario_id, plan_id = azar.choice(planes)
+        if azar.random() < lectura:
+            tipo, metodo, ruta, datos = "lectura", "GET", f"/usuarios/{usuario_id}/recomendaciones", None
+        else:
+            tipo, metodo, ruta, datos = "sesion", "POST", f"/planes/{plan_id}/sesiones", {
+                "duracion": azar.randint(10, 120), "puntuacion": azar.randint(1, 10)}
+        inicio = time.perf_counter()
+        estado, _ = await cliente.peticion(metodo, ruta, datos)
+        latencias.setdefault(tipo, []).append((time.perf_counter() - inicio) * 1000)
+        if estado >= 400:
+            errores.append(estado)
+    await cliente.cerrar()
+
+
+async def ejecutar(args):
+    planes = await preparar(args.host, args.puerto, args.usuarios)
+    latencias, errores = {}, []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador(args.host, args.puerto, planes, args.peticiones, args.lectura,
+                                      latencias, errores, args.semilla + i)
+                           for i in range(args.clientes)))
+    duracion = time.perf_counter() - inicio
+
+    total = sum(len(valores) for valores in latencias.values())
+    print(f"⚡ {total} peticiones en {duracion:.2f}s ({total / duracion:.0f} peticiones/s) "
+          f"con {args.clientes} cliente(s) y {args.usuarios} usuario(s)")
+    todas = [valor for valores in latencias.values() for valor in valores]
+    for tipo, valores in sorted(latencias.items()) + [("total", todas)]:
+        print(f"   {tipo:<8} n={len(valores):<6} p50={percentil(valores, 50):7.2f} ms  "
+              f"p99={percentil(valores, 99):7.2f} ms  máx={max(valores):7.2f} ms")
+    if errores:
+        print(f"⚠️ {len(errores)} respuesta(s) con error")
+    cliente = Cliente(args.host, args.puerto)
+    await cliente.conectar()
+    _, metricas = await cliente.peticion("GET", "/metricas")
+    await cliente.cerrar()
+    guardado, confirmacion = metricas["guardado"], metricas["confirmacion"]
+    print(f"💾 Guardados: {confirmacion['grupos']} para {confirmacion['solicitudes']} solicitud(es) "
+          f"({confirmacion['publicaciones']} publicación(es)) | latencia media {guardado['latencia_media_ms']:.2f} ms | "
+          f"{guardado['bytes_escritos']} bytes")
+    return 1 if errores else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga contra una instancia local de servidor.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--clientes", type=int, default=50, help="Conexiones concurrentes")
+    parser.add_argument("--peticiones", type=int, default=200, help="Peticiones por cliente")
+    parser.add_argument("--usuarios", type=int, default=100, help="Usuarios de prueba a crear")
+    parser.add_argument("--lectura", type=float, default=0.5, help="Proporción de peticiones de lectura (0-1)")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args(argv)
+    return asyncio.run(ejecutar(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
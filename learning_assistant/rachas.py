@@ -0,0 +1,69 @@
+# rachas.py - Rachas de estudio calculadas sobre los días distintos de estudio de cada usuario
+import bisect
+import math
+from datetime import date
+
+from registros import dia_ordinal, fecha_texto
+
+
+def racha_vacia():
+    # tramos: días seguidos de estudio como [primer_día, último_día] (ordinales), ordenados
+    return {"actual": 0, "maxima": 0, "ultima_fecha": None, "tramos": []}
+
+
+def agregar_dia(tramos, dia):
+    """Añade un día (ordinal) a los tramos en O(log n) y devuelve el largo del tramo que lo contiene.
+
+    Un día nuevo puede alargar un tramo por cualquiera de sus extremos o unir dos tramos,
+    así que las sesiones atrasadas o importadas se colocan en su sitio."""
+    # Primer tramo que empieza después de `dia`
+    i = bisect.bisect_right(tramos, [dia, math.inf])
+    anterior = tramos[i - 1] if i else None
+    if anterior is not None and anterior[1] >= dia:
+        return anterior[1] - anterior[0] + 1
+
+    une_anterior = anterior is not None and anterior[1] == dia - 1
+    une_siguiente = i < len(tramos) and tramos[i][0] == dia + 1
+    if une_anterior and une_siguiente:
+        anterior[1] = tramos.pop(i)[1]
+        tramo = anterior
+    elif une_anterior:
+        anterior[1] = dia
+        tramo = anterior
+    elif une_siguiente:
+        tramo = tramos[i]
+        tramo[0] = dia
+    else:
+        tramo = [dia, dia]
+        tramos.insert(i, tramo)
+    return tramo[1] - tramo[0] + 1
+
+
+def sumar_dia(racha, dia):
+    """Suma un día de estudio (ordinal) a la racha; devuelve el largo de la racha de ese día"""
+    tramos = racha.setdefault("tramos", [])
+    largo = agregar_dia(tramos, dia)
+    ultimo = tramos[-1]
+    # "actual" es la racha que acaba en el último día estudiado
+    racha["actual"] = ultimo[1] - ultimo[0] + 1
+    racha["maxima"] = max(racha["maxima"], largo)
+    racha["ultima_fecha"] = fecha_texto(ultimo[1])
+    return largo
+
+
+def construir_racha(dias):
+    """Racha completa a partir de todos los días de estudio (ordinales) de un usuario, en cualquier orden"""
+    racha = racha_vacia()
+    for dia in sorted(set(dias)):
+        sumar_dia(racha, dia)
+    return racha
+
+
+def racha_vigente(racha, hoy=None):
+    """Días seguidos hasta hoy: la racha sigue viva si el último día estudiado fue hoy o ayer"""
+    if not racha or not racha.get("ultima_fecha"):
+        return 0
+    hoy = (hoy or date.today()).toordinal()
+    if hoy - dia_ordinal(racha["ultima_fecha"]) > 1:
+        return 0
+    return racha["actual"]
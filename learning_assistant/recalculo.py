@@ -0,0 +1,157 @@
+# recalculo.py - Recalcula puntos, logros, rachas y progreso de los planes desde el historial de sesiones
+import argparse
+import sys
+import time
+
+from logros import REGLAS_LOGROS
+from rachas import racha_vacia, sumar_dia
+
+# Reglas de puntos compartidas con ServicioAprendizaje
+BONUS_PLAN = 5
+BONUS_PLAN_IA = 10
+BONUS_PLAN_COMPLETADO = 50
+
+
+def bonus_plan(plan):
+    return BONUS_PLAN_IA if plan.get("generado_con_ia") else BONUS_PLAN
+
+
+def incremento_progreso(duracion):
+    """Progreso (en %) que aporta una sesión a su plan"""
+    return min(10, max(3, duracion // 15))
+
+
+def recalcular(datos, logros_disponibles, puntos_sesion):
+    """Reproduce todas las sesiones en orden cronológico en una sola pasada.
+
+    `puntos_sesion(duracion, puntuacion)` es la regla de puntos vigente. Devuelve los
+    puntos, logros y rachas por usuario y el progreso por plan tal como deberían ser."""
+    planes = datos["planes"]
+    puntos = {usuario_id: 0 for usuario_id in datos["usuarios"]}
+    logros = {usuario_id: [] for usuario_id in datos["usuarios"]}
+    rachas = {usuario_id: racha_vacia() for usuario_id in datos["usuarios"]}
+    progreso = {}
+    # Por usuario: contadores de las reglas, temas vistos y reglas aún sin cumplir
+    contadores = {}
+    temas = {}
+    pendientes = {}
+    # La regla de puntos es pura y hay pocas combinaciones de duración y puntuación
+    puntos_por_sesion = {}
+
+    for plan_id, plan in planes.items():
+        usuario_id = plan["usuario_id"]
+        puntos[usuario_id] = puntos.get(usuario_id, 0) + bonus_plan(plan)
+        progreso[plan_id] = 0
+
+    sesiones = sorted(datos["sesiones"], key=lambda sesion: (sesion.dia, -1 if sesion.minuto is None else sesion.minuto))
+    for sesion in sesiones:
+        plan_id = sesion.plan_id
+        plan = planes.get(plan_id)
+        if plan is None:
+            continue
+        usuario_id = plan["usuario_id"]
+        duracion = sesion.duracion
+        puntuacion = sesion.puntuacion
+
+        nuevo_progreso = min(100, progreso[plan_id] + incremento_progreso(duracion))
+        progreso[plan_id] = nuevo_progreso
+        ganados = puntos_por_sesion.get((duracion, puntuacion))
+        if ganados is None:
+            ganados = puntos_por_sesion[(duracion, puntuacion)] = puntos_sesion(duracion, puntuacion)
+        if nuevo_progreso >= 100:
+            ganados += BONUS_PLAN_COMPLETADO
+
+        largo_racha = sumar_dia(rachas.setdefault(usuario_id, racha_vacia()), sesion.dia)
+
+        estado = contadores.get(usuario_id)
+        if estado is None:
+            estado = contadores[usuario_id] = {"sesiones": 0, "temas": 0, "puntuaciones_altas": 0}
+            temas[usuario_id] = set()
+            pendientes[usuario_id] = list(REGLAS_LOGROS.items())
+        temas_usuario = temas[usuario_id]
+        temas_usuario.add(plan["tema"])
+        estado["sesiones"] += 1
+        estado["temas"] = len(temas_usuario)
+        if puntuacion >= 9:
+            estado["puntuaciones_altas"] += 1
+        estado["racha"] = largo_racha
+        estado["hora"] = sesion.minuto // 60 if sesion.minuto is not None else None
+        estado["duracion"] = duracion
+
+        # Mismas reglas que evaluar_reglas, pero solo las que el usuario aún no cumple
+        reglas = pendientes[usuario_id]
+        if reglas:
+            cumplidas = [logro for logro, (contador, comparar, umbral) in reglas
+                         if estado[contador] is not None and comparar(estado[contador], umbral)]
+            if cumplidas:
+                pendientes[usuario_id] = [regla for regla in reglas if regla[0] not in cumplidas]
+                for logro in cumplidas:
+                    logros.setdefault(usuario_id, []).append(logro)
+                    ganados += logros_disponibles[logro]["puntos"]
+
+        puntos[usuario_id] = puntos.get(usuario_id, 0) + ganados
+
+    return {"sesiones": len(sesiones), "puntos": puntos, "logros": logros, "rachas": rachas, "progreso": progreso}
+
+
+def diferencias(datos, recalculado):
+    """Usuarios y planes cuyos valores guardados no coinciden con los recalculados"""
+    usuarios = {}
+    for usuario_id, puntos in recalculado["puntos"].items():
+        racha_actual = datos["rachas"].get(usuario_id) or racha_vacia()
+        racha = recalculado["rachas"][usuario_id]
+        comparados = {
+            "puntos": (datos["puntos"].get(usuario_id, 0), puntos),
+            "logros": (sorted(datos["logros"].get(usuario_id, [])), sorted(recalculado["logros"][usuario_id])),
+            "racha_actual": (racha_actual["actual"], racha["actual"]),
+            "racha_maxima": (racha_actual["maxima"], racha["maxima"])
+        }
+        cambios = {campo: {"antes": antes, "despues": despues}
+                   for campo, (antes, despues) in comparados.items() if antes != despues}
+        if cambios:
+            usuarios[usuario_id] = cambios
+
+    planes = {}
+    for plan_id, progreso in recalculado["progreso"].items():
+        antes = datos["planes"][plan_id]["progreso"]
+        if antes != progreso:
+            planes[plan_id] = {"antes": antes, "despues": progreso}
+    return {"usuarios": usuarios, "planes": planes}
+
+
+def main(argv=None):
+    # Importación diferida: servicio.py usa las reglas de este módulo
+    from almacenamiento import ALMACENES
+    from servicio import ServicioAprendizaje
+
+    parser = argparse.ArgumentParser(description="Recalcula puntos, logros, rachas y progreso desde las sesiones")
+    parser.add_argument("--aplicar", action="store_true",
+                        help="Guardar los valores recalculados (por defecto solo se muestran las diferencias)")
+    parser.add_argument("--almacen", choices=ALMACENES, default=None)
+    parser.add_argument("--carpeta", default="data")
+    args = parser.parse_args(argv)
+
+    servicio = ServicioAprendizaje(args.almacen, args.carpeta)
+    inicio = time.perf_counter()
+    resultado = servicio.recalcular_historial(aplicar=args.aplicar)
+    duracion = time.perf_counter() - inicio
+
+    usuarios, planes = resultado["usuarios"], resultado["planes"]
+    print(f"🔁 {resultado['sesiones']} sesiones reproducidas en {duracion:.2f}s")
+    print(f"👥 Usuarios con cambios: {len(usuarios)} | 📚 Planes con otro progreso: {len(planes)}")
+    for usuario_id, cambios in list(usuarios.items())[:20]:
+        detalle = ", ".join(f"{campo}: {cambio['antes']} → {cambio['despues']}" for campo, cambio in cambios.items())
+        print(f"   {usuario_id}: {detalle}")
+    if len(usuarios) > 20:
+        print(f"   ... y {len(usuarios) - 20} más")
+
+    if args.aplicar:
+        servicio.cerrar()
+        print("💾 Valores recalculados guardados")
+    elif usuarios or planes:
+        print("ℹ️ Simulación: usa --aplicar para guardar los cambios")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# recomendaciones_lote.py - Recomendaciones de IA para todos los usuarios en una sola pasada
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from almacenamiento import ALMACENES, crear_repositorio, datos_vacios
+from ia_assistant import RecomendadorIA
+from perfiles import construir_perfiles
+
+
+class VistaAgrupada:
+    """Planes y sesiones agrupados por usuario con una sola pasada sobre los datos"""
+
+    def __init__(self, datos):
+        self.planes = defaultdict(dict)
+        self.sesiones = defaultdict(list)
+        for plan_id, plan in datos["planes"].items():
+            self.planes[plan["usuario_id"]][plan_id] = plan
+        for sesion in datos["sesiones"]:
+            plan = datos["planes"].get(sesion["plan_id"])
+            if plan:
+                self.sesiones[plan["usuario_id"]].append(sesion)
+
+    # Misma interfaz de consultas que los repositorios de almacenamiento.py
+    def planes_de_usuario(self, usuario_id):
+        return self.planes.get(usuario_id, {})
+
+    def sesiones_de_usuario(self, usuario_id):
+        return self.sesiones.get(usuario_id, [])
+
+    def contar_sesiones_usuario(self, usuario_id):
+        return len(self.sesiones.get(usuario_id, ()))
+
+
+def recomendaciones_usuario(recomendador, usuario_id):
+    usuario = recomendador.datos["usuarios"][usuario_id]
+    return {
+        "usuario_id": usuario_id,
+        "nombre": usuario["nombre"],
+        "nivel": usuario["nivel"],
+        "puntos": recomendador.datos["puntos"].get(usuario_id, 0),
+        "recomendaciones": recomendador.generar_recomendaciones_personalizadas(usuario_id),
+        "horario_optimo": recomendador.recomendar_horario_optimo(usuario_id),
+        "duracion_ideal": recomendador.recomendar_duracion_ideal(usuario_id)
+    }
+
+
+# Estado de cada proceso del pool: los datos se envían una vez por proceso, no por usuario
+_recomendador_trabajador = None
+
+
+def _iniciar_trabajador(datos, vista):
+    global _recomendador_trabajador
+    _recomendador_trabajador = RecomendadorIA(datos, vista)
+
+
+def _procesar_bloque(usuarios):
+    return [recomendaciones_usuario(_recomendador_trabajador, usuario_id) for usuario_id in usuarios]
+
+
+def generar_recomendaciones_lote(datos, procesos=1, tamano_bloque=500):
+    """Genera las recomendaciones de todos los usuarios; devuelve un iterador de resultados"""
+    if not datos.get("perfiles") and datos["sesiones"]:
+        datos["perfiles"] = construir_perfiles(datos)
+    vista = VistaAgrupada(datos)
+    usuarios = list(datos["usuarios"])
+
+    if procesos <= 1:
+        recomendador = RecomendadorIA(datos, vista)
+        for usuario_id in usuarios:
+            yield recomendaciones_usuario(recomendador, usuario_id)
+        return
+
+    bloques = [usuarios[i:i + tamano_bloque] for i in range(0, len(usuarios), tamano_bloque)]
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador,
+                             initargs=(datos, vista)) as pool:
+        for resultados in pool.map(_procesar_bloque, bloques):
+            yield from resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera las recomendaciones semanales de todos los usuarios")
+    parser.add_argument("--salida", default="-", help="Archivo JSON Lines de salida (por defecto: stdout)")
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos para repartir el trabajo")
+    parser.add_argument("--almacen", choices=ALMACENES, default=None)
+    parser.add_argument("--carpeta", default="data")
+    args = parser.parse_args(argv)
+
+    repositorio = crear_repositorio(args.almacen, args.carpeta)
+    if not repositorio.existe():
+        print("❌ No hay datos que procesar", file=sys.stderr)
+        return 1
+
+    inicio = time.perf_counter()
+    datos = repositorio.cargar(datos_vacios())
+    salida = sys.stdout if args.salida == "-" else open(args.salida, 'w', encoding='utf-8')
+    total = 0
+    try:
+        for resultado in generar_recomendaciones_lote(datos, args.procesos):
+            salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+            total += 1
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+
+    duracion = time.perf_counter() - inicio
+    print(f"✅ {total} usuario(s) procesados en {duracion:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
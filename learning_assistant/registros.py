@@ -0,0 +1,207 @@
+# registros.py - Sesiones y planes como registros compactos (__slots__) con fechas como ordinales
+import functools
+from datetime import date
+
+
+@functools.lru_cache(maxsize=8192)
+def dia_ordinal(fecha):
+    """'2026-10-18' -> ordinal del día (hay pocas fechas distintas: cada una se convierte una vez)"""
+    return date.fromisoformat(fecha[:10]).toordinal()
+
+
+@functools.lru_cache(maxsize=8192)
+def fecha_texto(dia):
+    return date.fromordinal(dia).isoformat()
+
+
+@functools.lru_cache(maxsize=2048)
+def minuto_del_dia(hora):
+    """'08:30' -> 510"""
+    horas, _, minutos = hora.partition(":")
+    return int(horas) * 60 + int(minutos[:2] or 0)
+
+
+def hora_texto(minuto):
+    return f"{minuto // 60:02d}:{minuto % 60:02d}"
+
+
+def dia_semana(dia):
+    """Día de la semana de un ordinal (lunes = 0, como date.weekday())"""
+    return (dia - 1) % 7
+
+
+class Sesion:
+    """Sesión de estudio. Se usa como atributos (dia, minuto) en el código que lo necesita rápido
+    y como diccionario ("fecha", "hora"...) en el resto; solo pasa a texto al escribir JSON"""
+
+    __slots__ = ("plan_id", "duracion", "puntuacion", "dia", "minuto", "notas")
+
+    CLAVES = ("plan_id", "duracion", "puntuacion", "fecha", "hora", "notas")
+
+    def __init__(self, plan_id, duracion, puntuacion, dia, minuto=None, notas=""):
+        self.plan_id = plan_id
+        self.duracion = duracion
+        self.puntuacion = puntuacion
+        self.dia = dia
+        self.minuto = minuto  # None en sesiones antiguas sin hora
+        self.notas = notas
+
+    def __reduce__(self):
+        # Tupla de campos para la caché de arranque: mucho más rápida que el estado genérico de __slots__
+        return Sesion, (self.plan_id, self.duracion, self.puntuacion, self.dia, self.minuto, self.notas)
+
+    @classmethod
+    def desde_dict(cls, valor):
+        hora = valor.get("hora")
+        return cls(valor["plan_id"], valor["duracion"], valor["puntuacion"], dia_ordinal(valor["fecha"]),
+                   minuto_del_dia(hora) if hora else None, valor.get("notas", ""))
+
+    @property
+    def fecha(self):
+        return fecha_texto(self.dia)
+
+    @property
+    def hora(self):
+        return hora_texto(self.minuto) if self.minuto is not None else None
+
+    def __getitem__(self, clave):
+        if clave not in self.CLAVES or (clave == "hora" and self.minuto is None):
+            raise KeyError(clave)
+        return getattr(self, clave)
+
+    def __setitem__(self, clave, valor):
+        if clave == "fecha":
+            self.dia = dia_ordinal(valor)
+        elif clave == "hora":
+            self.minuto = minuto_del_dia(valor) if valor else None
+        elif clave in self.CLAVES:
+            setattr(self, clave, valor)
+        else:
+            raise KeyError(clave)
+
+    def __contains__(self, clave):
+        return clave in self.CLAVES and (clave != "hora" or self.minuto is not None)
+
+    def get(self, clave, defecto=None):
+        return self[clave] if clave in self else defecto
+
+    def keys(self):
+        return [clave for clave in self.CLAVES if clave in self]
+
+    def a_dict(self):
+        return {clave: self[clave] for clave in self.keys()}
+
+    def __eq__(self, otro):
+        if isinstance(otro, (Sesion, dict)):
+            return self.a_dict() == (otro.a_dict() if isinstance(otro, Sesion) else otro)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Sesion({self.a_dict()!r})"
+
+
+class Plan:
+    """Plan de estudio con las fechas como ordinales; los campos opcionales van en `otros`"""
+
+    __slots__ = ("usuario_id", "tema", "objetivos", "recursos", "progreso", "creacion", "limite", "otros")
+
+    FECHAS = {"fecha_creacion": "creacion", "fecha_limite": "limite"}
+    CLAVES = ("usuario_id", "tema", "objetivos", "recursos", "progreso", "fecha_creacion", "fecha_limite")
+
+    def __init__(self, usuario_id, tema, objetivos, recursos, progreso, creacion, limite, otros=None):
+        self.usuario_id = usuario_id
+        self.tema = tema
+        self.objetivos = objetivos
+        self.recursos = recursos
+        self.progreso = progreso
+        self.creacion = creacion  # None en planes importados sin fechas
+        self.limite = limite
+        # generado_con_ia, duracion_recomendada... (solo si el plan los tiene)
+        self.otros = otros or {}
+
+    def __reduce__(self):
+        return Plan, (self.usuario_id, self.tema, self.objetivos, self.recursos, self.progreso,
+                      self.creacion, self.limite, self.otros)
+
+    @classmethod
+    def desde_dict(cls, valor):
+        otros = {clave: dato for clave, dato in valor.items() if clave not in cls.CLAVES}
+        creacion, limite = (valor.get(clave) for clave in cls.FECHAS)
+        return cls(valor["usuario_id"], valor["tema"], valor.get("objetivos", []), valor.get("recursos", []),
+                   valor.get("progreso", 0), dia_ordinal(creacion) if creacion else None,
+                   dia_ordinal(limite) if limite else None, otros)
+
+    def __getitem__(self, clave):
+        if clave in self.FECHAS:
+            dia = getattr(self, self.FECHAS[clave])
+            if dia is None:
+                raise KeyError(clave)
+            return fecha_texto(dia)
+        if clave in self.CLAVES:
+            return getattr(self, clave)
+        return self.otros[clave]
+
+    def __setitem__(self, clave, valor):
+        if clave in self.FECHAS:
+            setattr(self, self.FECHAS[clave], dia_ordinal(valor))
+        elif clave in self.CLAVES:
+            setattr(self, clave, valor)
+        else:
+            self.otros[clave] = valor
+
+    def __contains__(self, clave):
+        if clave in self.FECHAS:
+            return getattr(self, self.FECHAS[clave]) is not None
+        return clave in self.CLAVES or clave in self.otros
+
+    def get(self, clave, defecto=None):
+        return self[clave] if clave in self else defecto
+
+    def keys(self):
+        return [clave for clave in self.CLAVES if clave in self] + list(self.otros)
+
+    def a_dict(self):
+        return {clave: self[clave] for clave in self.keys()}
+
+    def __eq__(self, otro):
+        if isinstance(otro, (Plan, dict)):
+            return self.a_dict() == (otro.a_dict() if isinstance(otro, Plan) else otro)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Plan({self.a_dict()!r})"
+
+
+def como_sesion(valor):
+    return valor if isinstance(valor, Sesion) else Sesion.desde_dict(valor)
+
+
+def como_plan(valor):
+    return valor if isinstance(valor, Plan) else Plan.desde_dict(valor)
+
+
+def a_json(valor):
+    """default= de json.dumps: los registros se escriben con el mismo formato de siempre"""
+    if isinstance(valor, (Sesion, Plan)):
+        return valor.a_dict()
+    raise TypeError(f"{type(valor).__name__} no es serializable a JSON")
+
+
+def convertir_registros(datos):
+    """Convierte (en el mismo diccionario) las sesiones y planes leídos de JSON en registros"""
+    if isinstance(datos.get("sesiones"), list):
+        datos["sesiones"] = [como_sesion(sesion) for sesion in datos["sesiones"]]
+    planes = datos.get("planes")
+    if isinstance(planes, dict):
+        for plan_id, plan in planes.items():
+            planes[plan_id] = como_plan(plan)
+    return datos
+
+
+def registro_de_cambio(ruta, valor):
+    """El valor de un cambio del diario como registro si es una sesión o un plan completo"""
+    if ruta[0] == "sesiones" and len(ruta) == 1:
+        return como_sesion(valor)
+    if ruta[0] == "planes" and len(ruta) == 2:
+        return como_plan(valor)
+    return valor
@@ -0,0 +1,98 @@
+# resumenes.py - Resúmenes materializados por día y por semana ISO, por usuario y por tema
+from catalogo import normalizar
+from clasificacion import semana_iso
+from registros import fecha_texto
+
+# Un resumen es {"dias": {"2026-10-18": cubo}, "semanas": {"2026-W42": cubo}}. Los temas (claves de
+# los resúmenes de tema y lista de temas del usuario) van normalizados con catalogo.normalizar, como
+# en la clasificación: "Python" y "python " son el mismo tema. Los cubos son
+# listas cortas (se guardan y se cargan mucho más rápido que diccionarios):
+#   [minutos, sesiones, suma de puntuaciones, temas]
+# En los resúmenes de usuario, "temas" es una máscara de bits sobre la lista resumen["temas"]
+# (temas distintos de un rango = bits del OR de sus cubos); los de tema no llevan ese campo
+MINUTOS, SESIONES, SUMA_PUNTUACION, TEMAS = range(4)
+
+
+def resumen_vacio(con_temas=False):
+    resumen = {"dias": {}, "semanas": {}}
+    if con_temas:
+        resumen["temas"] = []
+    return resumen
+
+
+def _sumar(resumen, seccion, clave, sesion, bit):
+    cubo = resumen[seccion].get(clave)
+    if cubo is None:
+        cubo = resumen[seccion][clave] = [0, 0, 0.0] if bit is None else [0, 0, 0.0, 0]
+    cubo[MINUTOS] += sesion["duracion"]
+    cubo[SESIONES] += 1
+    cubo[SUMA_PUNTUACION] += sesion["puntuacion"]
+    if bit is not None:
+        cubo[TEMAS] |= bit
+
+
+def actualizar_resumen(resumen, sesion, tema=None):
+    """Suma una sesión a su día y a su semana en O(1). Devuelve las claves de los dos cubos
+    y si el tema es nuevo en el resumen (la lista de temas también cambió)"""
+    bit, tema_nuevo = None, False
+    if tema is not None:
+        tema = normalizar(tema)
+        temas = resumen.setdefault("temas", [])
+        if tema not in temas:
+            temas.append(tema)
+            tema_nuevo = True
+        bit = 1 << temas.index(tema)
+    dia, semana = fecha_texto(sesion.dia), semana_iso(sesion.dia)
+    _sumar(resumen, "dias", dia, sesion, bit)
+    _sumar(resumen, "semanas", semana, sesion, bit)
+    return dia, semana, tema_nuevo
+
+
+def construir_resumenes(datos):
+    """Resúmenes de todos los usuarios y temas en una sola pasada por las sesiones (migración)"""
+    por_usuario, por_tema = {}, {}
+    for sesion in datos["sesiones"]:
+        plan = datos["planes"].get(sesion["plan_id"])
+        if not plan:
+            continue
+        actualizar_resumen(por_usuario.setdefault(plan["usuario_id"], resumen_vacio(True)), sesion, plan["tema"])
+        actualizar_resumen(por_tema.setdefault(normalizar(plan["tema"]), resumen_vacio()), sesion)
+    return por_usuario, por_tema
+
+
+def cubos_del_rango(resumen, desde=None, hasta=None):
+    """Cubos entre dos días (ordinales, ambos incluidos). Sin rango, los de las semanas;
+    con rango, solo los días pedidos (o los cubos guardados, si son menos que los días)"""
+    if desde is None and hasta is None:
+        return list(resumen["semanas"].values())
+    dias = resumen["dias"]
+    if desde is not None and hasta is not None and hasta - desde + 1 <= len(dias):
+        return [dias[clave] for clave in map(fecha_texto, range(desde, hasta + 1)) if clave in dias]
+    # Las fechas ISO se ordenan como texto
+    inicio = fecha_texto(desde) if desde is not None else ""
+    fin = fecha_texto(hasta) if hasta is not None else "9999"
+    return [cubo for clave, cubo in dias.items() if inicio <= clave <= fin]
+
+
+def totales(cubos):
+    """Minutos, sesiones, suma y media de puntuaciones y temas distintos de una lista de cubos"""
+    minutos = sesiones = mascara = 0
+    suma_puntuacion = 0.0
+    for cubo in cubos:
+        minutos += cubo[MINUTOS]
+        sesiones += cubo[SESIONES]
+        suma_puntuacion += cubo[SUMA_PUNTUACION]
+        if len(cubo) > TEMAS:
+            mascara |= cubo[TEMAS]
+    return {
+        "minutos": minutos,
+        "sesiones": sesiones,
+        "suma_puntuacion": suma_puntuacion,
+        "satisfaccion_promedio": suma_puntuacion / sesiones if sesiones else 0,
+        "temas": bin(mascara).count("1")
+    }
+
+
+def ultimas_semanas(resumen, cantidad=8):
+    """[(semana, cubo)] de las últimas semanas con estudio, de la más antigua a la más reciente"""
+    return sorted(resumen["semanas"].items())[-cantidad:]
@@ -0,0 +1,672 @@
+# servicio.py - Núcleo del asistente sin entrada/salida por consola
+import functools
+import math
+import os
+import threading
+from datetime import date, datetime
+from ia_assistant import RecomendadorIA
+from almacenamiento import crear_repositorio, datos_vacios
+from catalogo import CATALOGO, normalizar
+from guardado import GuardadoDiferido
+from instrumentacion import medido
+from perfiles import construir_perfiles
+from derivados import sumar_a_perfil, sumar_a_racha, sumar_a_resumenes
+from resumenes import (resumen_vacio, construir_resumenes, cubos_del_rango, totales,
+                       ultimas_semanas)
+from logros import contadores_usuario, evaluar_reglas
+from recalculo import BONUS_PLAN, BONUS_PLAN_IA, BONUS_PLAN_COMPLETADO, diferencias, incremento_progreso, recalcular
+from rachas import racha_vacia, racha_vigente
+from registros import Plan, Sesion
+from clasificacion import Clasificacion
+from cache_recomendaciones import CacheRecomendaciones
+from tendencias import analizar_tendencias
+from trigramas import IndiceTrigramas, intereses_sin_explorar
+from columnar import NUMPY_DISPONIBLE, SesionesColumnares
+
+NIVELES = ("principiante", "intermedio", "avanzado")
+
+
+def operacion(metodo):
+    """Ejecuta la operación con el cerrojo del servicio (el guardado diferido corre en otro hilo)
+    y dentro de una transacción del almacén (otros procesos pueden usar los mismos datos).
+    El guardado se pide cuando la transacción ha terminado bien; si falla no se guarda nada"""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self.cerrojo:
+            exterior = self._operaciones == 0
+            externos = self.repositorio.cambios_externos
+            self._operaciones += 1
+            try:
+                with self.repositorio.transaccion():
+                    resultado = metodo(self, *args, **kwargs)
+            except BaseException:
+                if exterior:
+                    self._guardado_pedido = False
+                    if self.repositorio.cambios_externos != externos:
+                        # El almacén deshizo la operación: la vista columnar puede tener sesiones de más
+                        self.columnar = None
+                raise
+            finally:
+                self._operaciones -= 1
+            if exterior and self._guardado_pedido:
+                self._guardado_pedido = False
+                self.guardado.solicitar()
+            return resultado
+    return envoltura
+
+
+class ServicioAprendizaje:
+    """API programática: cada operación devuelve un resultado estructurado y no usa input()/print()"""
+    
+    def __init__(self, almacen=None, carpeta="data", retardo_guardado=None):
+        os.makedirs(carpeta, exist_ok=True)
+        self.repositorio = crear_repositorio(almacen, carpeta)
+        self.cerrojo = threading.RLock()
+        # Con retardo_guardado (segundos) los cambios de varias operaciones se guardan juntos
+        self.guardado = GuardadoDiferido(self.repositorio, retardo_guardado, self.cerrojo)
+        self.aviso_carga = None
+        self._operaciones = 0
+        self._guardado_pedido = False
+        self.guardado_automatico = True
+        self.eventos_puntos = []
+        self.datos = self.cargar_datos()
+        self.logros_disponibles = self.init_logros()
+        self.columnar = None
+        self.clasificacion = None
+        self._cambios_clasificacion = None
+        self._indice_temas = None
+        self._cambios_indice_temas = None
+        self.cache_recomendaciones = CacheRecomendaciones()
+    
+    # ===== DATOS =====
+    
+    @medido
+    def cargar_datos(self):
+        datos = self.datos_vacios()
+        if self.repositorio.existe():
+            try:
+                datos = self.repositorio.cargar(datos)
+                # Asegurar que existan todas las claves necesarias
+                if "puntos" not in datos:
+                    datos["puntos"] = {}
+                if "logros" not in datos:
+                    datos["logros"] = {}
+                if "rachas" not in datos:
+                    datos["rachas"] = {}
+            except Exception as e:
+                # No sobrescribir unos datos que no se pudieron leer: se apartan con otro nombre
+                apartados = self.repositorio.apartar_danados()
+                self.aviso_carga = (f"Error al cargar datos ({e}), se empieza con datos nuevos. "
+                                    f"Copia de los datos dañados: {', '.join(apartados) or 'ninguna'}")
+                datos = self.datos_vacios()
+        self.repositorio.usar_datos(datos)
+        
+        # Datos anteriores a los perfiles por usuario: calcularlos una vez y guardarlos
+        if not datos.get("perfiles") and datos["sesiones"]:
+            datos["perfiles"] = construir_perfiles(datos)
+            for usuario_id, perfil in datos["perfiles"].items():
+                self.registrar_cambio("set", ["perfiles", usuario_id], perfil)
+            self._confirmar()
+        
+        # Datos anteriores a los resúmenes por día y semana, o con los temas sin normalizar ("Python"
+        # y "python" por separado): igual, se rehacen una sola vez
+        temas_anteriores = list(datos.get("resumenes_temas") or {})
+        if datos["sesiones"] and (not temas_anteriores or
+                                  any(tema != normalizar(tema) for tema in temas_anteriores)):
+            datos["resumenes"], datos["resumenes_temas"] = construir_resumenes(datos)
+            for tema in temas_anteriores:
+                if tema not in datos["resumenes_temas"]:
+                    self.registrar_cambio("del", ["resumenes_temas", tema])
+            for seccion in ("resumenes", "resumenes_temas"):
+                for clave, resumen in datos[seccion].items():
+                    self.registrar_cambio("set", [seccion, clave], resumen)
+            self._confirmar()
+        return datos
+    
+    def datos_vacios(self):
+        return datos_vacios()
+    
+    def init_logros(self):
+        return {
+            "primer_dia": {"nombre": "🌱 Primer Paso", "descripcion": "Completar primera sesión", "puntos": 10},
+            "racha_3": {"nombre": "🔥 En Racha", "descripcion": "3 días consecutivos", "puntos": 25},
+            "racha_7": {"nombre": "⚡ Imparable", "descripcion": "7 días consecutivos", "puntos": 50},
+            "racha_30": {"nombre": "👑 Leyenda", "descripcion": "30 días consecutivos", "puntos": 200},
+            "madrugador": {"nombre": "🌅 Madrugador", "descripcion": "Estudiar antes de las 8am", "puntos": 15},
+            "nocturno": {"nombre": "🌙 Búho Nocturno", "descripcion": "Estudiar después de las 10pm", "puntos": 15},
+            "maraton": {"nombre": "🏃 Maratón", "descripcion": "Sesión de más de 2 horas", "puntos": 30},
+            "consistente": {"nombre": "🎯 Consistente", "descripcion": "10 sesiones completadas", "puntos": 40},
+            "explorador": {"nombre": "🗺️ Explorador", "descripcion": "Estudiar 3 temas diferentes", "puntos": 35},
+            "perfeccionista": {"nombre": "💎 Perfeccionista", "descripcion": "5 sesiones con puntuación 9+", "puntos": 45}
+        }
+        
+    def registrar_cambio(self, op, ruta, valor=None, derivado=False):
+        """Anota un cambio de los datos en el almacén. derivado=True: se deduce de la sesión recién
+        registrada (ver derivados.py) y el almacén puede recalcularlo en lugar de guardarlo"""
+        self.repositorio.registrar(op, ruta, valor, derivado)
+    
+    @property
+    def error_guardado(self):
+        return self.guardado.error
+    
+    @medido
+    def guardar_datos(self):
+        """Persiste ya los cambios pendientes; el error queda en error_guardado"""
+        self.guardado.solicitar()
+        return self.guardado.vaciar()
+    
+    @property
+    def guardado_automatico(self):
+        return not self.repositorio.diferido
+    
+    @guardado_automatico.setter
+    def guardado_automatico(self, valor):
+        # Desactivado (importaciones, servidor) el almacén junta las operaciones en un lote que
+        # nadie más ve hasta guardar_datos()
+        self.repositorio.diferido = not valor
+    
+    def _confirmar(self):
+        # Con guardado_automatico desactivado el llamador decide cuándo guardar
+        if not self.guardado_automatico:
+            return
+        if self._operaciones:
+            self._guardado_pedido = True
+        else:
+            self.guardado.solicitar()
+    
+    def sincronizar(self):
+        """Incorpora los cambios que otros procesos hayan guardado desde la última operación"""
+        with self.cerrojo, self.repositorio.transaccion():
+            pass
+    
+    def metricas_guardado(self):
+        """Guardados, bytes escritos y latencia de escritura"""
+        return self.guardado.resumen()
+    
+    def cerrar(self):
+        """Guarda lo pendiente (también un lote sin guardar) antes de terminar"""
+        if not self.guardado_automatico:
+            self.guardado.solicitar()
+        return self.guardado.cerrar()
+    
+    @medido
+    def compactar_datos(self):
+        """Integra los cambios acumulados en el almacén (snapshot en JSON)"""
+        with self.cerrojo:
+            self.guardar_datos()
+            self.repositorio.compactar()
+    
+    def recomendador(self):
+        self.cache_recomendaciones.sincronizar(self.repositorio.cambios_externos)
+        return RecomendadorIA(self.datos, self.repositorio, self.cache_recomendaciones)
+    
+    def metricas_recomendaciones(self):
+        """Aciertos y fallos de la caché de recomendaciones"""
+        return self.cache_recomendaciones.resumen()
+    
+    # ===== OPERACIONES =====
+    
+    @operacion
+    def crear_usuario(self, nombre, nivel="principiante", intereses=None, timestamp=None):
+        """Crea un usuario y devuelve su id y sus datos"""
+        nombre = nombre.strip()
+        if not nombre:
+            raise ValueError("El nombre no puede estar vacío")
+        if nivel not in NIVELES:
+            raise ValueError(f"Nivel desconocido: {nivel}")
+        
+        intereses = [i.strip().lower() for i in (intereses or []) if i.strip()] or ["programación"]
+        momento = timestamp or datetime.now()
+        usuario_id = f"user_{len(self.datos['usuarios']) + 1}"
+        
+        self.datos["usuarios"][usuario_id] = {
+            "nombre": nombre,
+            "nivel": nivel,
+            "intereses": intereses,
+            "fecha_registro": momento.strftime("%Y-%m-%d")
+        }
+        
+        # Inicializar datos de gamificación
+        self.datos["puntos"][usuario_id] = 0
+        self.datos["logros"][usuario_id] = []
+        self.datos["rachas"][usuario_id] = racha_vacia()
+        
+        self.registrar_cambio("set", ["usuarios", usuario_id], self.datos["usuarios"][usuario_id])
+        self.registrar_cambio("set", ["puntos", usuario_id], 0)
+        self.registrar_cambio("set", ["logros", usuario_id], [])
+        self.registrar_cambio("set", ["rachas", usuario_id], self.datos["rachas"][usuario_id])
+        if self.clasificacion is not None:
+            self.clasificacion.actualizar_usuario(usuario_id, 0)
+        if self._indice_temas is not None:
+            for interes in intereses:
+                self._indice_temas.agregar(interes)
+        
+        self._confirmar()
+        return {"usuario_id": usuario_id, "usuario": self.datos["usuarios"][usuario_id]}
+    
+    @operacion
+    def crear_plan_estudio(self, usuario_id, tema, dias=30, timestamp=None):
+        """Crea un plan con objetivos y recursos generados automáticamente (+5 puntos)"""
+        usuario = self._usuario(usuario_id)
+        tema = self._tema(tema)
+        plan = {
+            "objetivos": self.generar_objetivos(tema, usuario["nivel"]),
+            "recursos": self.generar_recursos(tema)
+        }
+        return self._agregar_plan(usuario_id, tema, dias, timestamp, plan, BONUS_PLAN, "Crear nuevo plan de estudio")
+    
+    @operacion
+    def crear_plan_ia(self, usuario_id, plan_ia, dias=30, timestamp=None):
+        """Guarda un plan generado por RecomendadorIA.generar_plan_personalizado (+10 puntos)"""
+        self._usuario(usuario_id)
+        plan = {
+            "objetivos": plan_ia["objetivos"],
+            "recursos": plan_ia["recursos"],
+            "generado_con_ia": True,
+            "duracion_recomendada": plan_ia["duracion_recomendada"]
+        }
+        return self._agregar_plan(usuario_id, self._tema(plan_ia["tema"]), dias, timestamp, plan,
+                                  BONUS_PLAN_IA, "Crear plan personalizado con IA")
+    
+    def _usuario(self, usuario_id):
+        if usuario_id not in self.datos["usuarios"]:
+            raise KeyError(f"Usuario no encontrado: {usuario_id}")
+        return self.datos["usuarios"][usuario_id]
+    
+    def _tema(self, tema):
+        tema = tema.strip()
+        if not tema:
+            raise ValueError("Debes especificar un tema")
+        return tema
+    
+    def _agregar_plan(self, usuario_id, tema, dias, timestamp, campos, bonus, razon):
+        if dias <= 0:
+            dias = 30
+        momento = timestamp or datetime.now()
+        self.eventos_puntos = []
+        
+        plan_id = f"plan_{len(self.datos['planes']) + 1}"
+        creacion = momento.toordinal()
+        plan = Plan(usuario_id, tema, campos.pop("objetivos"), campos.pop("recursos"), 0,
+                    creacion, creacion + dias, campos)
+        self.datos["planes"][plan_id] = plan
+        self.registrar_cambio("set", ["planes", plan_id], plan)
+        self.cache_recomendaciones.invalidar(usuario_id)
+        if self._indice_temas is not None:
+            self._indice_temas.agregar(tema)
+        
+        # Bonus por crear plan
+        self.agregar_puntos(usuario_id, bonus, razon)
+        
+        self._confirmar()
+        return {"plan_id": plan_id, "plan": plan, "puntos_ganados": bonus, "eventos": self.eventos_puntos}
+    
+    @medido
+    @operacion
+    def registrar_sesion(self, plan_id, duracion, puntuacion=5.0, notas="", timestamp=None):
+        """Registra una sesión y aplica progreso, puntos, racha y logros"""
+        if plan_id not in self.datos["planes"]:
+            raise KeyError(f"Plan no encontrado: {plan_id}")
+        if duracion <= 0:
+            raise ValueError("La duración debe ser mayor a 0")
+        
+        puntuacion = max(1, min(10, float(puntuacion)))
+        momento = timestamp or datetime.now()
+        plan = self.datos["planes"][plan_id]
+        usuario_id = plan["usuario_id"]
+        self.eventos_puntos = []
+        
+        # Calcular progreso basado en duración y puntuación
+        incremento = incremento_progreso(duracion)
+        
+        # Actualizar progreso
+        progreso_anterior = plan["progreso"]
+        nuevo_progreso = min(100, progreso_anterior + incremento)
+        plan["progreso"] = round(nuevo_progreso, 1)
+        self.registrar_cambio("set", ["planes", plan_id, "progreso"], plan["progreso"])
+        
+        # Registrar sesión
+        sesion = Sesion(plan_id, duracion, puntuacion, momento.toordinal(),
+                        momento.hour * 60 + momento.minute, notas)
+        
+        self.datos["sesiones"].append(sesion)
+        self.registrar_cambio("append", ["sesiones"], sesion)
+        
+        # Sistema de puntos y logros
+        perfil = self.actualizar_perfil(usuario_id, sesion, plan["tema"])
+        self.actualizar_resumenes(usuario_id, sesion, plan["tema"])
+        
+        puntos_ganados = self.calcular_puntos_sesion(duracion, puntuacion)
+        self.agregar_puntos(usuario_id, puntos_ganados, f"Sesión de {plan['tema']}")
+        if self.clasificacion is not None:
+            self.clasificacion.registrar_sesion(usuario_id, plan["tema"], sesion.dia, puntos_ganados)
+        
+        # Actualizar racha
+        largo_racha = self.actualizar_racha(usuario_id, sesion.dia)
+        
+        # Verificar logros
+        nuevos_logros = self.verificar_logros(usuario_id, contadores_usuario(perfil, largo_racha, sesion))
+        
+        # Bonus por completar el plan (antes de guardar, para que no se pierda)
+        plan_completado = nuevo_progreso >= 100
+        if plan_completado:
+            self.agregar_puntos(usuario_id, BONUS_PLAN_COMPLETADO, "¡Plan completado!")
+        
+        # Después de todos los cambios (perfil, racha, logros): un paquete calculado a medias no vale
+        self.cache_recomendaciones.invalidar(usuario_id)
+        self._confirmar()
+        
+        puntos_totales = self.datos["puntos"][usuario_id]
+        return {
+            "sesion": sesion,
+            "usuario_id": usuario_id,
+            "puntos_ganados": puntos_ganados,
+            "progreso_anterior": progreso_anterior,
+            "progreso": nuevo_progreso,
+            "incremento": incremento,
+            "racha": racha_vigente(self.datos["rachas"][usuario_id]),
+            "nuevos_logros": nuevos_logros,
+            "plan_completado": plan_completado,
+            "puntos_totales": puntos_totales,
+            "nivel": self.calcular_nivel(puntos_totales),
+            "eventos": self.eventos_puntos
+        }
+    
+    # ===== REGLAS DE JUEGO =====
+    
+    def calcular_puntos_sesion(self, duracion, puntuacion):
+        # Puntos base por duración
+        puntos_base = min(duracion // 10, 20)  # Máximo 20 puntos por duración
+        
+        # Bonus por satisfacción alta
+        if puntuacion >= 8:
+            puntos_base += 5
+        elif puntuacion >= 6:
+            puntos_base += 2
+        
+        return max(puntos_base, 1)  # Mínimo 1 punto
+        
+    def agregar_puntos(self, usuario_id, puntos, razon):
+        if usuario_id not in self.datos["puntos"]:
+            self.datos["puntos"][usuario_id] = 0
+        
+        self.datos["puntos"][usuario_id] += puntos
+        self.cache_recomendaciones.invalidar(usuario_id)
+        self.registrar_cambio("set", ["puntos", usuario_id], self.datos["puntos"][usuario_id])
+        self.eventos_puntos.append({"puntos": puntos, "razon": razon})
+        if self.clasificacion is not None:
+            self.clasificacion.actualizar_usuario(usuario_id, self.datos["puntos"][usuario_id])
+    
+    def actualizar_perfil(self, usuario_id, sesion, tema):
+        """Actualiza los acumulados de patrones de estudio del usuario"""
+        perfil = sumar_a_perfil(self.datos["perfiles"], usuario_id, sesion, tema)
+        self.registrar_cambio("set", ["perfiles", usuario_id], perfil, derivado=True)
+        return perfil
+    
+    def actualizar_resumenes(self, usuario_id, sesion, tema):
+        """Suma la sesión a los cubos de su día y su semana, del usuario y del tema"""
+        for seccion, clave, resumen, creado, dia, semana, tema_nuevo in sumar_a_resumenes(
+                self.datos, usuario_id, sesion, tema):
+            # Solo se anotan los cubos tocados, no el resumen entero
+            if creado:
+                self.registrar_cambio("set", [seccion, clave], resumen, derivado=True)
+            elif tema_nuevo:
+                self.registrar_cambio("set", [seccion, clave, "temas"], resumen["temas"], derivado=True)
+            if not creado:
+                self.registrar_cambio("set", [seccion, clave, "dias", dia], resumen["dias"][dia], derivado=True)
+                self.registrar_cambio("set", [seccion, clave, "semanas", semana], resumen["semanas"][semana],
+                                      derivado=True)
+        
+    def actualizar_racha(self, usuario_id, dia=None):
+        """Añade el día (ordinal) a la racha del usuario y devuelve el largo de la racha de ese día"""
+        # Una racha guardada sin días de estudio se reconstruye una vez con las sesiones del usuario
+        racha_data, largo = sumar_a_racha(self.datos["rachas"], usuario_id, dia or date.today().toordinal(),
+                                          lambda: (s.dia for s in self.repositorio.sesiones_de_usuario(usuario_id)))
+        self.registrar_cambio("set", ["rachas", usuario_id], racha_data, derivado=dia is not None)
+        return largo
+    
+    def verificar_logros(self, usuario_id, contadores):
+        """Evalúa las reglas de logros con los contadores del usuario y otorga los nuevos"""
+        logros_usuario = self.datos["logros"].setdefault(usuario_id, [])
+        nuevos_logros = evaluar_reglas(contadores, logros_usuario)
+        
+        for logro in nuevos_logros:
+            info = self.logros_disponibles[logro]
+            logros_usuario.append(logro)
+            # "🌱 Primer Paso" -> "Logro: Primer Paso"
+            self.agregar_puntos(usuario_id, info["puntos"], f"Logro: {info['nombre'].split(' ', 1)[-1]}")
+        
+        if nuevos_logros:
+            self.registrar_cambio("set", ["logros", usuario_id], logros_usuario)
+        
+        return nuevos_logros
+    
+    
+    @medido
+    @operacion
+    def recalcular_historial(self, aplicar=False):
+        """Reproduce todo el historial de sesiones con las reglas actuales.
+        
+        Devuelve las diferencias con los totales guardados; con aplicar=True además
+        los reemplaza por los valores recalculados."""
+        recalculado = recalcular(self.datos, self.logros_disponibles, self.calcular_puntos_sesion)
+        cambios = diferencias(self.datos, recalculado)
+        
+        if aplicar:
+            for usuario_id in cambios["usuarios"]:
+                for seccion in ("puntos", "logros", "rachas"):
+                    self.datos[seccion][usuario_id] = recalculado[seccion][usuario_id]
+                    self.registrar_cambio("set", [seccion, usuario_id], self.datos[seccion][usuario_id])
+            for plan_id, cambio in cambios["planes"].items():
+                self.datos["planes"][plan_id]["progreso"] = cambio["despues"]
+                self.registrar_cambio("set", ["planes", plan_id, "progreso"], cambio["despues"])
+            self.clasificacion = None
+            self.cache_recomendaciones.vaciar()
+            self._confirmar()
+        
+        return {"sesiones": recalculado["sesiones"], "aplicado": aplicar, **cambios}
+    
+    
+    # ===== CONSULTAS =====
+    
+    def sesiones_columnares(self):
+        """Vista columnar de las sesiones (None si NumPy no está disponible)"""
+        if not NUMPY_DISPONIBLE:
+            return None
+        if self.columnar is None:
+            self.columnar = SesionesColumnares()
+        return self.columnar.sincronizar(self.datos)
+    
+    def estadisticas_por_usuario(self):
+        """Tiempo, sesiones, suma de puntuaciones y temas distintos por usuario"""
+        columnar = self.sesiones_columnares()
+        if columnar is not None:
+            return columnar.por_usuario()
+        
+        # Sin NumPy: con los resúmenes semanales, sin recorrer las sesiones
+        estadisticas_usuario = {}
+        for usuario_id, resumen in self.datos.get("resumenes", {}).items():
+            total = totales(resumen["semanas"].values())
+            estadisticas_usuario[usuario_id] = {
+                "total_tiempo": total["minutos"],
+                "total_sesiones": total["sesiones"],
+                "suma_puntuacion": total["suma_puntuacion"],
+                "temas_estudiados": total["temas"]
+            }
+        return estadisticas_usuario
+    
+    def resumen_de_usuario(self, usuario_id, desde=None, hasta=None):
+        """Minutos, sesiones, satisfacción media y temas distintos entre dos días (ordinales,
+        incluidos; sin rango, todo el historial). Recorre cubos de días o semanas, no sesiones"""
+        resumen = self.datos.get("resumenes", {}).get(usuario_id) or resumen_vacio()
+        return totales(cubos_del_rango(resumen, desde, hasta))
+    
+    def resumen_de_tema(self, tema, desde=None, hasta=None):
+        resumen = self.datos.get("resumenes_temas", {}).get(normalizar(tema)) or resumen_vacio()
+        return totales(cubos_del_rango(resumen, desde, hasta))
+    
+    def resumen_plataforma(self, desde=None, hasta=None):
+        """Totales de todos los temas (cada sesión está en el resumen de un solo tema)"""
+        resumenes = self.datos.get("resumenes_temas", {}).values()
+        total = totales(cubo for resumen in resumenes for cubo in cubos_del_rango(resumen, desde, hasta))
+        total["temas"] = sum(1 for resumen in resumenes if cubos_del_rango(resumen, desde, hasta))
+        return total
+    
+    def temas_mas_estudiados(self, dias=28, limite=3, hoy=None):
+        """[(tema, minutos)] de los temas con más minutos en los últimos `dias` días"""
+        hasta = hoy or date.today().toordinal()
+        minutos = {tema: self.resumen_de_tema(tema, hasta - dias + 1, hasta)["minutos"]
+                   for tema in self.datos.get("resumenes_temas", {})}
+        return sorted(((tema, total) for tema, total in minutos.items() if total),
+                      key=lambda par: -par[1])[:limite]
+    
+    def tendencias_de_usuario(self, usuario_id, hoy=None):
+        """Medias móviles de satisfacción, duración y minutos por día, ventanas de 7 y 30 días
+        y cambios detectados recientemente"""
+        resumen = self.datos.get("resumenes", {}).get(usuario_id) or resumen_vacio()
+        return analizar_tendencias(self.datos["perfiles"].get(usuario_id), resumen, hoy or date.today().toordinal())
+    
+    def semanas_de_usuario(self, usuario_id, cantidad=8):
+        """[(semana ISO, totales)] de las últimas semanas con estudio del usuario"""
+        resumen = self.datos.get("resumenes", {}).get(usuario_id) or resumen_vacio()
+        return [(semana, totales([cubo])) for semana, cubo in ultimas_semanas(resumen, cantidad)]
+    
+    def tabla_clasificacion(self):
+        """Clasificación en memoria, creada al primer uso y rehecha si otro proceso cambió los datos"""
+        externos = self.repositorio.cambios_externos
+        if self.clasificacion is None or self._cambios_clasificacion != externos:
+            self.clasificacion = Clasificacion(self.datos, self.calcular_puntos_sesion)
+            self._cambios_clasificacion = externos
+        return self.clasificacion
+    
+    def clasificacion_top(self, k=10, tema=None, semana=None):
+        """Los k primeros de la clasificación general, de un tema o de una semana ISO ('2026-W42')"""
+        tabla = self.tabla_clasificacion().tabla(tema, semana)
+        usuarios = self.datos["usuarios"]
+        return [{"posicion": tabla.posicion(usuario_id), "usuario_id": usuario_id,
+                 "nombre": usuarios.get(usuario_id, {}).get("nombre", usuario_id), "puntos": puntos}
+                for usuario_id, puntos in tabla.top(k)]
+    
+    def posicion_de_usuario(self, usuario_id, vecinos=2, tema=None, semana=None):
+        """Puesto del usuario, total de participantes y los usuarios que tiene justo delante y detrás"""
+        self._usuario(usuario_id)
+        tabla = self.tabla_clasificacion().tabla(tema, semana)
+        if usuario_id not in tabla:
+            return {"posicion": None, "total": len(tabla), "puntos": 0, "vecinos": []}
+        return {
+            "posicion": tabla.posicion(usuario_id),
+            "total": len(tabla),
+            "puntos": tabla.puntos[usuario_id],
+            "vecinos": [{"posicion": tabla.posicion(otro), "usuario_id": otro, "puntos": puntos}
+                        for otro, puntos in tabla.vecinos(usuario_id, vecinos)]
+        }
+    
+    def distribucion_niveles(self):
+        """Usuarios en cada nivel de juego, contados con búsquedas binarias sobre la clasificación"""
+        tabla = self.tabla_clasificacion().general
+        if not len(tabla):
+            return {}
+        maximo = tabla.top(1)[0][1]
+        distribucion = {}
+        inicio, nivel = -math.inf, 1
+        while inicio <= maximo:
+            # Primer punto del nivel siguiente según las reglas de calcular_nivel
+            base = max(inicio, 0)
+            siguiente = base + self.puntos_para_siguiente_nivel(base)
+            distribucion[nivel] = tabla.contar_desde(inicio) - tabla.contar_desde(siguiente)
+            inicio, nivel = siguiente, nivel + 1
+        return distribucion
+    
+    def indice_temas(self):
+        """Índice de trigramas de los temas (catálogo, planes e intereses), creado al primer uso"""
+        externos = self.repositorio.cambios_externos
+        if self._indice_temas is None or self._cambios_indice_temas != externos:
+            self._indice_temas = IndiceTrigramas.construir(self.datos)
+            self._cambios_indice_temas = externos
+        return self._indice_temas
+    
+    def sugerir_temas(self, texto, limite=3):
+        """[(tema, parecido)] de los temas conocidos más parecidos al texto ("¿quisiste decir?")"""
+        return self.indice_temas().buscar(texto, limite)
+    
+    def temas_relacionados(self, tema, limite=5):
+        return self.indice_temas().relacionados(tema, limite)
+    
+    def intereses_sin_explorar(self, usuario_id):
+        """Intereses del usuario para los que aún no tiene ningún plan"""
+        usuario = self._usuario(usuario_id)
+        temas = [plan["tema"] for plan in self.repositorio.planes_de_usuario(usuario_id).values()]
+        return intereses_sin_explorar(usuario["intereses"], temas)
+    
+    def racha_de_usuario(self, usuario_id, hoy=None):
+        """Racha vigente (0 si ya pasó más de un día sin estudiar), récord y último día estudiado"""
+        racha = self.datos["rachas"].get(usuario_id) or racha_vacia()
+        return {"actual": racha_vigente(racha, hoy), "maxima": racha["maxima"], "ultima_fecha": racha["ultima_fecha"]}
+    
+    def logros_de_usuario(self, usuario_id):
+        """Puntos, nivel y logros conseguidos/pendientes de un usuario"""
+        self._usuario(usuario_id)
+        conseguidos = self.datos["logros"].get(usuario_id, [])
+        puntos = self.datos["puntos"].get(usuario_id, 0)
+        return {
+            "puntos": puntos,
+            "nivel": self.calcular_nivel(puntos),
+            "puntos_siguiente_nivel": self.puntos_para_siguiente_nivel(puntos),
+            "conseguidos": [dict(self.logros_disponibles[logro], id=logro) for logro in conseguidos],
+            "pendientes": [dict(info, id=logro) for logro, info in self.logros_disponibles.items()
+                           if logro not in conseguidos]
+        }
+
+    def calcular_nivel(self, puntos):
+        if puntos < 50:
+            return 1
+        elif puntos < 150:
+            return 2
+        elif puntos < 300:
+            return 3
+        elif puntos < 500:
+            return 4
+        else:
+            return 5 + (puntos - 500) // 200
+    
+    def puntos_para_siguiente_nivel(self, puntos):
+        if puntos < 50:
+            return 50 - puntos
+        elif puntos < 150:
+            return 150 - puntos
+        elif puntos < 300:
+            return 300 - puntos
+        elif puntos < 500:
+            return 500 - puntos
+        else:
+            siguiente_nivel = ((puntos - 500) // 200 + 1) * 200 + 500
+            return siguiente_nivel - puntos
+    
+    
+    # ===== BASE DE CONOCIMIENTO =====
+    
+    def generar_objetivos(self, tema, nivel):
+        objetivos = CATALOGO.objetivos(tema, nivel)
+        if objetivos is not None:
+            return objetivos
+        
+        # Objetivos genéricos si no encuentra el tema específico
+        return [
+            f"Entender los fundamentos de {tema}",
+            f"Practicar {tema} regularmente", 
+            f"Aplicar {tema} en situaciones reales",
+            f"Alcanzar nivel {nivel} en {tema}"
+        ]
+    
+    def generar_recursos(self, tema):
+        recursos = CATALOGO.recursos(tema)
+        if recursos is not None:
+            return recursos
+        
+        # Recursos genéricos
+        return [
+            f"🔍 Buscar cursos online de {tema}",
+            f"📚 Libros especializados en {tema}",
+            f"🎥 Videos educativos en YouTube",
+            f"💪 Práctica diaria de {tema}"
+        ]
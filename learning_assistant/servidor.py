@@ -0,0 +1,433 @@
+# servidor.py - API HTTP/JSON del asistente (asyncio, solo biblioteca estándar)
+import argparse
+import asyncio
+import functools
+import json
+import re
+import signal
+import sys
+import time
+from datetime import date
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import unquote
+import instrumentacion
+from almacenamiento import ALMACENES
+from importar import ErrorImportacion, separar_intereses
+from registros import a_json
+from servicio import ServicioAprendizaje
+
+ESTADOS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+TAMANO_MAXIMO_CUERPO = 1 << 20
+
+
+def serializar(valor):
+    """default= de las respuestas: sesiones y planes como siempre, el resto como texto"""
+    try:
+        return a_json(valor)
+    except TypeError:
+        return str(valor)
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class ConfirmacionAgrupada:
+    """Guardado en grupo: las peticiones que esperan a la vez comparten un mismo guardado.
+
+    Los grupos se forman en el hilo del servicio: cada operación con cambios se apunta al
+    grupo abierto al terminar, y el guardado (en ese mismo hilo, detrás de las operaciones ya
+    en cola) se lleva el grupo entero; las que lleguen mientras dura van al siguiente."""
+
+    def __init__(self, servicio, ejecutor):
+        self.servicio = servicio
+        self.ejecutor = ejecutor
+        self.siguiente = None
+        self.tarea = None
+        self.esperando = 0
+        self.solicitudes = 0
+        self.grupos = 0
+
+    def apuntar(self):
+        """En el hilo del servicio, justo después de una operación: futuro del guardado que la incluye"""
+        self.solicitudes += 1
+        if self.siguiente is None:
+            self.siguiente = Future()
+        return self.siguiente
+
+    async def confirmar(self, grupo):
+        self.esperando += 1
+        try:
+            if self.tarea is None or self.tarea.done():
+                self.tarea = asyncio.ensure_future(self._guardar())
+            correcto = await asyncio.shield(asyncio.wrap_future(grupo))
+        finally:
+            self.esperando -= 1
+        if not correcto:
+            raise ErrorHTTP(500, f"Error al guardar: {self.servicio.error_guardado}")
+
+    async def _guardar(self):
+        bucle = asyncio.get_running_loop()
+        while self.esperando:
+            if await bucle.run_in_executor(self.ejecutor, self._guardar_grupo):
+                self.grupos += 1
+
+    def _guardar_grupo(self):
+        grupo, self.siguiente = self.siguiente, None
+        if grupo is None:
+            return False
+        grupo.set_result(self.servicio.guardar_datos())
+        return True
+
+    def resumen(self):
+        return {"solicitudes": self.solicitudes, "grupos": self.grupos,
+                "publicaciones": self.servicio.repositorio.publicaciones}
+
+
+class ServidorAsistente:
+    """Rutas REST sobre ServicioAprendizaje.
+
+    Todas las operaciones (también las escrituras de usuarios distintos) se aplican una a una en
+    el hilo del servicio: el servicio y el almacén comparten clasificación, resúmenes por tema y
+    transacción. Lo que se solapa es la espera al disco: el guardado en grupo confirma de una vez
+    las operaciones que llegan mientras dura el anterior."""
+
+    def __init__(self, servicio):
+        self.servicio = servicio
+        # El servidor decide cuándo guardar (guardado en grupo tras cada operación)
+        self.servicio.guardado_automatico = False
+        # Todo el trabajo con el servicio (puede esperar al disco o a otros procesos) va a un
+        # solo hilo: el bucle de eventos sigue atendiendo y el servicio ve una petición cada vez.
+        # No se puede ampliar sin cerrojos por usuario en el servicio y en el almacén
+        self.ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="servicio")
+        self.confirmacion = ConfirmacionAgrupada(servicio, self.ejecutor)
+        self.cerrojos = {}
+        self.peticiones = 0
+        self.rutas = [
+            ("GET", r"/salud", self.salud),
+            ("GET", r"/metricas", self.metricas),
+            ("GET", r"/usuarios", self.listar_usuarios),
+            ("POST", r"/usuarios", self.crear_usuario),
+            ("GET", r"/usuarios/([^/]+)", self.ver_usuario),
+            ("GET", r"/usuarios/([^/]+)/planes", self.listar_planes),
+            ("POST", r"/usuarios/([^/]+)/planes", self.crear_plan),
+            ("POST", r"/usuarios/([^/]+)/planes-ia", self.crear_plan_ia),
+            ("GET", r"/usuarios/([^/]+)/logros", self.ver_logros),
+            ("GET", r"/usuarios/([^/]+)/recomendaciones", self.ver_recomendaciones),
+            ("GET", r"/usuarios/([^/]+)/patrones", self.ver_patrones),
+            ("GET", r"/usuarios/([^/]+)/resumen", self.ver_resumen),
+            ("POST", r"/usuarios/([^/]+)/planes-ia/propuesta", self.proponer_plan_ia),
+            ("POST", r"/planes/([^/]+)/sesiones", self.registrar_sesion),
+            ("GET", r"/clasificacion", self.ver_clasificacion),
+            ("GET", r"/clasificacion/temas/([^/]+)", self.ver_clasificacion_tema),
+            ("GET", r"/clasificacion/semanas/([^/]+)", self.ver_clasificacion_semana),
+            ("GET", r"/usuarios/([^/]+)/clasificacion", self.ver_posicion),
+        ]
+        self.rutas = [(metodo, re.compile(patron + r"/?$"), manejador) for metodo, patron, manejador in self.rutas]
+
+    def cerrojo_usuario(self, usuario_id):
+        # Solo ordena: las operaciones de un mismo usuario se aplican y confirman en el orden de
+        # llegada (la siguiente no entra en el hilo del servicio hasta que la anterior está en
+        # disco). Las de usuarios distintos se serializan igual en el hilo del servicio
+        cerrojo = self.cerrojos.get(usuario_id)
+        if cerrojo is None:
+            cerrojo = self.cerrojos[usuario_id] = asyncio.Lock()
+        return cerrojo
+
+    def _usuario(self, usuario_id):
+        if usuario_id not in self.servicio.datos["usuarios"]:
+            raise ErrorHTTP(404, f"Usuario no encontrado: {usuario_id}")
+        return self.servicio.datos["usuarios"][usuario_id]
+
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """Llama al servicio en su hilo y espera el resultado sin bloquear el bucle de eventos"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.ejecutor, functools.partial(funcion, *args, **kwargs))
+
+    async def escribir(self, funcion, *args, **kwargs):
+        """Aplica una operación con cambios y espera al guardado en grupo que la incluye"""
+        def aplicar():
+            return funcion(*args, **kwargs), self.confirmacion.apuntar()
+        resultado, grupo = await self.ejecutar(aplicar)
+        await self.confirmacion.confirmar(grupo)
+        return resultado
+
+    def cerrar(self):
+        self.ejecutor.shutdown(wait=True)
+
+    # ===== HTTP =====
+
+    async def atender(self, lector, escritor):
+        """Atiende una conexión (HTTP/1.1 con keep-alive)"""
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                try:
+                    metodo, ruta, version = linea.decode('latin-1').split()
+                except ValueError:
+                    await self._responder(escritor, 400, {"error": "Petición mal formada"}, False)
+                    break
+
+                cabeceras = {}
+                while True:
+                    cabecera = await lector.readline()
+                    if cabecera in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = cabecera.decode('latin-1').partition(":")
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+
+                longitud = int(cabeceras.get("content-length", 0) or 0)
+                if longitud > TAMANO_MAXIMO_CUERPO:
+                    await self._responder(escritor, 413, {"error": "Cuerpo demasiado grande"}, False)
+                    break
+                cuerpo = await lector.readexactly(longitud) if longitud else b""
+
+                seguir = (cabeceras.get("connection", "").lower() != "close"
+                          and not (version == "HTTP/1.0" and cabeceras.get("connection", "").lower() != "keep-alive"))
+                estado, resultado = await self.despachar(metodo, ruta, cuerpo)
+                await self._responder(escritor, estado, resultado, seguir)
+                if not seguir:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _responder(self, escritor, estado, resultado, seguir):
+        cuerpo = json.dumps(resultado, ensure_ascii=False, default=serializar).encode('utf-8')
+        cabecera = (f"HTTP/1.1 {estado} {ESTADOS.get(estado, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(cuerpo)}\r\n"
+                    f"Connection: {'keep-alive' if seguir else 'close'}\r\n\r\n")
+        escritor.write(cabecera.encode('latin-1') + cuerpo)
+        await escritor.drain()
+
+    async def despachar(self, metodo, ruta, cuerpo):
+        self.peticiones += 1
+        ruta = ruta.split("?", 1)[0]
+        metodos_ruta = []
+        for metodo_ruta, patron, manejador in self.rutas:
+            coincidencia = patron.match(ruta)
+            if not coincidencia:
+                continue
+            metodos_ruta.append(metodo_ruta)
+            if metodo_ruta != metodo:
+                continue
+            try:
+                datos = json.loads(cuerpo) if cuerpo else {}
+                if not isinstance(datos, dict):
+                    raise ErrorHTTP(400, "El cuerpo debe ser un objeto JSON")
+                argumentos = [unquote(grupo) for grupo in coincidencia.groups()]
+                return await manejador(*argumentos, datos)
+            except ErrorHTTP as e:
+                return e.estado, {"error": str(e)}
+            except json.JSONDecodeError as e:
+                return 400, {"error": f"JSON inválido: {e}"}
+            except KeyError as e:
+                return 404, {"error": str(e.args[0]) if e.args else "No encontrado"}
+            except (ValueError, TypeError) as e:
+                return 400, {"error": str(e)}
+            except Exception as e:
+                return 500, {"error": f"Error inesperado: {e}"}
+        if metodos_ruta:
+            return 405, {"error": f"Método no permitido (usa {', '.join(metodos_ruta)})"}
+        return 404, {"error": f"Ruta desconocida: {ruta}"}
+
+    # ===== RUTAS =====
+
+    async def salud(self, datos):
+        return 200, {"estado": "ok", "usuarios": await self.ejecutar(lambda: len(self.servicio.datos["usuarios"]))}
+
+    async def metricas(self, datos):
+        def leer():
+            return {"peticiones": self.peticiones, "guardado": self.servicio.metricas_guardado(),
+                    "confirmacion": self.confirmacion.resumen(),
+                    "recomendaciones": self.servicio.metricas_recomendaciones()}
+        metricas = await self.ejecutar(leer)
+        if instrumentacion.ACTIVA:
+            metricas["instrumentacion"] = instrumentacion.como_json()
+        return 200, metricas
+
+    async def listar_usuarios(self, datos):
+        def leer():
+            puntos = self.servicio.datos["puntos"]
+            return [{"id": usuario_id, "nombre": usuario["nombre"], "nivel": usuario["nivel"],
+                     "puntos": puntos.get(usuario_id, 0)}
+                    for usuario_id, usuario in self.servicio.datos["usuarios"].items()]
+        return 200, await self.ejecutar(leer)
+
+    async def crear_usuario(self, datos):
+        nombre, nivel = datos.get("nombre", ""), datos.get("nivel", "principiante")
+        if not isinstance(nombre, str):
+            raise ErrorHTTP(400, "El nombre debe ser un texto")
+        if not isinstance(nivel, str):
+            raise ErrorHTTP(400, "El nivel debe ser un texto")
+        try:
+            intereses = separar_intereses(datos.get("intereses"))
+        except ErrorImportacion as e:
+            raise ErrorHTTP(400, str(e).capitalize())
+        resultado = await self.escribir(self.servicio.crear_usuario, nombre, nivel, intereses)
+        return 201, resultado
+
+    async def ver_usuario(self, usuario_id, datos):
+        def leer():
+            usuario = self._usuario(usuario_id)
+            puntos = self.servicio.datos["puntos"].get(usuario_id, 0)
+            return {
+                "id": usuario_id,
+                "usuario": usuario,
+                "puntos": puntos,
+                "nivel_juego": self.servicio.calcular_nivel(puntos),
+                "racha": self.servicio.racha_de_usuario(usuario_id),
+                "sesiones": self.servicio.repositorio.contar_sesiones_usuario(usuario_id)
+            }
+        return 200, await self.ejecutar(leer)
+
+    async def listar_planes(self, usuario_id, datos):
+        def leer():
+            self._usuario(usuario_id)
+            return self.servicio.repositorio.planes_de_usuario(usuario_id)
+        return 200, await self.ejecutar(leer)
+
+    async def crear_plan(self, usuario_id, datos):
+        await self.ejecutar(self._usuario, usuario_id)
+        async with self.cerrojo_usuario(usuario_id):
+            resultado = await self.escribir(self.servicio.crear_plan_estudio, usuario_id,
+                                            datos.get("tema", ""), int(datos.get("dias", 30)))
+        return 201, resultado
+
+    async def proponer_plan_ia(self, usuario_id, datos):
+        """Plan generado por la IA, sin guardarlo"""
+        tema = str(datos.get("tema", "")).strip()
+        if not tema:
+            raise ErrorHTTP(400, "Debes especificar un tema")
+
+        def generar():
+            self._usuario(usuario_id)
+            return self.servicio.recomendador().generar_plan_personalizado(usuario_id, tema)
+        return 200, await self.ejecutar(generar)
+
+    async def crear_plan_ia(self, usuario_id, datos):
+        tema = str(datos.get("tema", "")).strip()
+        if not tema:
+            raise ErrorHTTP(400, "Debes especificar un tema")
+        await self.ejecutar(self._usuario, usuario_id)
+
+        def crear():
+            plan_ia = self.servicio.recomendador().generar_plan_personalizado(usuario_id, tema)
+            return self.servicio.crear_plan_ia(usuario_id, plan_ia, int(datos.get("dias", 30)))
+        async with self.cerrojo_usuario(usuario_id):
+            resultado = await self.escribir(crear)
+        return 201, resultado
+
+    async def registrar_sesion(self, plan_id, datos):
+        plan = await self.ejecutar(self.servicio.datos["planes"].get, plan_id)
+        if plan is None:
+            raise ErrorHTTP(404, f"Plan no encontrado: {plan_id}")
+        async with self.cerrojo_usuario(plan["usuario_id"]):
+            # La respuesta sale cuando la sesión ya está en disco
+            resultado = await self.escribir(self.servicio.registrar_sesion, plan_id, int(datos.get("duracion", 0)),
+                                            float(datos.get("puntuacion", 5.0)), str(datos.get("notas", "")))
+        return 201, resultado
+
+    async def ver_logros(self, usuario_id, datos):
+        return 200, await self.ejecutar(self.servicio.logros_de_usuario, usuario_id)
+
+    async def ver_recomendaciones(self, usuario_id, datos):
+        def leer():
+            self._usuario(usuario_id)
+            recomendador = self.servicio.recomendador()
+            return {
+                "recomendaciones": recomendador.generar_recomendaciones_personalizadas(usuario_id),
+                "horario_optimo": recomendador.recomendar_horario_optimo(usuario_id),
+                "duracion_ideal": recomendador.recomendar_duracion_ideal(usuario_id)
+            }
+        return 200, await self.ejecutar(leer)
+
+    async def ver_patrones(self, usuario_id, datos):
+        def leer():
+            self._usuario(usuario_id)
+            return self.servicio.recomendador().analizar_patrones(usuario_id)
+        return 200, await self.ejecutar(leer)
+
+    async def ver_resumen(self, usuario_id, datos):
+        hoy = date.today().toordinal()
+
+        def leer():
+            self._usuario(usuario_id)
+            return {
+                "total": self.servicio.resumen_de_usuario(usuario_id),
+                "ultimos_7_dias": self.servicio.resumen_de_usuario(usuario_id, hoy - 6, hoy),
+                "ultimos_30_dias": self.servicio.resumen_de_usuario(usuario_id, hoy - 29, hoy),
+                "semanas": dict(self.servicio.semanas_de_usuario(usuario_id)),
+                "tendencias": self.servicio.tendencias_de_usuario(usuario_id, hoy)
+            }
+        return 200, await self.ejecutar(leer)
+
+    async def ver_clasificacion(self, datos):
+        def leer():
+            return {"top": self.servicio.clasificacion_top(10), "niveles": self.servicio.distribucion_niveles()}
+        return 200, await self.ejecutar(leer)
+
+    async def ver_clasificacion_tema(self, tema, datos):
+        return 200, {"tema": tema, "top": await self.ejecutar(self.servicio.clasificacion_top, 10, tema=tema)}
+
+    async def ver_clasificacion_semana(self, semana, datos):
+        return 200, {"semana": semana, "top": await self.ejecutar(self.servicio.clasificacion_top, 10, semana=semana)}
+
+    async def ver_posicion(self, usuario_id, datos):
+        return 200, await self.ejecutar(self.servicio.posicion_de_usuario, usuario_id)
+
+async def servir(servidor, host, puerto):
+    tcp = await asyncio.start_server(servidor.atender, host, puerto, backlog=1024)
+    direcciones = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in tcp.sockets)
+    print(f"🌐 API del asistente escuchando en http://{direcciones}", flush=True)
+
+    # Parar de forma ordenada con Ctrl+C o SIGTERM para guardar lo pendiente
+    detener = asyncio.Event()
+    bucle = asyncio.get_running_loop()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            bucle.add_signal_handler(senal, detener.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C llega como KeyboardInterrupt
+    async with tcp:
+        await detener.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON del asistente de aprendizaje")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--almacen", choices=ALMACENES, default=None)
+    parser.add_argument("--carpeta", default="data")
+    parser.add_argument("--metricas", action="store_true",
+                        help="Medir llamadas, latencias y bytes (se ven en GET /metricas)")
+    args = parser.parse_args(argv)
+
+    if args.metricas:
+        instrumentacion.activar()
+    servicio = ServicioAprendizaje(args.almacen, args.carpeta)
+    if servicio.aviso_carga:
+        print(f"⚠️ {servicio.aviso_carga}")
+    servidor = ServidorAsistente(servicio)
+    inicio = time.perf_counter()
+    try:
+        asyncio.run(servir(servidor, args.host, args.puerto))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.cerrar()
+        servicio.guardar_datos()
+        servicio.cerrar()
+        print(f"👋 Servidor detenido tras {time.perf_counter() - inicio:.0f}s y {servidor.peticiones} petición(es)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# tendencias.py - Tendencias de satisfacción, duración y minutos por día: medias móviles
+# exponenciales (EWMA) actualizadas en O(1), ventanas de 7 y 30 días y detección de cambios (CUSUM)
+from resumenes import cubos_del_rango, totales
+
+# Peso de la última sesión en la media rápida (reacciona en pocas sesiones) y en la lenta (nivel habitual)
+ALFA_RAPIDA = 0.3
+ALFA_LENTA = 0.05
+# Minutos por día: EWMA diaria equivalente a una media de unos 7 días
+ALFA_DIARIA = 2 / (7 + 1)
+# CUSUM en unidades de la dispersión habitual del usuario: se ignoran desviaciones menores que
+# la holgura y se avisa cuando lo acumulado pasa del umbral (pocas falsas alarmas con ruido normal)
+HOLGURA = 0.5
+UMBRAL_CAMBIO = 6.0
+# Sesiones antes de vigilar cambios (las medias aún no se han asentado)
+SESIONES_MINIMAS = 10
+# Dispersión mínima por métrica, para no dividir por casi cero con usuarios muy regulares
+DISPERSION_MINIMA = {"puntuacion": 0.5, "duracion": 5.0}
+# Días que un cambio detectado sigue contando como reciente, y cambios que se guardan
+VIGENCIA_CAMBIO = 14
+MAXIMO_CAMBIOS = 5
+# Diferencia de satisfacción media entre los últimos 7 días y los 23 anteriores que se considera caída
+CAIDA_VENTANA = 1.0
+VENTANAS = (7, 30)
+
+
+def metrica_vacia(media=None, sesiones=0):
+    return {"n": sesiones if media is not None else 0, "rapida": media, "lenta": media, "dispersion": None,
+            "baja": 0.0, "sube": 0.0}
+
+
+def tendencia_vacia(perfil=None):
+    """Estado vacío; con un perfil anterior a las tendencias, las medias empiezan en las del perfil"""
+    sesiones = perfil["sesiones"] if perfil else 0
+    return {
+        "puntuacion": metrica_vacia(perfil["suma_puntuacion"] / sesiones if sesiones else None, sesiones),
+        "duracion": metrica_vacia(perfil["suma_duracion"] / sesiones if sesiones else None, sesiones),
+        "minutos_dia": {"valor": 0.0, "dia": None, "pendiente": 0},
+        "cambios": []
+    }
+
+
+def _actualizar_metrica(estado, valor, minima):
+    """EWMA rápida y lenta, dispersión y CUSUM en los dos sentidos. Si la sesión confirma un
+    cambio de nivel respecto a la media lenta devuelve {"sentido": "baja"|"sube", "antes", "despues"}"""
+    if estado["n"] == 0:
+        estado["rapida"] = estado["lenta"] = float(valor)
+        estado["n"] = 1
+        return None
+
+    cambio = None
+    desviacion = valor - estado["lenta"]
+    dispersion = estado["dispersion"]
+    if estado["n"] >= SESIONES_MINIMAS and dispersion is not None:
+        z = desviacion / max(dispersion, minima)
+        estado["baja"] = max(0.0, estado["baja"] - z - HOLGURA)
+        estado["sube"] = max(0.0, estado["sube"] + z - HOLGURA)
+        if estado["baja"] > UMBRAL_CAMBIO:
+            cambio = {"sentido": "baja"}
+        elif estado["sube"] > UMBRAL_CAMBIO:
+            cambio = {"sentido": "sube"}
+
+    # Con pocas sesiones, media acumulada (1/n); después, EWMA. La dispersión es la desviación
+    # absoluta media (x1.25 ~ desviación típica con ruido normal)
+    estado["n"] += 1
+    lenta = max(ALFA_LENTA, 1 / estado["n"])
+    absoluta = abs(desviacion) * 1.25
+    estado["dispersion"] = absoluta if dispersion is None else dispersion + lenta * (absoluta - dispersion)
+    estado["rapida"] += max(ALFA_RAPIDA, 1 / estado["n"]) * (valor - estado["rapida"])
+    estado["lenta"] += lenta * (valor - estado["lenta"])
+    if cambio:
+        # Nuevo nivel: la media lenta salta a la rápida y lo acumulado empieza de cero
+        cambio.update(antes=round(estado["lenta"], 2), despues=round(estado["rapida"], 2))
+        estado["lenta"] = estado["rapida"]
+        estado["baja"] = estado["sube"] = 0.0
+    return cambio
+
+
+def _sumar_minutos(estado, dia, minutos):
+    """Minutos por día como EWMA diaria: el día en curso queda pendiente y los días sin estudio
+    cuentan como cero al pasar a otro día (sin recorrer los días intermedios)"""
+    if estado["dia"] is None or dia == estado["dia"]:
+        estado["dia"] = dia
+        estado["pendiente"] += minutos
+    elif dia > estado["dia"]:
+        estado["valor"] = _valor_en(estado, dia)
+        estado["dia"], estado["pendiente"] = dia, minutos
+    else:
+        # Sesión con fecha anterior: la EWMA es lineal, se suma su aporte ya decaído
+        estado["valor"] += ALFA_DIARIA * minutos * (1 - ALFA_DIARIA) ** (estado["dia"] - 1 - dia)
+
+
+def _valor_en(estado, hoy):
+    """EWMA de minutos por día con los días completos anteriores a `hoy`"""
+    if estado["dia"] is None:
+        return 0.0
+    if hoy <= estado["dia"]:
+        return estado["valor"]
+    valor = estado["valor"] + ALFA_DIARIA * (estado["pendiente"] - estado["valor"])
+    return valor * (1 - ALFA_DIARIA) ** (hoy - estado["dia"] - 1)
+
+
+def actualizar_tendencia(tendencia, sesion):
+    """Suma una sesión a las tendencias en O(1); devuelve los cambios detectados"""
+    cambios = []
+    for metrica in ("puntuacion", "duracion"):
+        cambio = _actualizar_metrica(tendencia[metrica], sesion[metrica], DISPERSION_MINIMA[metrica])
+        if cambio:
+            cambios.append({"metrica": metrica, "dia": sesion.dia, **cambio})
+    _sumar_minutos(tendencia["minutos_dia"], sesion.dia, sesion["duracion"])
+    if cambios:
+        tendencia["cambios"] = (tendencia["cambios"] + cambios)[-MAXIMO_CAMBIOS:]
+    return cambios
+
+
+def _ventana(resumen, hoy, dias):
+    total = totales(cubos_del_rango(resumen, hoy - dias + 1, hoy))
+    total["minutos_por_dia"] = total["minutos"] / dias
+    total["duracion_promedio"] = total["minutos"] / total["sesiones"] if total["sesiones"] else 0
+    return total
+
+
+def analizar_tendencias(perfil, resumen, hoy):
+    """Medias móviles, ventanas de 7 y 30 días (con los resúmenes diarios: O(días), no O(sesiones))
+    y señales de cambio vigentes, con la dirección de la satisfacción"""
+    tendencia = (perfil or {}).get("tendencia") or tendencia_vacia(perfil)
+    ventanas = {f"{dias}d": _ventana(resumen, hoy, dias) for dias in VENTANAS}
+    # Satisfacción de la última semana frente a las semanas anteriores del mismo mes
+    anteriores = totales(cubos_del_rango(resumen, hoy - VENTANAS[-1] + 1, hoy - VENTANAS[0]))
+    reciente = ventanas[f"{VENTANAS[0]}d"]
+
+    cambios = [cambio for cambio in tendencia["cambios"] if 0 <= hoy - cambio["dia"] < VIGENCIA_CAMBIO]
+    satisfaccion = "estable"
+    ultimo = next((cambio for cambio in reversed(cambios) if cambio["metrica"] == "puntuacion"), None)
+    if ultimo is not None:
+        satisfaccion = "bajando" if ultimo["sentido"] == "baja" else "subiendo"
+    elif reciente["sesiones"] >= 3 and anteriores["sesiones"] >= 3:
+        diferencia = reciente["satisfaccion_promedio"] - anteriores["satisfaccion_promedio"]
+        if diferencia <= -CAIDA_VENTANA:
+            satisfaccion = "bajando"
+        elif diferencia >= CAIDA_VENTANA:
+            satisfaccion = "subiendo"
+
+    return {
+        "satisfaccion": satisfaccion,
+        "puntuacion": {"rapida": tendencia["puntuacion"]["rapida"], "lenta": tendencia["puntuacion"]["lenta"]},
+        "duracion": {"rapida": tendencia["duracion"]["rapida"], "lenta": tendencia["duracion"]["lenta"]},
+        "minutos_por_dia": _valor_en(tendencia["minutos_dia"], hoy + 1),
+        "ventanas": ventanas,
+        "satisfaccion_semanas_anteriores": anteriores["satisfaccion_promedio"] if anteriores["sesiones"] else None,
+        "cambios": cambios
+    }
@@ -0,0 +1,130 @@
+# trigramas.py - Índice invertido de trigramas de caracteres para buscar temas parecidos ("¿quisiste decir?")
+import math
+from collections import Counter, defaultdict
+
+from catalogo import CATALOGO, normalizar
+
+# Parecido mínimo (Jaccard de trigramas) para sugerir un tema, como el umbral por defecto de pg_trgm
+UMBRAL_SIMILITUD = 0.3
+# Parte de los trigramas de un interés que debe aparecer en un tema para darlo por explorado
+UMBRAL_CONTENIDO = 0.7
+# Umbrales que se prueban de mayor a menor hasta reunir los resultados pedidos
+NIVELES_BUSQUEDA = (0.75, 0.5)
+
+
+def trigramas(texto):
+    """Trigramas de un texto ya normalizado; cada palabra con dos espacios delante y uno detrás,
+    así las palabras cortas y los comienzos de palabra también cuentan"""
+    resultado = set()
+    for palabra in texto.split():
+        relleno = f"  {palabra} "
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return frozenset(resultado)
+
+
+class IndiceTrigramas:
+    """Temas distintos (normalizados) indexados por trigrama. Cada tema guarda el nombre a mostrar
+    y cuántas veces aparece (planes e intereses), que desempata el orden de los resultados"""
+
+    def __init__(self, textos=()):
+        self.por_trigrama = defaultdict(set)
+        self.trigramas = {}
+        self.nombres = {}
+        self.usos = Counter()
+        for texto in textos:
+            self.agregar(texto)
+
+    @classmethod
+    def construir(cls, datos, catalogo=CATALOGO):
+        """Índice con los temas del catálogo (y sus alias), los de los planes y los intereses"""
+        indice = cls()
+        for clave, tema in catalogo.temas.items():
+            for nombre in [clave] + tema.get("alias", []):
+                indice.agregar(nombre, nombre=clave, usos=0)
+        for plan in datos["planes"].values():
+            indice.agregar(plan["tema"])
+        for usuario in datos["usuarios"].values():
+            for interes in usuario.get("intereses", []):
+                indice.agregar(interes)
+        return indice
+
+    def __len__(self):
+        return len(self.trigramas)
+
+    def agregar(self, texto, nombre=None, usos=1):
+        normalizado = normalizar(texto)
+        if not normalizado:
+            return
+        if normalizado not in self.trigramas:
+            self.trigramas[normalizado] = trigramas(normalizado)
+            self.nombres[normalizado] = nombre or texto.strip()
+            for trigrama in self.trigramas[normalizado]:
+                self.por_trigrama[trigrama].add(normalizado)
+        self.usos[normalizado] += usos
+
+    def buscar(self, texto, limite=5, umbral=UMBRAL_SIMILITUD, contenido=False):
+        """[(nombre, parecido)] de los temas más parecidos, de más a menos.
+
+        El parecido es |A∩B| / |A∪B| de los trigramas; con contenido=True es la parte de los
+        trigramas del texto buscado que tiene el tema (|A∩B| / |A|)"""
+        buscados = trigramas(normalizar(texto))
+        if not buscados:
+            return []
+        # Primero con umbrales altos, que recorren muy pocas listas: si ya hay `limite`
+        # resultados, los mejores están entre ellos y no hace falta bajar el umbral
+        for nivel in sorted({max(umbral, nivel) for nivel in NIVELES_BUSQUEDA + (umbral,)}, reverse=True):
+            mejores = self._buscar(buscados, nivel, contenido, limite)
+            if len(mejores) >= limite:
+                break
+        return mejores
+
+    def _buscar(self, buscados, umbral, contenido, limite):
+        # Con cualquiera de las dos medidas, llegar al umbral exige compartir al menos
+        # `minimo` trigramas: todo resultado está en alguna de las len - minimo + 1 listas
+        # más cortas, así que los trigramas frecuentes ("  p", "on ") no generan candidatos
+        minimo = max(1, math.ceil(umbral * len(buscados) - 1e-9))
+        listas = sorted((self.por_trigrama.get(trigrama, ()) for trigrama in buscados), key=len)
+        candidatos = set().union(*listas[:len(buscados) - minimo + 1])
+
+        # Con Jaccard, un tema mucho más largo o más corto que lo buscado no llega al umbral
+        maximo = len(buscados) / umbral if not contenido else math.inf
+        resultados = []
+        for candidato in candidatos:
+            suyos = self.trigramas[candidato]
+            if len(suyos) > maximo:
+                continue
+            n = len(buscados & suyos)
+            if contenido:
+                parecido = n / len(buscados)
+            else:
+                parecido = n / (len(buscados) + len(suyos) - n)
+            if parecido >= umbral:
+                resultados.append((-parecido, -self.usos[candidato], candidato))
+        resultados.sort()
+
+        vistos, mejores = set(), []
+        for parecido, _, candidato in resultados:
+            nombre = self.nombres[candidato]
+            if nombre not in vistos:
+                vistos.add(nombre)
+                mejores.append((nombre, round(-parecido, 3)))
+                if len(mejores) == limite:
+                    break
+        return mejores
+
+    def relacionados(self, tema, limite=5, umbral=0.2):
+        """Otros temas que comparten trigramas con `tema` (sin el propio tema ni sus alias)"""
+        propio = normalizar(tema)
+        clave = CATALOGO.indice.get(propio, propio)
+        return [nombre for nombre, _ in self.buscar(tema, limite + 2, umbral)
+                if CATALOGO.indice.get(normalizar(nombre), normalizar(nombre)) != clave][:limite]
+
+
+def intereses_sin_explorar(intereses, temas):
+    """Intereses que no tienen plan: ni del mismo tema del catálogo ni con un tema que los contenga
+    (sin acentos y tolerando pequeñas diferencias: "matematica" está en "Matemáticas básicas")"""
+    indice = IndiceTrigramas(temas)
+    claves = {CATALOGO.resolver(tema) for tema in temas} - {None}
+    return [interes for interes in intereses
+            if CATALOGO.resolver(interes) not in claves
+            and not indice.buscar(interes, 1, UMBRAL_CONTENIDO, contenido=True)]
@@ -0,0 +1,26 @@
+# conftest.py - Los módulos del asistente se importan por su nombre, como al ejecutarlos desde su carpeta
+import os
+import sys
+
+CARPETA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "learning_assistant")
+sys.path.insert(0, CARPETA)
+
+from datetime import datetime, timedelta  # noqa: E402
+
+ALMACENES = ("json", "sqlite", "fragmentos")
+
+
+def poblar(servicio, usuarios=3, sesiones=30, inicio=datetime(2026, 3, 2, 8)):
+    """Usuarios con dos planes cada uno y sesiones repartidas (algunas con fecha atrasada)"""
+    planes = []
+    for i in range(usuarios):
+        usuario_id = servicio.crear_usuario(f"Usuario {i}", intereses=["python", "inglés"],
+                                            timestamp=inicio)["usuario_id"]
+        for tema in ("Python", "inglés"):
+            planes.append(servicio.crear_plan_estudio(usuario_id, tema, timestamp=inicio)["plan_id"])
+    for i in range(sesiones):
+        # Cada tercera sesión se registra con días de retraso: rellena huecos de las rachas
+        dias = i // 2 - (5 if i % 3 == 2 else 0)
+        servicio.registrar_sesion(planes[i % len(planes)], 20 + i % 7 * 15, 1 + i % 10,
+                                  timestamp=inicio + timedelta(days=dias, hours=i % 14))
+    return planes
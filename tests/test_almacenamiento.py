@@ -0,0 +1,89 @@
+# test_almacenamiento.py - Los tres almacenes guardan y recuperan los mismos datos, y una
+# operación que falla no deja nada a medias ni en memoria ni en disco
+import json
+
+import pytest
+from conftest import ALMACENES, poblar
+from fragmentos import materializar
+from registros import a_json
+from servicio import ServicioAprendizaje
+
+
+def contenido(servicio):
+    """Datos del servicio como JSON comparable (los perezosos de fragmentos, materializados)"""
+    datos = materializar(servicio.datos)
+    return json.loads(json.dumps({seccion: datos[seccion] for seccion in sorted(datos)},
+                                 sort_keys=True, default=a_json))
+
+
+@pytest.fixture(scope="module")
+def referencia(tmp_path_factory):
+    servicio = ServicioAprendizaje("json", str(tmp_path_factory.mktemp("referencia")))
+    poblar(servicio)
+    servicio.cerrar()
+    return contenido(servicio)
+
+
+@pytest.mark.parametrize("almacen", ALMACENES)
+def test_los_tres_almacenes_recuperan_los_mismos_datos(tmp_path, almacen, referencia):
+    servicio = ServicioAprendizaje(almacen, str(tmp_path))
+    poblar(servicio)
+    assert contenido(servicio) == referencia
+    servicio.cerrar()
+
+    assert contenido(ServicioAprendizaje(almacen, str(tmp_path))) == referencia
+
+
+@pytest.mark.parametrize("almacen", ALMACENES)
+def test_compactar_no_cambia_los_datos(tmp_path, almacen, referencia):
+    servicio = ServicioAprendizaje(almacen, str(tmp_path))
+    poblar(servicio)
+    servicio.compactar_datos()
+    servicio.cerrar()
+
+    assert contenido(ServicioAprendizaje(almacen, str(tmp_path))) == referencia
+
+
+@pytest.mark.parametrize("almacen", ALMACENES)
+def test_una_operacion_que_falla_se_deshace(tmp_path, almacen, monkeypatch):
+    servicio = ServicioAprendizaje(almacen, str(tmp_path))
+    planes = poblar(servicio, usuarios=1, sesiones=5)
+    antes = contenido(servicio)
+
+    def falla(*args):
+        raise RuntimeError("fallo a mitad de la operación")
+    # Falla después de anotar la sesión, el perfil, los resúmenes, los puntos y la racha
+    monkeypatch.setattr(servicio, "verificar_logros", falla)
+    with pytest.raises(RuntimeError):
+        servicio.registrar_sesion(planes[0], 45, 8)
+    monkeypatch.undo()
+
+    assert contenido(servicio) == antes
+    servicio.registrar_sesion(planes[0], 45, 8)
+    despues = contenido(servicio)
+    servicio.cerrar()
+    assert contenido(ServicioAprendizaje(almacen, str(tmp_path))) == despues
+
+
+@pytest.mark.parametrize("almacen", ALMACENES)
+def test_con_guardado_desactivado_un_fallo_no_pierde_el_lote(tmp_path, almacen, monkeypatch):
+    servicio = ServicioAprendizaje(almacen, str(tmp_path))
+    planes = poblar(servicio, usuarios=1, sesiones=2)
+    servicio.guardado_automatico = False
+    publicaciones = servicio.repositorio.publicaciones
+    servicio.registrar_sesion(planes[0], 30, 7)
+
+    monkeypatch.setattr(servicio, "verificar_logros", lambda *args: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        servicio.registrar_sesion(planes[1], 30, 7)
+    monkeypatch.undo()
+    servicio.registrar_sesion(planes[1], 60, 9)
+    assert servicio.repositorio.publicaciones == publicaciones
+
+    assert servicio.guardar_datos()
+    assert servicio.repositorio.publicaciones == publicaciones + 1
+    esperado = contenido(servicio)
+    servicio.cerrar()
+    recargado = ServicioAprendizaje(almacen, str(tmp_path))
+    assert len(recargado.datos["sesiones"]) == 4
+    assert contenido(recargado) == esperado
@@ -0,0 +1,54 @@
+# test_cache_recomendaciones.py - Caché LRU de recomendaciones: aciertos, invalidación al registrar
+# sesiones y descarte de los paquetes usados hace más tiempo
+from cache_recomendaciones import CacheRecomendaciones
+from conftest import poblar
+from servicio import ServicioAprendizaje
+
+
+def test_registrar_una_sesion_invalida_solo_a_su_usuario(tmp_path):
+    servicio = ServicioAprendizaje("json", str(tmp_path))
+    planes = poblar(servicio, usuarios=2, sesiones=8)
+    # poblar crea dos planes por usuario
+    ana, luis = (servicio.datos["planes"][plan_id]["usuario_id"] for plan_id in (planes[0], planes[2]))
+    for usuario_id in (ana, luis):
+        servicio.recomendador().paquete(usuario_id)
+    servicio.recomendador().paquete(ana)
+    assert servicio.metricas_recomendaciones()["aciertos"] == 1
+
+    servicio.registrar_sesion(planes[0], 60, 9)
+    servicio.recomendador().paquete(ana)
+    servicio.recomendador().paquete(luis)
+    metricas = servicio.metricas_recomendaciones()
+    assert (metricas["aciertos"], metricas["fallos"]) == (2, 3)
+
+
+def test_un_paquete_recalculado_refleja_la_sesion_nueva(tmp_path):
+    servicio = ServicioAprendizaje("json", str(tmp_path))
+    planes = poblar(servicio, usuarios=1, sesiones=4)
+    usuario_id = servicio.datos["planes"][planes[0]]["usuario_id"]
+    antes = servicio.recomendador().paquete(usuario_id)["patrones"]
+    servicio.registrar_sesion(planes[0], 90, 10)
+    despues = servicio.recomendador().paquete(usuario_id)["patrones"]
+    assert despues != antes
+
+
+def test_se_descarta_el_usado_hace_mas_tiempo():
+    cache = CacheRecomendaciones(capacidad=2)
+    calcular = lambda usuario_id: {"usuario": usuario_id}  # noqa: E731
+    for usuario_id in ("a", "b"):
+        cache.obtener(usuario_id, 1, calcular)
+    cache.obtener("a", 1, calcular)
+    cache.obtener("c", 1, calcular)
+    assert list(cache.paquetes) == ["a", "c"]
+
+
+def test_cambiar_de_dia_o_de_datos_externos_recalcula():
+    cache = CacheRecomendaciones()
+    llamadas = []
+    calcular = lambda usuario_id: llamadas.append(usuario_id) or len(llamadas)  # noqa: E731
+    cache.obtener("a", 1, calcular)
+    cache.obtener("a", 1, calcular)
+    cache.obtener("a", 2, calcular)
+    cache.sincronizar(1)
+    cache.obtener("a", 2, calcular)
+    assert llamadas == ["a", "a", "a"]
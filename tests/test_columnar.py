@@ -0,0 +1,23 @@
+# test_columnar.py - Las estadísticas con NumPy coinciden con las calculadas con los resúmenes
+import pytest
+from conftest import poblar
+from servicio import ServicioAprendizaje
+
+pytest.importorskip("numpy")
+
+
+def test_estadisticas_por_usuario_con_y_sin_numpy(tmp_path, monkeypatch):
+    servicio = ServicioAprendizaje("json", str(tmp_path))
+    planes = poblar(servicio, usuarios=4, sesiones=60)
+    # El mismo tema escrito de otra forma cuenta como el mismo tema
+    usuario_id = servicio.datos["planes"][planes[0]]["usuario_id"]
+    otro = servicio.crear_plan_estudio(usuario_id, "python ")["plan_id"]
+    servicio.registrar_sesion(otro, 40, 8.5)
+
+    con_numpy = servicio.estadisticas_por_usuario()
+    monkeypatch.setattr("servicio.NUMPY_DISPONIBLE", False)
+    sin_numpy = servicio.estadisticas_por_usuario()
+
+    assert con_numpy.keys() == sin_numpy.keys()
+    for usuario_id, estadisticas in sin_numpy.items():
+        assert con_numpy[usuario_id] == pytest.approx(estadisticas)
@@ -0,0 +1,96 @@
+# test_diario.py - Diario de cambios: reproducción de registros y compactación en el snapshot
+import json
+
+from diario import DiarioCambios
+
+
+def nuevo_diario(tmp_path):
+    return DiarioCambios(str(tmp_path / "datos.json"))
+
+
+def test_los_registros_se_reproducen_en_orden(tmp_path):
+    diario = nuevo_diario(tmp_path)
+    diario.registrar("set", ["puntos", "u1"], 10)
+    diario.registrar("set", ["puntos", "u1"], 25)
+    diario.registrar("append", ["logros", "u1"], "primer_dia")
+    diario.registrar("set", ["puntos", "u2"], 5)
+    diario.registrar("del", ["puntos", "u2"])
+    assert diario.escribir_pendientes() == 5
+
+    datos = nuevo_diario(tmp_path).cargar({"puntos": {}, "logros": {}})
+    assert datos == {"puntos": {"u1": 25}, "logros": {"u1": ["primer_dia"]}}
+
+
+def test_otro_diario_solo_reproduce_lo_nuevo(tmp_path):
+    escritor, lector = nuevo_diario(tmp_path), nuevo_diario(tmp_path)
+    datos = lector.cargar({"puntos": {}})
+    escritor.registrar("set", ["puntos", "u1"], 1)
+    escritor.escribir_pendientes(duradero=False)
+    assert len(lector.reproducir(datos)) == 1
+    escritor.registrar("set", ["puntos", "u1"], 2)
+    escritor.escribir_pendientes()
+    assert [cambio["valor"] for cambio in lector.reproducir(datos)] == [2]
+    assert lector.reproducir(datos) == []
+    assert datos["puntos"]["u1"] == 2
+
+
+def test_una_linea_a_medias_se_ignora_y_se_sobrescribe(tmp_path):
+    diario = nuevo_diario(tmp_path)
+    diario.registrar("set", ["puntos", "u1"], 1)
+    diario.escribir_pendientes()
+    with open(diario.archivo_diario, "a", encoding="utf-8") as f:
+        f.write('{"v": 2, "op": "set", "ruta": ["puntos", "u1"], "val')
+
+    recuperado = nuevo_diario(tmp_path)
+    assert recuperado.cargar({"puntos": {}})["puntos"] == {"u1": 1}
+    recuperado.registrar("set", ["puntos", "u2"], 2)
+    recuperado.escribir_pendientes()
+    assert nuevo_diario(tmp_path).cargar({"puntos": {}})["puntos"] == {"u1": 1, "u2": 2}
+
+
+def test_compactar_vuelca_el_snapshot_y_vacia_el_diario(tmp_path):
+    diario = nuevo_diario(tmp_path)
+    datos = diario.cargar({"puntos": {}})
+    for valor in range(1, 4):
+        diario.registrar("set", ["puntos", "u1"], valor)
+        datos["puntos"]["u1"] = valor
+    diario.escribir_pendientes()
+    diario.compactar(datos)
+
+    assert not (tmp_path / "datos.diario.jsonl").exists()
+    with open(tmp_path / "datos.json", encoding="utf-8") as f:
+        assert json.load(f) == {"puntos": {"u1": 3}, "_version": 3}
+    diario.registrar("set", ["puntos", "u2"], 7)
+    diario.escribir_pendientes()
+    recargado = nuevo_diario(tmp_path)
+    assert recargado.cargar({"puntos": {}})["puntos"] == {"u1": 3, "u2": 7}
+    assert recargado.version == 4
+
+
+def test_los_registros_ya_incluidos_en_el_snapshot_no_se_repiten(tmp_path):
+    # Otro proceso compactó pero el diario viejo sigue ahí (p. ej. se cortó antes de borrarlo)
+    diario = nuevo_diario(tmp_path)
+    datos = diario.cargar({"logros": {}})
+    diario.registrar("append", ["logros", "u1"], "primer_dia")
+    diario.escribir_pendientes()
+    datos["logros"]["u1"] = ["primer_dia"]
+    with open(diario.archivo_diario, "rb") as f:
+        viejo = f.read()
+    diario.compactar(datos)
+    with open(diario.archivo_diario, "wb") as f:
+        f.write(viejo)
+
+    assert nuevo_diario(tmp_path).cargar({"logros": {}})["logros"] == {"u1": ["primer_dia"]}
+
+
+def test_derivar_recalcula_lo_que_no_se_anota(tmp_path):
+    diario = nuevo_diario(tmp_path)
+    diario.registrar("append", ["sesiones"], {"plan_id": "p1", "duracion": 30, "puntuacion": 7,
+                                              "fecha": "2026-03-02", "hora": "10:00", "notas": ""})
+    diario.escribir_pendientes()
+
+    lector = nuevo_diario(tmp_path)
+    lector.derivar = lambda datos, cambio: datos["minutos"].__setitem__(
+        "total", datos["minutos"].get("total", 0) + cambio["valor"].duracion)
+    datos = lector.cargar({"sesiones": [], "minutos": {}})
+    assert datos["minutos"] == {"total": 30}
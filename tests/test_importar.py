@@ -0,0 +1,95 @@
+# test_importar.py - Importación por lotes: las filas solo se publican al guardar cada lote
+import json
+import subprocess
+import sys
+
+import pytest
+from conftest import ALMACENES, CARPETA
+from importar import Importador
+from servicio import ServicioAprendizaje
+
+# Cuenta las sesiones publicadas leyendo el disco desde otro proceso (sin esperar el cerrojo)
+LECTOR = """
+import os, sqlite3, sys
+sys.path.insert(0, sys.argv[3])
+from diario import DiarioCambios
+almacen, carpeta = sys.argv[1], sys.argv[2]
+if almacen == "sqlite":
+    conexion = sqlite3.connect(os.path.join(carpeta, "usuarios.db"), timeout=30)
+    print(conexion.execute("SELECT COUNT(*) FROM sesiones").fetchone()[0])
+elif almacen == "json":
+    print(len(DiarioCambios(os.path.join(carpeta, "usuarios.json")).cargar({"sesiones": []})["sesiones"]))
+else:
+    indice = DiarioCambios(os.path.join(carpeta, "fragmentos", "indice.json")).cargar({})
+    print(sum(indice.get("sesiones_usuario", {}).values()))
+"""
+
+
+def sesiones_publicadas(almacen, carpeta):
+    salida = subprocess.run([sys.executable, "-c", LECTOR, almacen, str(carpeta), CARPETA],
+                            capture_output=True, text=True, timeout=60, check=True)
+    return int(salida.stdout)
+
+
+def escribir_filas(ruta, sesiones):
+    filas = [{"tipo": "usuario", "id": "u1", "nombre": "Ana", "timestamp": "2026-01-01"},
+             {"tipo": "plan", "id": "p1", "usuario": "u1", "tema": "python", "timestamp": "2026-01-01"}]
+    filas += [{"tipo": "sesion", "plan": "p1", "duracion": 30, "puntuacion": 7,
+               "timestamp": f"2026-01-{1 + i % 28:02d} 10:{i % 60:02d}"} for i in range(sesiones)]
+    ruta.write_text("\n".join(json.dumps(fila) for fila in filas) + "\n", encoding="utf-8")
+
+
+@pytest.mark.parametrize("almacen", ALMACENES)
+def test_el_lote_no_es_visible_hasta_guardar(tmp_path, almacen):
+    archivo = tmp_path / "filas.jsonl"
+    escribir_filas(archivo, 20)
+    servicio = ServicioAprendizaje(almacen, str(tmp_path / "datos"))
+    servicio.guardado_automatico = False
+    importador = Importador(servicio)
+
+    importador.importar(str(archivo))
+    assert len(servicio.datos["sesiones"]) == 20
+    assert sesiones_publicadas(almacen, tmp_path / "datos") == 0
+
+    importador.guardar()
+    assert importador.guardados == 1
+    assert sesiones_publicadas(almacen, tmp_path / "datos") == 20
+    servicio.cerrar()
+
+
+@pytest.mark.parametrize("almacen", ALMACENES)
+def test_guardados_cuenta_publicaciones_reales(tmp_path, almacen):
+    archivo = tmp_path / "filas.jsonl"
+    escribir_filas(archivo, 18)
+    servicio = ServicioAprendizaje(almacen, str(tmp_path / "datos"))
+    servicio.guardado_automatico = False
+    importador = Importador(servicio, tamano_lote=10)
+
+    importador.importar(str(archivo))
+    assert importador.guardados == 2
+    # Sin filas nuevas desde el último lote no hay nada que publicar
+    importador.guardar()
+    assert importador.guardados == 2
+    servicio.cerrar()
+
+    recargado = ServicioAprendizaje(almacen, str(tmp_path / "datos"))
+    assert len(recargado.datos["sesiones"]) == 18
+
+
+
+def test_una_fila_con_tipos_inesperados_no_detiene_la_importacion(tmp_path):
+    archivo = tmp_path / "filas.jsonl"
+    escribir_filas(archivo, 2)
+    with open(archivo, "a", encoding="utf-8") as f:
+        for valor in ([7], {"nota": 7}):
+            f.write(json.dumps({"tipo": "sesion", "plan": "p1", "duracion": 30, "puntuacion": valor,
+                                "timestamp": "2026-01-05 10:00"}) + "\n")
+        f.write(json.dumps({"tipo": "sesion", "plan": "p1", "duracion": 45, "puntuacion": 9,
+                            "timestamp": "2026-01-06 10:00"}) + "\n")
+    servicio = ServicioAprendizaje("json", str(tmp_path / "datos"))
+    importador = Importador(servicio)
+
+    importador.importar(str(archivo))
+    assert importador.contadores["sesion"] == 3
+    assert [error.split(":")[1] for error in importador.errores] == ["5", "6"]
+    servicio.cerrar()
@@ -0,0 +1,53 @@
+# test_logros.py - Reglas de logros: umbrales exactos, logros ya conseguidos y contadores sin valor
+from logros import REGLAS_LOGROS, contadores_usuario, evaluar_reglas
+from perfiles import perfil_vacio
+from registros import Sesion
+
+
+def contadores(**valores):
+    base = {"sesiones": 0, "temas": 0, "puntuaciones_altas": 0, "racha": 0, "hora": 12, "duracion": 30}
+    base.update(valores)
+    return base
+
+
+def test_sin_actividad_no_hay_logros():
+    assert evaluar_reglas(contadores(), []) == []
+
+
+def test_los_umbrales_se_cumplen_justo_en_el_limite():
+    assert evaluar_reglas(contadores(sesiones=1), []) == ["primer_dia"]
+    assert "consistente" not in evaluar_reglas(contadores(sesiones=9), [])
+    assert "consistente" in evaluar_reglas(contadores(sesiones=10), [])
+    assert evaluar_reglas(contadores(racha=2), []) == []
+    assert evaluar_reglas(contadores(racha=3), []) == ["racha_3"]
+    assert evaluar_reglas(contadores(racha=7), []) == ["racha_3", "racha_7"]
+    assert evaluar_reglas(contadores(duracion=119), []) == []
+    assert evaluar_reglas(contadores(duracion=120), []) == ["maraton"]
+    assert evaluar_reglas(contadores(temas=3), []) == ["explorador"]
+    assert evaluar_reglas(contadores(puntuaciones_altas=5), []) == ["perfeccionista"]
+
+
+def test_las_horas_usan_comparaciones_estrictas_donde_toca():
+    assert evaluar_reglas(contadores(hora=7), []) == ["madrugador"]
+    assert evaluar_reglas(contadores(hora=8), []) == []
+    assert evaluar_reglas(contadores(hora=21), []) == []
+    assert evaluar_reglas(contadores(hora=22), []) == ["nocturno"]
+
+
+def test_una_sesion_sin_hora_no_evalua_sus_reglas():
+    assert evaluar_reglas(contadores(hora=None), []) == []
+
+
+def test_los_logros_conseguidos_no_se_repiten():
+    todos = contadores(sesiones=10, racha=30, hora=6, duracion=150, temas=4, puntuaciones_altas=9)
+    assert sorted(evaluar_reglas(todos, [])) == sorted(set(REGLAS_LOGROS) - {"nocturno"})
+    assert evaluar_reglas(todos, ["primer_dia", "racha_3"]) == [
+        logro for logro in evaluar_reglas(todos, []) if logro not in ("primer_dia", "racha_3")]
+
+
+def test_contadores_de_una_sesion():
+    perfil = perfil_vacio()
+    perfil.update(sesiones=4, temas={"python": 3, "ingles": 1}, puntuaciones_altas=2)
+    sesion = Sesion("p1", 45, 9.0, 739677, 23 * 60 + 5, "")
+    assert contadores_usuario(perfil, 5, sesion) == {
+        "sesiones": 4, "temas": 2, "puntuaciones_altas": 2, "racha": 5, "hora": 23, "duracion": 45}
@@ -0,0 +1,54 @@
+# test_procesos.py - Varios procesos escriben a la vez en el mismo almacén: ninguno pisa con datos
+# viejos lo que otro acaba de confirmar
+import subprocess
+import sys
+
+import pytest
+from conftest import ALMACENES, CARPETA
+from servicio import ServicioAprendizaje
+
+PROCESOS = 4
+SESIONES = 25
+
+# Cada proceso registra sesiones alternando entre los planes. Con sqlite el commit se alarga un poco
+# para que otro proceso tenga tiempo de confirmar justo después (el hueco que perdía sus puntos)
+ESCRITOR = """
+import sqlite3, sys, time
+sys.path.insert(0, sys.argv[1])
+
+class ConexionLenta(sqlite3.Connection):
+    def commit(self):
+        super().commit()
+        time.sleep(0.005)
+
+conectar = sqlite3.connect
+sqlite3.connect = lambda *args, **kwargs: conectar(*args, factory=ConexionLenta, **kwargs)
+
+from servicio import ServicioAprendizaje
+almacen, carpeta, numero, sesiones, planes = sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]), sys.argv[6:]
+servicio = ServicioAprendizaje(almacen, carpeta)
+for i in range(sesiones):
+    servicio.registrar_sesion(planes[(numero + i) % len(planes)], 30 + i % 4 * 20, 1 + (numero + i) % 10)
+servicio.cerrar()
+"""
+
+
+@pytest.mark.parametrize("almacen", ALMACENES)
+def test_los_procesos_no_pierden_cambios_de_otros(tmp_path, almacen):
+    servicio = ServicioAprendizaje(almacen, str(tmp_path))
+    planes = []
+    for nombre in ("Ana", "Luis"):
+        usuario_id = servicio.crear_usuario(nombre)["usuario_id"]
+        planes.append(servicio.crear_plan_estudio(usuario_id, "python")["plan_id"])
+    servicio.cerrar()
+
+    procesos = [subprocess.Popen([sys.executable, "-c", ESCRITOR, CARPETA, almacen, str(tmp_path),
+                                  str(numero), str(SESIONES), *planes])
+                for numero in range(PROCESOS)]
+    assert [proceso.wait(timeout=120) for proceso in procesos] == [0] * PROCESOS
+
+    recargado = ServicioAprendizaje(almacen, str(tmp_path))
+    assert len(recargado.datos["sesiones"]) == PROCESOS * SESIONES
+    # Puntos, logros, rachas y progreso guardados coinciden con los de reproducir todas las sesiones
+    resultado = recargado.recalcular_historial()
+    assert (resultado["usuarios"], resultado["planes"]) == ({}, {})
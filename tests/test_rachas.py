@@ -0,0 +1,63 @@
+# test_rachas.py - Tramos de días seguidos: días atrasados, repetidos y huecos que unen dos tramos
+from datetime import date
+
+from rachas import agregar_dia, construir_racha, racha_vacia, racha_vigente, sumar_dia
+
+LUNES = date(2026, 3, 2).toordinal()
+
+
+def test_dias_seguidos_alargan_el_tramo():
+    tramos = []
+    assert [agregar_dia(tramos, LUNES + i) for i in range(3)] == [1, 2, 3]
+    assert tramos == [[LUNES, LUNES + 2]]
+
+
+def test_un_dia_repetido_no_cambia_nada():
+    tramos = [[LUNES, LUNES + 2]]
+    assert agregar_dia(tramos, LUNES + 1) == 3
+    assert tramos == [[LUNES, LUNES + 2]]
+
+
+def test_un_dia_atrasado_alarga_el_tramo_por_el_principio():
+    tramos = [[LUNES, LUNES + 2]]
+    assert agregar_dia(tramos, LUNES - 1) == 4
+    assert tramos == [[LUNES - 1, LUNES + 2]]
+
+
+def test_un_dia_atrasado_suelto_crea_su_tramo_en_orden():
+    tramos = [[LUNES, LUNES + 2], [LUNES + 10, LUNES + 11]]
+    assert agregar_dia(tramos, LUNES + 6) == 1
+    assert tramos == [[LUNES, LUNES + 2], [LUNES + 6, LUNES + 6], [LUNES + 10, LUNES + 11]]
+
+
+def test_el_dia_del_hueco_une_los_dos_tramos():
+    tramos = [[LUNES, LUNES + 2], [LUNES + 4, LUNES + 6]]
+    assert agregar_dia(tramos, LUNES + 3) == 7
+    assert tramos == [[LUNES, LUNES + 6]]
+
+
+def test_sumar_dia_mantiene_actual_y_maxima():
+    racha = racha_vacia()
+    for dia in (LUNES, LUNES + 1, LUNES + 2, LUNES + 5):
+        sumar_dia(racha, dia)
+    assert (racha["actual"], racha["maxima"], racha["ultima_fecha"]) == (1, 3, "2026-03-07")
+    # Rellenar los huecos con sesiones importadas tarde une todo en una racha
+    sumar_dia(racha, LUNES + 4)
+    assert sumar_dia(racha, LUNES + 3) == 6
+    assert (racha["actual"], racha["maxima"]) == (6, 6)
+
+
+def test_el_orden_de_los_dias_no_importa():
+    dias = [LUNES + d for d in (9, 0, 1, 1, 5, 2, 8, 4, 10)]
+    racha = racha_vacia()
+    for dia in dias:
+        sumar_dia(racha, dia)
+    assert racha == construir_racha(dias) == construir_racha(sorted(dias))
+    assert racha["tramos"] == [[LUNES, LUNES + 2], [LUNES + 4, LUNES + 5], [LUNES + 8, LUNES + 10]]
+
+
+def test_la_racha_vigente_depende_de_hoy():
+    racha = construir_racha([LUNES, LUNES + 1, LUNES + 2])
+    assert racha_vigente(racha, date.fromordinal(LUNES + 2)) == 3
+    assert racha_vigente(racha, date.fromordinal(LUNES + 3)) == 3
+    assert racha_vigente(racha, date.fromordinal(LUNES + 4)) == 0
@@ -0,0 +1,28 @@
+# test_recalculo.py - Recalcular todo el historial da lo mismo que el estado mantenido sesión a sesión
+import pytest
+from conftest import ALMACENES, poblar
+from servicio import ServicioAprendizaje
+
+
+@pytest.mark.parametrize("almacen", ALMACENES)
+def test_el_recalculo_coincide_con_el_estado_incremental(tmp_path, almacen):
+    servicio = ServicioAprendizaje(almacen, str(tmp_path))
+    poblar(servicio, usuarios=4, sesiones=60)
+
+    resultado = servicio.recalcular_historial()
+    assert resultado["sesiones"] == 60
+    assert resultado["usuarios"] == {}
+    assert resultado["planes"] == {}
+
+
+def test_el_recalculo_detecta_y_corrige_diferencias(tmp_path):
+    servicio = ServicioAprendizaje("json", str(tmp_path))
+    poblar(servicio, usuarios=2, sesiones=20)
+    usuario_id = next(iter(servicio.datos["usuarios"]))
+    puntos = servicio.datos["puntos"][usuario_id]
+    servicio.datos["puntos"][usuario_id] = puntos + 100
+
+    assert usuario_id in servicio.recalcular_historial()["usuarios"]
+    servicio.recalcular_historial(aplicar=True)
+    assert servicio.datos["puntos"][usuario_id] == puntos
+    assert servicio.recalcular_historial()["usuarios"] == {}
@@ -0,0 +1,43 @@
+# test_servidor.py - Rutas del servidor: los campos de la petición se validan antes de llegar al servicio
+import asyncio
+import json
+
+import pytest
+from servicio import ServicioAprendizaje
+from servidor import ServidorAsistente
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    servidor = ServidorAsistente(ServicioAprendizaje("json", str(tmp_path)))
+    yield servidor
+    servidor.cerrar()
+    servidor.servicio.cerrar()
+
+
+def pedir(servidor, metodo, ruta, cuerpo):
+    return asyncio.run(servidor.despachar(metodo, ruta, json.dumps(cuerpo).encode("utf-8")))
+
+
+@pytest.mark.parametrize("intereses, esperados", [
+    ("python; inglés,Historia", ["python", "inglés", "historia"]),
+    (["python", "Inglés"], ["python", "inglés"]),
+    (None, ["programación"]),
+])
+def test_los_intereses_admiten_texto_o_lista(servidor, intereses, esperados):
+    estado, resultado = pedir(servidor, "POST", "/usuarios", {"nombre": "Ana", "intereses": intereses})
+    assert estado == 201
+    assert resultado["usuario"]["intereses"] == esperados
+
+
+@pytest.mark.parametrize("cuerpo", [
+    {"nombre": 5},
+    {"nombre": "Ana", "nivel": ["experto"]},
+    {"nombre": "Ana", "intereses": {"tema": "python"}},
+    {"nombre": "Ana", "intereses": ["python", 3]},
+    {"nombre": "  "},
+])
+def test_los_campos_mal_formados_dan_400(servidor, cuerpo):
+    estado, resultado = pedir(servidor, "POST", "/usuarios", cuerpo)
+    assert estado == 400, resultado
+    assert servidor.servicio.datos["usuarios"] == {}
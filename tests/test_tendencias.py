@@ -0,0 +1,27 @@
+# test_tendencias.py - Las tendencias no van al diario: se recalculan igual al reproducir las sesiones
+from datetime import datetime, timedelta
+
+from servicio import ServicioAprendizaje
+
+
+def test_la_tendencia_se_recalcula_al_reproducir_el_diario(tmp_path):
+    servicio = ServicioAprendizaje("json", str(tmp_path))
+    usuario_id = servicio.crear_usuario("Ana")["usuario_id"]
+    plan_id = servicio.crear_plan_estudio(usuario_id, "python")["plan_id"]
+    inicio = datetime(2026, 3, 2, 9)
+    for i in range(40):
+        # Satisfacción estable y luego una caída clara: la tendencia detecta el cambio
+        servicio.registrar_sesion(plan_id, 45, 8 if i < 25 else 3, timestamp=inicio + timedelta(days=i))
+    tendencia = servicio.datos["perfiles"][usuario_id]["tendencia"]
+    assert tendencia["cambios"]
+    servicio.cerrar()
+
+    diario = servicio.repositorio.diario.archivo_diario
+    with open(diario, encoding="utf-8") as f:
+        assert '"perfiles"' not in f.read()
+    servicio.repositorio.cache.invalidar()
+    recargado = ServicioAprendizaje("json", str(tmp_path))
+    assert recargado.repositorio.origen_carga == "json"
+    assert recargado.datos["perfiles"][usuario_id]["tendencia"] == tendencia
+    hoy = (inicio + timedelta(days=39)).toordinal()
+    assert recargado.tendencias_de_usuario(usuario_id, hoy)["satisfaccion"] == "bajando"